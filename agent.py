@@ -1,19 +1,43 @@
 
-from config import bedrock_model
-from tools import get_time
+import threading
 
+# The Agent (and strands, boto3) are created on first use, not at import:
+# get_agent() or `from agent import agent` both return the shared instance.
+# Multi-user apps take one agent per session from sessions.get_agent_pool().
 
+_agent = None
+_lock = threading.Lock()
 
-from strands import Agent 
 
+def new_agent():
+    """A fresh Agent (own conversation history) on the process-wide Bedrock model."""
+    from strands import Agent
 
-agent = Agent(
-    tools=[get_time],
-    system_prompt=""" User is Hemanth he is AI Engineer """
-)
+    import config
+    from tools import get_time
+
+    return Agent(
+        model=config.get_bedrock_model(),
+        tools=[get_time],
+        system_prompt=""" User is Hemanth he is AI Engineer """
+    )
+
+
+def get_agent():
+    global _agent
+    with _lock:
+        if _agent is None:
+            _agent = new_agent()
+        return _agent
+
+
+def __getattr__(name):
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # # Process user input
-# result = agent("Calculate 25 * 48")
+# result = get_agent()("Calculate 25 * 48")
 
-# print(result)
\ No newline at end of file
+# print(result)
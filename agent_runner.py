@@ -0,0 +1,161 @@
+"""
+Async agent invocation for the voice loop.
+- Agent turns run on a dedicated worker thread with its own event loop, so a slow
+  or blocking model call never stalls mic ingestion or Transcribe result handling.
+- Text deltas are handed back to the caller's loop as they are produced.
+- Pending turns wait in a bounded queue; when it is full the oldest waiting turn
+  is dropped (the user has already said something newer).
+- A turn can be rolled back (its messages removed from the agent's history), for
+  speculative turns that turn out to answer the wrong words.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Deque, List, Optional
+
+import tracing
+
+# ---------- Config ----------
+MAX_PENDING_TURNS = 2  # turns waiting behind the running one
+
+
+class TurnDropped(Exception):
+    """A queued turn was discarded because newer turns filled the queue."""
+
+
+class Checkpoint:
+    """Records the messages one turn added to `agent.messages`, for AgentRunner.rollback."""
+
+    def __init__(self):
+        self.added: List[dict] = []
+
+
+class _Turn:
+    _DONE = object()
+
+    def __init__(self, prompt: str, checkpoint: Optional[Checkpoint] = None):
+        self.prompt = prompt
+        self.checkpoint = checkpoint
+        self.trace = tracing.current()  # stamped with agent_start / first_token / agent_done
+        self.deltas: asyncio.Queue = asyncio.Queue()
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        self.deltas.put_nowait(item)
+
+
+class AgentRunner:
+    """Runs Strands agent turns one at a time off the event loop.
+
+    `agent` needs `stream_async(prompt)` yielding event dicts, where text
+    deltas carry a "data" key (strands.Agent, or fakes.FakeAgent).
+    """
+
+    def __init__(self, agent, max_pending: int = MAX_PENDING_TURNS):
+        self.agent = agent
+        self.max_pending = max_pending
+        self._pending: Deque[_Turn] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        self.completed = 0
+        self.dropped = 0
+
+    # ---------- Public API ----------
+
+    async def stream(self, prompt: str, checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[str]:
+        """Queue a turn and yield its text deltas as the agent produces them.
+
+        Closing or cancelling the iterator stops the agent call at its next delta.
+        Pass a `checkpoint` to be able to rollback() the turn afterwards.
+        """
+        loop = asyncio.get_running_loop()
+        turn = _Turn(prompt, checkpoint)
+        self._enqueue(turn, loop)
+        try:
+            while True:
+                item = await turn.deltas.get()
+                if item is _Turn._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            turn.cancelled.set()
+
+    async def ask(self, prompt: str) -> str:
+        """Run a turn and return the full reply text."""
+        return "".join([delta async for delta in self.stream(prompt)])
+
+    def rollback(self, checkpoint: Checkpoint) -> asyncio.Future:
+        """Remove a turn's messages from the agent's history.
+
+        Runs on the agent thread after the turn has stopped and before any turn
+        queued later, so it never races the agent. Cancel the turn's stream first.
+        """
+        return asyncio.wrap_future(self._executor.submit(self._forget, checkpoint))
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        for turn in self._pending:
+            turn.cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- Worker ----------
+
+    def _enqueue(self, turn: _Turn, loop: asyncio.AbstractEventLoop):
+        while len(self._pending) >= self.max_pending:
+            oldest = self._pending.popleft()
+            oldest.put(TurnDropped(oldest.prompt))
+            self.dropped += 1
+        self._pending.append(turn)
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._work(loop))
+        self._wakeup.set()
+
+    async def _work(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                turn = self._pending.popleft()
+                if turn.cancelled.is_set():
+                    continue
+                await loop.run_in_executor(self._executor, self._run_turn, turn, loop)
+
+    def _run_turn(self, turn: _Turn, loop: asyncio.AbstractEventLoop):
+        """Worker thread: drive the agent's async stream on a private loop."""
+
+        async def consume():
+            async for event in self.agent.stream_async(turn.prompt):
+                if turn.cancelled.is_set():
+                    break
+                if "data" in event:
+                    turn.trace.mark("first_token")
+                    loop.call_soon_threadsafe(turn.put, event["data"])
+
+        turn.trace.mark("agent_start")
+
+        history = getattr(self.agent, "messages", None)
+        before = {id(m) for m in history} if history is not None else set()
+        try:
+            asyncio.run(consume())
+            turn.trace.mark("agent_done")
+            self.completed += 1
+            loop.call_soon_threadsafe(turn.put, _Turn._DONE)
+        except Exception as e:
+            loop.call_soon_threadsafe(turn.put, e)
+        finally:
+            if turn.checkpoint is not None and history is not None:
+                turn.checkpoint.added.extend(m for m in history if id(m) not in before)
+
+    def _forget(self, checkpoint: Checkpoint):
+        history = getattr(self.agent, "messages", None)
+        if history is not None and checkpoint.added:
+            added = {id(m) for m in checkpoint.added}
+            history[:] = [m for m in history if id(m) not in added]
+        checkpoint.added.clear()
@@ -1,9 +1,11 @@
 import streamlit as st
 import asyncio
 import threading
-from agent import agent
+from sessions import get_agent_pool, new_session_id
 from polly import synthesize_and_play_direct
 from transcribe import MicStream, stream_to_transcribe
+from transcribe_session import get_transcribe_session
+from batch_transcribe import transcribe_files
 import time
 import io
 import numpy as np
@@ -18,7 +20,13 @@ st.set_page_config(
     layout="wide"
 )
 
+# Transcribe stream opens in the background now, so pressing record doesn't pay the setup
+transcribe_session = get_transcribe_session()
+
 # Initialize session state
+if 'agent_session' not in st.session_state:
+    st.session_state.agent_session = new_session_id()  # this browser session's own agent in the pool
+agent_session = st.session_state.agent_session  # read once: agent calls also run on recording threads
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'recording_state' not in st.session_state:
@@ -61,7 +69,8 @@ def process_agent_response(response):
 def get_agent_response(user_input):
     """Get response from the agent"""
     try:
-        result = agent(user_input)
+        with get_agent_pool().session(agent_session) as agent:
+            result = agent(user_input)
         return process_agent_response(result)
     except Exception as e:
         return f"Error: {e}"
@@ -107,7 +116,7 @@ def record_and_transcribe():
             try:
                 async def record_voice():
                     async with MicStream() as mic:
-                        await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final)
+                        await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final, session=transcribe_session, owner=agent_session)
                 
                 # Record for 5 seconds
                 loop.run_until_complete(asyncio.wait_for(record_voice(), timeout=5.0))
@@ -168,7 +177,7 @@ def main():
                     
                     async def record_voice():
                         async with MicStream() as mic:
-                            await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final)
+                            await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final, session=transcribe_session, owner=agent_session)
                     
                     # Record for 5 seconds
                     loop.run_until_complete(asyncio.wait_for(record_voice(), timeout=5.0))
@@ -210,15 +219,34 @@ def main():
             
             if audio_bytes:
                 st.audio(audio_bytes, format="audio/wav")
-                st.info("🔄 Audio recorded! (Note: Transcription requires integration with AWS Transcribe)")
                 
-                # For now, show a placeholder
-                if st.button("� Process Audio", key="process_audio"):
-                    placeholder_text = "Audio transcription would happen here with AWS Transcribe"
-                    st.session_state.messages.append({"role": "user", "content": placeholder_text})
-                    response = get_agent_response(placeholder_text)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    st.rerun()
+                if st.button("📝 Process Audio", key="process_audio"):
+                    with st.spinner("Transcribing..."):
+                        clip = transcribe_files([("recording.wav", audio_bytes)])[0]
+                    if clip.error:
+                        st.error(f"Transcription failed: {clip.error}")
+                    elif not clip.text:
+                        st.warning("No speech recognized in the recording")
+                    else:
+                        st.session_state.messages.append({"role": "user", "content": clip.text})
+                        response = get_agent_response(clip.text)
+                        st.session_state.messages.append({"role": "assistant", "content": response})
+                        st.rerun()
+            
+            # Several recordings at once (WAV, WebM, Ogg, MP3)
+            uploads = st.file_uploader(
+                "Or upload clips to transcribe",
+                type=["wav", "webm", "ogg", "mp3", "m4a"],
+                accept_multiple_files=True,
+            )
+            if uploads and st.button("📝 Transcribe Clips", key="transcribe_clips"):
+                with st.spinner(f"Transcribing {len(uploads)} clips..."):
+                    results = transcribe_files([(f.name, f.getvalue()) for f in uploads])
+                for clip in results:
+                    if clip.error:
+                        st.error(f"**{clip.name}**: {clip.error}")
+                    else:
+                        st.write(f"**{clip.name}** ({clip.audio_s:.1f} s): {clip.text or '*(no speech)*'}")
         
         except Exception as e:
             st.error(f"Audio recorder not available: {e}")
@@ -282,6 +310,7 @@ def main():
         with col1:
             if st.button("🗑️ Clear Conversation", use_container_width=True):
                 st.session_state.messages = []
+                get_agent_pool().reset(agent_session)
                 st.rerun()
         
         with col2:
@@ -0,0 +1,107 @@
+"""
+Barge-in handling for the voice agent.
+- Tracks the running reply turn (agent invocation + Polly synthesis + playback).
+- On the first non-empty partial transcript, or a local voice onset in the mic
+  frames, cancels the turn and silences the speaker on the next audio block.
+- Records cancel-to-silence latency for every barge-in.
+
+Note: without echo cancellation (headphones, or the OS/browser AEC) the agent's
+own voice can reach the mic and interrupt itself; raise `onset_db` in that case.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, List, Optional, Set
+
+import numpy as np
+
+# ---------- Config ----------
+MIN_PARTIAL_CHARS = 2  # ignore one-letter partials ("a", "I") from noise
+ONSET_DB = -35.0  # frame RMS in dBFS that counts as speech
+ONSET_FRAMES = 3  # consecutive loud frames (60 ms at 20 ms frames)
+
+
+def frame_dbfs(pcm: bytes) -> float:
+    """RMS level of an int16 PCM frame in dBFS."""
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    if samples.size == 0:
+        return -120.0
+    rms = np.sqrt(np.mean(samples * samples)) / 32768.0
+    return float(20 * np.log10(max(rms, 1e-6)))
+
+
+class BargeInController:
+    """Cancels the agent's reply the moment the user starts speaking over it.
+
+    `output` is the playback.AudioOutput the reply is played on.
+    """
+
+    def __init__(
+        self,
+        output,
+        min_partial_chars: int = MIN_PARTIAL_CHARS,
+        onset_db: float = ONSET_DB,
+        onset_frames: int = ONSET_FRAMES,
+    ):
+        self.output = output
+        self.min_partial_chars = min_partial_chars
+        self.onset_db = onset_db
+        self.onset_frames = onset_frames
+        self._turn: Optional[asyncio.Task] = None
+        self._tracked: Set[asyncio.Future] = set()
+        self._loud_frames = 0
+        self.barge_ins: List[dict] = []
+
+    @property
+    def active(self) -> bool:
+        """True while a reply is being generated, synthesized or played."""
+        return self._turn is not None and not self._turn.done()
+
+    def start_turn(self, coro: Awaitable) -> asyncio.Task:
+        """Run a reply turn as a cancellable task; interrupts any previous one."""
+        if self.active:
+            self.interrupt("new turn")
+        self._turn = asyncio.ensure_future(coro)
+        return self._turn
+
+    def track(self, future: asyncio.Future) -> asyncio.Future:
+        """Also cancel `future` (e.g. an extra agent call) on barge-in."""
+        self._tracked.add(future)
+        future.add_done_callback(self._tracked.discard)
+        return future
+
+    async def on_partial(self, text: str):
+        if self.active and len(text.strip()) >= self.min_partial_chars:
+            self.interrupt("partial")
+
+    def on_audio(self, pcm: bytes):
+        """Feed mic frames; a run of loud frames during a reply is a barge-in."""
+        if not self.active:
+            self._loud_frames = 0
+            return
+        if frame_dbfs(pcm) >= self.onset_db:
+            self._loud_frames += 1
+            if self._loud_frames >= self.onset_frames:
+                self._loud_frames = 0
+                self.interrupt("vad")
+        else:
+            self._loud_frames = 0
+
+    def interrupt(self, reason: str = "manual"):
+        """Cancel the running turn and everything tracked, then silence the speaker."""
+        started = time.monotonic()
+        if self._turn is not None:
+            self._turn.cancel()
+        for future in list(self._tracked):
+            future.cancel()
+        self.output.stop()
+        self.barge_ins.append({"reason": reason, "at": started})
+
+    def stats(self) -> dict:
+        """Barge-in count and cancel-to-silence latency (ms) over the output's recent stops."""
+        latencies = [s * 1000 for s in self.output.stop_latencies]
+        return {
+            "barge_ins": len(self.barge_ins),
+            "cancel_to_silence_ms_avg": float(np.mean(latencies)) if latencies else None,
+            "cancel_to_silence_ms_max": max(latencies) if latencies else None,
+        }
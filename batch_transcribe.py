@@ -0,0 +1,196 @@
+"""
+Transcription of recorded or uploaded clips (file mode) on any stt.STTBackend.
+- decode_audio(): WAV with the standard library, WebM/Ogg/MP3/M4A by piping
+  through ffmpeg - in memory either way, no temp files - then mono 16 kHz int16
+  (resample.Resampler with its anti-aliasing low-pass).
+- transcribe_clip() streams the samples to the backend in 250 ms chunks as fast
+  as it takes them (or `speed` x real time, for endpoints that need pacing).
+- BatchTranscriber runs many clips at once, at most `workers` in flight, and
+  reports audio-seconds processed per wall-second.
+"""
+
+import asyncio
+import io
+import subprocess
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from resample import Resampler
+from stt import STTBackend
+
+# ---------- Config ----------
+SAMPLE_RATE = 16000
+CHUNK_MS = 250  # audio per send() when streaming a clip
+BATCH_WORKERS = 4  # clips transcribed at once
+FFMPEG = "ffmpeg"
+
+
+def _downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    with wave.open(io.BytesIO(data), "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = (((b[:, 0] << 8) | (b[:, 1] << 16) | (b[:, 2] << 24)) >> 16).astype(np.float32)
+    elif width == 4:
+        samples = (np.frombuffer(raw, dtype=np.int32) >> 16).astype(np.float32)
+    else:
+        raise ValueError(f"unsupported WAV sample width: {width} bytes")
+    return _downmix(samples, channels), rate
+
+
+def _decode_ffmpeg(data: bytes) -> Tuple[np.ndarray, int]:
+    try:
+        proc = subprocess.run(
+            [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            input=data, capture_output=True, check=False,
+        )
+    except FileNotFoundError:
+        raise RuntimeError("decoding WebM/Ogg/MP3 needs ffmpeg on PATH") from None
+    if proc.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode the clip: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32), SAMPLE_RATE
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """Any supported clip (bytes) as mono 16 kHz int16 samples."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        samples, rate = _decode_wav(data)
+    else:
+        samples, rate = _decode_ffmpeg(data)  # WebM/Matroska, Ogg, MP3, M4A, ...
+    samples = np.clip(samples, -32768, 32767).astype(np.int16)
+    return Resampler(rate, SAMPLE_RATE, lowpass=True).process(samples)
+
+
+@dataclass
+class ClipResult:
+    name: str
+    text: str = ""
+    audio_s: float = 0.0
+    elapsed_s: float = 0.0
+    error: Optional[str] = None
+
+
+async def transcribe_clip(
+    samples: np.ndarray,
+    backend: STTBackend,
+    speed: Optional[float] = None,
+    chunk_ms: int = CHUNK_MS,
+) -> str:
+    """Final transcripts of 16 kHz int16 `samples`, joined with spaces."""
+    pcm = samples.tobytes()
+    chunk = SAMPLE_RATE * 2 * chunk_ms // 1000
+    stream = await backend.start()
+    finals = []
+
+    async def collect():
+        async for result in stream.results():
+            if not result.is_partial and result.text.strip():
+                finals.append(result.text.strip())
+
+    collector = asyncio.ensure_future(collect())
+    try:
+        started = time.monotonic()
+        for i, offset in enumerate(range(0, len(pcm), chunk)):
+            if speed:
+                await asyncio.sleep(max(0.0, started + i * chunk_ms / 1000 / speed - time.monotonic()))
+            await stream.send(pcm[offset : offset + chunk])
+        await stream.end()
+        await collector
+    finally:
+        collector.cancel()
+        await stream.close()
+    return " ".join(finals)
+
+
+class BatchTranscriber:
+    """Transcribes many clips concurrently, at most `workers` at a time."""
+
+    def __init__(self, backend: STTBackend, workers: int = BATCH_WORKERS, speed: Optional[float] = None):
+        self.backend = backend
+        self.workers = workers if backend.concurrent else 1
+        self.speed = speed
+        self.audio_s = 0.0
+        self.busy_s = 0.0  # wall time spent inside transcribe_many
+
+    async def transcribe(self, name: str, data: bytes) -> ClipResult:
+        result = ClipResult(name)
+        started = time.monotonic()
+        try:
+            samples = await asyncio.get_running_loop().run_in_executor(None, decode_audio, data)
+            result.audio_s = samples.size / SAMPLE_RATE
+            result.text = await transcribe_clip(samples, self.backend, self.speed)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.elapsed_s = time.monotonic() - started
+        return result
+
+    async def transcribe_many(self, clips: Sequence[Tuple[str, bytes]]) -> List[ClipResult]:
+        """[(name, bytes), ...] -> ClipResults in the same order; a bad clip doesn't fail the batch."""
+        slots = asyncio.Semaphore(self.workers)
+
+        async def one(name, data):
+            async with slots:
+                return await self.transcribe(name, data)
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(one(name, data) for name, data in clips))
+        self.busy_s += time.monotonic() - started
+        self.audio_s += sum(r.audio_s for r in results)
+        return list(results)
+
+    def stats(self) -> dict:
+        return {
+            "audio_s": self.audio_s,
+            "realtime_factor": self.audio_s / self.busy_s if self.busy_s else None,  # audio-s per wall-s
+            "workers": self.workers,
+        }
+
+
+# ---------- Shared transcriber ----------
+
+_batch: Optional[BatchTranscriber] = None
+_batch_lock = threading.Lock()
+
+
+def get_batch_transcriber() -> BatchTranscriber:
+    """Process-wide BatchTranscriber on config.stt_backend.
+
+    With Transcribe, clips get their own streams, paced at config.batch_speed,
+    so they don't hold the live recording's pre-warmed session.
+    """
+    global _batch
+    with _batch_lock:
+        if _batch is None:
+            import config
+
+            if config.stt_backend == "local":
+                from stt import get_stt_backend
+
+                _batch = BatchTranscriber(get_stt_backend(), workers=config.batch_workers)
+            else:
+                from stt import AWSTranscribeBackend
+
+                _batch = BatchTranscriber(AWSTranscribeBackend(), workers=config.batch_workers, speed=config.batch_speed)
+        return _batch
+
+
+def transcribe_files(clips: Sequence[Tuple[str, bytes]]) -> List[ClipResult]:
+    """Blocking transcribe_many for callers without an event loop (the Streamlit apps)."""
+    return asyncio.run(get_batch_transcriber().transcribe_many(clips))
@@ -0,0 +1,4 @@
+"""Offline benchmarks for the voice loop. Run from the repo root, e.g.
+
+    python -m benchmarks.first_audio
+"""
@@ -0,0 +1,88 @@
+"""
+Mic ingestion while the agent is thinking.
+
+A 50 fps producer (one 20 ms frame per tick, like MicStream -> Transcribe) runs
+while a slow, *blocking* FakeAgent answers a turn, either called directly on
+the event loop (old main.on_final) or through agent_runner.AgentRunner.
+Exits non-zero if the runner path drops below --min-fps.
+
+    python -m benchmarks.agent_offload --agent-seconds 2
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from agent_runner import AgentRunner
+from fakes import FakeAgent
+
+FRAME_SECONDS = 0.02
+
+
+async def mic_producer(stop: asyncio.Event, stamps: list):
+    """Forward one frame per 20 ms tick, recording when each one actually went out."""
+    deadline = time.monotonic()
+    while not stop.is_set():
+        stamps.append(time.monotonic())
+        deadline += FRAME_SECONDS
+        await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+
+async def measure(turn) -> dict:
+    stop = asyncio.Event()
+    stamps: list = []
+    producer = asyncio.create_task(mic_producer(stop, stamps))
+    await asyncio.sleep(0.1)
+    started = time.monotonic()
+    await turn()
+    elapsed = time.monotonic() - started
+    await asyncio.sleep(0.1)
+    stop.set()
+    await producer
+    during = [t for t in stamps if started <= t <= started + elapsed]
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    return {
+        "fps": len(during) / elapsed,
+        "max_gap_ms": max(gaps) * 1000,
+        "turn_s": elapsed,
+    }
+
+
+async def run(args) -> bool:
+    def make_agent():
+        return FakeAgent(first_token_delay=args.agent_seconds / 2, tokens_per_second=40.0, blocking=True)
+
+    direct_agent = make_agent()
+
+    async def direct_turn():
+        async for _ in direct_agent.stream_async("what time is it?"):
+            pass
+
+    runner = AgentRunner(make_agent())
+
+    async def runner_turn():
+        await runner.ask("what time is it?")
+
+    direct = await measure(direct_turn)
+    offloaded = await measure(runner_turn)
+    runner.close()
+
+    for name, r in (("agent on loop", direct), ("AgentRunner", offloaded)):
+        print(f"  {name:14}: {r['fps']:5.1f} frames/s during a {r['turn_s']:.1f} s turn, "
+              f"max gap {r['max_gap_ms']:.0f} ms")
+    ok = offloaded["fps"] >= args.min_fps
+    print("PASS" if ok else f"FAIL: AgentRunner below {args.min_fps} fps")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agent-seconds", type=float, default=2.0, help="approx. duration of the slow turn")
+    parser.add_argument("--min-fps", type=float, default=48.0)
+    ok = asyncio.run(run(parser.parse_args()))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
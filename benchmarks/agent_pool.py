@@ -0,0 +1,148 @@
+"""
+Many concurrent users on one process: a shared agent vs sessions.AgentPool.
+
+--users simulated browser sessions each take --turns turns (blocking
+fakes.FakeAgent calls, like strands.Agent.__call__ in the Streamlit apps) on
+their own threads:
+
+- shared: one module-level agent for everyone, as the apps had. Histories mix
+  (cross-talk), and making it safe needs a global lock that serializes users.
+- pool: one agent per session from an AgentPool capped at --pool agents; idle
+  sessions are evicted LRU and their history restored on their next turn.
+
+A history is "mixed" if it holds another user's prompt; a turn "lost its
+context" if its agent no longer holds all of that user's earlier turns. Last,
+one session is reset (the apps' Clear button) in the middle of a turn: its next
+turn must start a new conversation. Exits non-zero if the pool mixes any
+history, loses any context, holds more than --pool agents or ignores the reset.
+
+    python -m benchmarks.agent_pool --users 40 --pool 16
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fakes import FakeAgent
+from sessions import AgentPool
+
+
+def new_agent(args):
+    return FakeAgent(reply="Okay.", first_token_delay=args.turn_s, tokens_per_second=1000.0, blocking=True)
+
+
+def prompts(agent) -> list:
+    return [m["content"][0]["text"] for m in agent.messages if m["role"] == "user"]
+
+
+def mixed(agent, user: str) -> bool:
+    return any(not p.startswith(user + ":") for p in prompts(agent))
+
+
+def lost_context(agent, user: str, turn: int) -> bool:
+    return [p for p in prompts(agent) if p.startswith(user + ":")] != [f"{user}: turn {t}" for t in range(turn + 1)]
+
+
+def simulate(args, session):
+    """Run every user; `session(user)` is a context manager yielding that user's agent.
+
+    Returns (seconds, turns that lost their context).
+    """
+    rng = random.Random(0)
+    think = [[rng.uniform(0, args.think_s) for _ in range(args.turns)] for _ in range(args.users)]
+
+    def user(i):
+        lost = 0
+        for turn in range(args.turns):
+            time.sleep(think[i][turn])
+            with session(f"u{i}") as agent:
+                agent(f"u{i}: turn {turn}")
+                lost += lost_context(agent, f"u{i}", turn)
+        return lost
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        lost = sum(pool.map(user, range(args.users)))
+    return time.monotonic() - started, lost
+
+
+def reset_mid_turn(args) -> list:
+    """Prompts in the session's agent on the first turn after a reset during its second."""
+    pool = AgentPool(lambda: new_agent(args), max_sessions=args.pool)
+    with pool.session("u0") as agent:
+        agent("u0: turn 0")
+
+    def turn():
+        with pool.session("u0") as agent:
+            agent("u0: turn 1")
+
+    thread = threading.Thread(target=turn)
+    thread.start()
+    time.sleep(args.turn_s / 2)
+    pool.reset("u0")
+    thread.join()
+    with pool.session("u0") as agent:
+        agent("u0: after reset")
+        return prompts(agent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--pool", type=int, default=16, help="max agents kept")
+    parser.add_argument("--turn-s", type=float, default=0.2, help="seconds per agent call")
+    parser.add_argument("--think-s", type=float, default=1.0, help="max user pause between turns")
+    args = parser.parse_args()
+    turns = args.users * args.turns
+    print(f"{args.users} users x {args.turns} turns, {args.turn_s:.1f} s per agent call")
+
+    shared = new_agent(args)
+
+    @contextmanager
+    def unlocked(user):
+        yield shared
+
+    elapsed, _ = simulate(args, unlocked)
+    print(f"  shared agent       : {elapsed:5.1f} s, {turns / elapsed:5.1f} turns/s, "
+          f"one history with {len({m['content'][0]['text'].split(':')[0] for m in shared.messages if m['role'] == 'user'})} users' turns mixed in")
+
+    lock = threading.Lock()
+
+    @contextmanager
+    def locked(user):
+        with lock:
+            yield shared
+
+    elapsed, _ = simulate(args, locked)
+    print(f"  shared agent + lock: {elapsed:5.1f} s, {turns / elapsed:5.1f} turns/s (users wait for each other)")
+
+    pool = AgentPool(lambda: new_agent(args), max_sessions=args.pool)
+    peak = [0]
+    session = pool.session
+
+    @contextmanager
+    def tracked(user):
+        with session(user) as agent:
+            peak[0] = max(peak[0], pool.stats()["sessions"])
+            yield agent
+
+    elapsed, lost = simulate(args, tracked)
+    bad = sum(mixed(s.agent, user) for user, s in pool._sessions.items())
+    s = pool.stats()
+    print(f"  pool ({args.pool:3d} agents)  : {elapsed:5.1f} s, {turns / elapsed:5.1f} turns/s, "
+          f"{bad} mixed histories, {lost} of {turns} turns lost their context, peak {peak[0]} agents, "
+          f"{s['created']} created, {s['evicted']} evicted, {s['restored']} restored")
+
+    after_reset = reset_mid_turn(args)
+    reset_ok = after_reset == ["u0: after reset"]
+    print(f"  {'PASS' if reset_ok else 'FAIL'} reset mid-turn: next turn's history {after_reset}")
+    sys.exit(1 if bad or lost or peak[0] > args.pool or not reset_ok else 0)
+
+
+if __name__ == "__main__":
+    main()
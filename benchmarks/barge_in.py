@@ -0,0 +1,103 @@
+"""
+Barge-in: cancel-to-silence latency with synthetic mic input.
+
+The agent (a long fake reply streamed faster than it is spoken, so the
+synthesis queue is full, + FakePolly) starts talking through a real
+playback.AudioOutput driven by fakes.FakeOutputStream; synthetic speech frames
+are fed to BargeInController.on_audio at 20 ms cadence until it interrupts.
+Exits non-zero if a synthesis is still running after the interrupt, or more
+than speech.MAX_INFLIGHT ran at once.
+
+    python -m benchmarks.barge_in --runs 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from bargein import BargeInController
+from fakes import DEFAULT_REPLY, FakeOutputStream, FakePolly, fake_agent_stream, synthetic_mic_frames
+from playback import AudioOutput
+from speech import MAX_INFLIGHT, SpeechPipeline
+
+FRAME_SECONDS = 0.02
+
+
+async def one_run(talk_after: float) -> dict:
+    devices = []
+
+    def device_factory(**kwargs):
+        devices.append(FakeOutputStream(**kwargs))
+        return devices[-1]
+
+    output = AudioOutput(stream_factory=device_factory)
+    polly = FakePolly(latency_per_char=0.02)  # synthesis slower than tokens arrive: the queue fills
+    running = [0, 0]  # now, peak
+
+    async def synthesize(text):
+        running[0] += 1
+        running[1] = max(running)
+        try:
+            return await polly.synthesize(text)
+        finally:
+            running[0] -= 1
+
+    controller = BargeInController(output)
+    pipeline = SpeechPipeline(synthesize, output)
+
+    reply = " ".join([DEFAULT_REPLY] * 4)
+    turn = controller.start_turn(pipeline.speak(fake_agent_stream(reply, first_token_delay=0.3, tokens_per_second=200.0)))
+    frames = synthetic_mic_frames([("silence", talk_after), ("speech", 1.0)])
+    onset = None
+    for i, frame in enumerate(frames):
+        await asyncio.sleep(FRAME_SECONDS)
+        if onset is None and i * FRAME_SECONDS >= talk_after:
+            onset = time.monotonic()
+        controller.on_audio(frame)
+        if turn.done():
+            break
+    interrupted = time.monotonic()
+    try:
+        await turn
+    except asyncio.CancelledError:
+        pass
+    await asyncio.sleep(0.1)  # let the device thread play a few more blocks
+    output.close()
+    device = devices[-1]
+
+    return {
+        "detect_ms": (interrupted - onset) * 1000,
+        "cancel_to_silence_ms": output.stop_latencies[-1] * 1000 if output.stop_latencies else None,
+        "audible_after_cancel_ms": max(0.0, (device.last_audible or 0) - interrupted) * 1000,
+        "tts_calls": polly.calls,
+        "tts_running_after_cancel": running[0],
+        "tts_peak_inflight": running[1],
+    }
+
+
+async def run(args):
+    results = [await one_run(args.talk_after) for _ in range(args.runs)]
+    silence = [r["cancel_to_silence_ms"] for r in results if r["cancel_to_silence_ms"] is not None]
+    print(f"{args.runs} runs, user starts talking {args.talk_after:.1f} s into the reply")
+    print(f"  voice onset -> interrupt : {statistics.median(r['detect_ms'] for r in results):6.1f} ms (median)")
+    if silence:
+        print(f"  cancel -> silent block   : {statistics.median(silence):6.1f} ms (median), {max(silence):.1f} ms (max)")
+    print(f"  audio after cancel       : {max(r['audible_after_cancel_ms'] for r in results):6.1f} ms (max)")
+    leaked = max(r["tts_running_after_cancel"] for r in results)
+    peak = max(r["tts_peak_inflight"] for r in results)
+    print(f"  {'PASS' if not leaked else 'FAIL'} TTS running after cancel   : {leaked} (max)")
+    print(f"  {'PASS' if peak <= MAX_INFLIGHT else 'FAIL'} TTS in flight at once      : {peak} (max {MAX_INFLIGHT})")
+    return leaked or peak > MAX_INFLIGHT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--talk-after", type=float, default=1.5, help="seconds of silence before the user talks")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Clip transcription throughput: audio-seconds transcribed per wall-second.
+
+An offline fixture set of --clips synthetic recordings (fakes.synthetic_mic_frames
+speech and pauses, 2-10 s each) is encoded in memory as WAV files in the
+formats browsers and recorders produce: 16 kHz mono 16-bit, 44.1 kHz stereo
+16-bit, 48 kHz mono 24-bit, 8 kHz mono 8-bit. batch_transcribe.BatchTranscriber
+decodes and transcribes them with 1..N clips in flight on:
+
+- local: stt.LocalSTTBackend with fakes.EnergyRecognizer (CPU-bound)
+- aws (fake endpoint): stt.AWSTranscribeBackend on fakes.FakeTranscribeClient,
+  a new stream per clip with its setup latency (latency-bound)
+
+Every clip's transcript must match the one from its original 16 kHz samples;
+exits non-zero otherwise. --paced adds a run at real-time speed, which is what
+streaming a clip through the live path would cost.
+
+    python -m benchmarks.batch_transcribe --clips 24
+"""
+
+import argparse
+import asyncio
+import functools
+import io
+import random
+import sys
+import time
+import wave
+
+import numpy as np
+
+from batch_transcribe import BatchTranscriber, decode_audio, transcribe_clip
+from fakes import EnergyRecognizer, FakeTranscribeClient, synthetic_mic_frames
+from resample import Resampler
+from stt import AWSTranscribeBackend, LocalSTTBackend
+
+SPEECH_S = [0.45, 0.75, 1.05, 1.25]  # off fakes.EnergyRecognizer's 10-frame word boundaries
+FORMATS = [(16000, 1, 2), (44100, 2, 2), (48000, 1, 3), (8000, 1, 1)]  # rate, channels, bytes per sample
+
+
+def encode_wav(samples: np.ndarray, rate: int, channels: int, width: int) -> bytes:
+    x = Resampler(16000, rate).process(samples).astype(np.int32)
+    x = np.repeat(x[:, None], channels, axis=1).reshape(-1)
+    if width == 1:
+        raw = ((x >> 8) + 128).astype(np.uint8).tobytes()
+    elif width == 3:
+        v = (x << 8).astype(np.int32)
+        raw = np.stack([(v >> s) & 0xFF for s in (0, 8, 16)], axis=1).astype(np.uint8).tobytes()
+    else:
+        raw = x.astype(np.int16).tobytes()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(raw)
+    return buf.getvalue()
+
+
+def fixtures(n: int):
+    """[(name, wav bytes, original 16 kHz samples)]"""
+    rng = random.Random(0)
+    clips = []
+    for i in range(n):
+        pattern = [("silence", 0.4)]
+        while sum(s for _, s in pattern) < rng.uniform(2, 10):
+            pattern += [("speech", rng.choice(SPEECH_S)), ("silence", 0.8)]
+        samples = np.frombuffer(b"".join(synthetic_mic_frames(pattern, seed=i)), dtype=np.int16)
+        rate, channels, width = FORMATS[i % len(FORMATS)]
+        clips.append((f"clip{i:02d}_{rate}hz_{channels}ch_{8 * width}bit.wav", encode_wav(samples, rate, channels, width), samples))
+    return clips
+
+
+async def run_backend(label, backend, clips, expected, workers_list, speed=None) -> int:
+    failures = 0
+    for workers in workers_list:
+        batch = BatchTranscriber(backend, workers=workers, speed=speed)
+        started = time.monotonic()
+        results = await batch.transcribe_many([(name, data) for name, data, _ in clips])
+        elapsed = time.monotonic() - started
+        wrong = [r.name for r, want in zip(results, expected) if r.error or r.text != want]
+        failures += bool(wrong)
+        audio = sum(r.audio_s for r in results)
+        print(f"  {label:20} {batch.workers:2d} in flight: {audio / elapsed:6.1f} audio-s per wall-s "
+              f"({audio:.0f} s of audio in {elapsed:.1f} s){'' if not wrong else f', WRONG: {wrong[:3]}'}")
+    return failures
+
+
+async def run(args):
+    clips = fixtures(args.clips)
+    audio_s = sum(samples.size for _, _, samples in clips) / 16000
+    started = time.thread_time()
+    for _, data, _ in clips:
+        decode_audio(data)
+    decode_ms = (time.thread_time() - started) * 1000
+    print(f"{len(clips)} clips, {audio_s:.0f} s of audio; decoding all of them in memory: {decode_ms:.0f} ms CPU")
+
+    local = LocalSTTBackend(EnergyRecognizer, workers=args.local_workers)
+    local.warm()
+    fake_aws = AWSTranscribeBackend(client_factory=functools.partial(FakeTranscribeClient, setup_delay=0.15, connect_delay=0.25))
+    failures = 0
+    try:
+        expected = [await transcribe_clip(samples, local) for _, _, samples in clips]
+        failures += await run_backend("local", local, clips, expected, args.workers)
+        failures += await run_backend("aws (fake endpoint)", fake_aws, clips, expected, args.workers)
+        if args.paced:
+            failures += await run_backend("aws, real time", fake_aws, clips, expected, args.workers[-1:], speed=1.0)
+    finally:
+        local.close()
+    print(f"{failures} failing run(s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="clips in flight")
+    parser.add_argument("--local-workers", type=int, default=2, help="recognizer processes")
+    parser.add_argument("--paced", action="store_true", help="also stream at real-time speed")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
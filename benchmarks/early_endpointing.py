@@ -0,0 +1,108 @@
+"""
+Early endpointing replay: turn latency saved by speculative turns, and calls wasted.
+
+Replays recorded transcript event sequences (partials, VAD end of speech,
+final) against fakes.FakeAgent, once waiting for the final ("final only") and
+once through endpointing.EarlyEndpointer. Turn latency is final -> first agent
+delta. Record your own sequences with TRANSCRIPT_LOG=path python main.py.
+
+    python -m benchmarks.early_endpointing
+    python -m benchmarks.early_endpointing --events my_log.jsonl --stable-ms 300 --no-vad
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from agent_runner import AgentRunner
+from endpointing import EarlyEndpointer, normalize
+from fakes import FakeAgent
+
+DEFAULT_EVENTS = Path(__file__).with_name("transcripts.jsonl")
+
+
+def load(path) -> list:
+    with open(path) as f:
+        return [json.loads(line)["events"] for line in f if line.strip()]
+
+
+async def first_delta_after(tokens, final_at: float) -> float:
+    async for _ in tokens:
+        latency = time.monotonic() - final_at
+        break
+    else:
+        latency = float("nan")
+    await tokens.aclose()
+    return latency
+
+
+async def replay(events, args, speculative: bool) -> dict:
+    agent = FakeAgent(first_token_delay=args.agent_ms / 1000)
+    runner = AgentRunner(agent)
+    turns = []
+
+    def start_turn(text, tokens):
+        turns.append(asyncio.create_task(first_delta_after(tokens, time.monotonic())))
+
+    endpointer = EarlyEndpointer(runner, start_turn, stable_ms=args.stable_ms)
+    started = time.monotonic()
+    for t, kind, text in events:
+        await asyncio.sleep(max(0.0, started + t - time.monotonic()))
+        if not speculative:
+            if kind == "final":
+                start_turn(text, runner.stream(text))
+        elif kind == "partial":
+            await endpointer.on_partial(text)
+        elif kind == "speech_end" and not args.no_vad:
+            await endpointer.on_speech_end(text)
+        elif kind == "final":
+            await endpointer.on_final(text)
+    latencies = await asyncio.gather(*turns)
+    await asyncio.sleep(0.05)  # let rollbacks run on the agent thread
+    # History must hold only the turns that were actually answered.
+    prompts = [normalize(m["content"][0]["text"]) for m in agent.messages if m["role"] == "user"]
+    finals = [normalize(text) for _, kind, text in events if kind == "final"]
+    runner.close()
+    return {
+        "latencies": latencies,
+        "calls": agent.calls,
+        "history_ok": prompts == finals,
+        "stats": endpointer.stats(),
+    }
+
+
+async def run(args):
+    sequences = load(args.events)
+    print(f"{len(sequences)} recorded utterances, agent first token {args.agent_ms:.0f} ms, "
+          f"stable window {args.stable_ms} ms{'' if not args.no_vad else ', VAD end of speech ignored'}")
+    for name, speculative in (("final only", False), ("speculative", True)):
+        results = await asyncio.gather(*(replay(events, args, speculative) for events in sequences))
+        latencies = np.array([l for r in results for l in r["latencies"]]) * 1000
+        calls = sum(r["calls"] for r in results)
+        line = (f"  {name:12}: turn latency p50 {np.percentile(latencies, 50):4.0f} ms "
+                f"p95 {np.percentile(latencies, 95):4.0f} ms, {calls} agent calls")
+        if speculative:
+            speculated = sum(r["stats"]["speculated"] for r in results)
+            wasted = sum(r["stats"]["wasted"] for r in results)
+            committed = sum(r["stats"]["committed"] for r in results)
+            line += (f", {committed}/{len(sequences)} committed, "
+                     f"{wasted}/{speculated} speculations wasted ({wasted / max(1, speculated):.0%})")
+        line += f", history {'ok' if all(r['history_ok'] for r in results) else 'CORRUPTED'}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", default=DEFAULT_EVENTS, help="JSONL of recorded transcript events")
+    parser.add_argument("--stable-ms", type=int, default=400)
+    parser.add_argument("--agent-ms", type=float, default=600.0, help="agent time to first token")
+    parser.add_argument("--no-vad", action="store_true", help="ignore recorded VAD end-of-speech events")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
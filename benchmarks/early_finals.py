@@ -0,0 +1,87 @@
+"""
+The VAD's early finals (stream_to_transcribe with vad=, early_final=True) against Transcribe's own.
+
+Synthetic speech runs through the VAD onto fakes.FakeTranscribeClient with
+scripted transcripts, --speed x real time. Each case checks which texts reach
+on_final, in order; exits non-zero on failure.
+
+- same words: Transcribe's final repeats the early final, and is dropped.
+- correction: Transcribe's final differs from the partial the early final used,
+  and is delivered after it.
+- mid-sentence pause: a pause over the VAD's end of utterance inside one
+  Transcribe result (the service waits 1.5 s to endpoint); the words after the
+  pause reopen the utterance and the whole sentence reaches on_final.
+
+    python -m benchmarks.early_finals
+"""
+
+import argparse
+import asyncio
+import functools
+import sys
+
+from fakes import FakeTranscribeClient, synthetic_mic_frames
+from stt import AWSTranscribeBackend
+from transcribe import CHUNK_MS, stream_to_transcribe
+from vad import END_OF_UTTERANCE_MS, VoiceActivityDetector
+
+# (name, pattern, scripted transcript, Transcribe's final silence ms, finals expected in order)
+CASES = [
+    ("same words", [("silence", 0.5), ("speech", 0.95), ("silence", 2.0)],
+     "what time is it now", 500, ["what time is it now"]),
+    ("correction", [("silence", 0.5), ("speech", 0.95), ("silence", 2.0)],
+     "set a timer for ten minutes please", 500, ["set a timer for ten", "set a timer for ten minutes please"]),
+    ("mid-sentence pause", [("silence", 0.5), ("speech", 0.95), ("silence", 1.0), ("speech", 1.25), ("silence", 2.0)],
+     "remind me to call mom when I get home tonight okay", 1500,
+     ["remind me to call mom", "remind me to call mom when I get home tonight okay"]),
+]
+
+
+class FramesSource:
+    """MicStream stand-in: yields prerecorded frames, `speed` x real time."""
+
+    def __init__(self, frames, speed: float):
+        self.frames = frames
+        self.speed = speed
+
+    async def generator(self):
+        for frame in self.frames:
+            await asyncio.sleep(CHUNK_MS / 1000 / self.speed)
+            yield frame
+
+
+async def run_case(pattern, script: str, final_silence_ms: int, args) -> list:
+    finals = []
+
+    async def on_final(text):
+        finals.append(text)
+
+    client = functools.partial(FakeTranscribeClient, connect_delay=0.0, transcripts=[script], final_silence_ms=final_silence_ms)
+    await stream_to_transcribe(
+        FramesSource(list(synthetic_mic_frames(pattern)), args.speed), on_final=on_final,
+        vad=VoiceActivityDetector(), early_final=True, backend=AWSTranscribeBackend(client_factory=client),
+    )
+    return finals
+
+
+async def run(args) -> int:
+    print(f"VAD end of utterance after {END_OF_UTTERANCE_MS} ms, audio at {args.speed:g}x real time")
+    failures = 0
+    for name, pattern, script, final_silence_ms, expected in CASES:
+        finals = await run_case(pattern, script, final_silence_ms, args)
+        ok = finals == expected
+        failures += not ok
+        print(f"  {'PASS' if ok else 'FAIL'} {name:20}: on_final got {finals}")
+        if not ok:
+            print(f"       expected {expected}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speed", type=float, default=4.0, help="audio delivery vs real time")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Time-to-first-audio: full-reply TTS vs. the sentence-level SpeechPipeline.
+
+Uses fakes.fake_agent_stream / FakePolly / FakeOutput, so it runs offline.
+
+    python -m benchmarks.first_audio --first-token 0.6 --tps 40 --runs 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fakes import FakeOutput, FakePolly, fake_agent_stream
+from speech import SpeechPipeline
+
+
+async def full_reply_turn(polly: FakePolly, first_token: float, tps: float) -> float:
+    """Old behaviour: wait for the whole reply, synthesize it all, then play."""
+    started = time.monotonic()
+    text = "".join([t async for t in fake_agent_stream(first_token_delay=first_token, tokens_per_second=tps)])
+    pcm = await polly.synthesize(text)
+    output = FakeOutput(realtime=False)
+    await output.write(pcm)
+    return output.first_write - started
+
+
+async def streaming_turn(polly: FakePolly, first_token: float, tps: float) -> float:
+    output = FakeOutput(realtime=True)
+    pipeline = SpeechPipeline(polly.synthesize, output)
+    stats = await pipeline.speak(fake_agent_stream(first_token_delay=first_token, tokens_per_second=tps))
+    return stats.time_to_first_audio
+
+
+async def run(args):
+    polly = FakePolly(base_latency=args.tts_latency)
+    full, streamed = [], []
+    for _ in range(args.runs):
+        full.append(await full_reply_turn(polly, args.first_token, args.tps))
+        streamed.append(await streaming_turn(polly, args.first_token, args.tps))
+
+    print(f"first token delay {args.first_token * 1000:.0f} ms, {args.tps:.0f} tokens/s, "
+          f"TTS round trip {args.tts_latency * 1000:.0f} ms, {args.runs} runs")
+    print(f"  full reply  : {statistics.median(full) * 1000:7.0f} ms to first audio")
+    print(f"  streaming   : {statistics.median(streamed) * 1000:7.0f} ms to first audio")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token", type=float, default=0.6, help="seconds until the first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="agent tokens per second")
+    parser.add_argument("--tts-latency", type=float, default=0.15, help="TTS round trip in seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Import-time budget for the entry-point modules.
+
+Each module is imported in a fresh interpreter (--runs times, median). config
+and agent no longer build the boto3 session, Bedrock model and Transcribe/Polly
+clients at import; the "eager" row is what importing config used to cost (boto3
++ session + both clients, + strands' BedrockModel when installed). Also times
+the first config.get_polly_client() call and the cached accesses after it,
+which is what a Streamlit rerun now pays.
+
+Exits non-zero if `import agent` takes longer than --budget-ms.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 50 --runs 9
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER = """
+import boto3
+session = boto3.Session()
+try:
+    from strands.models import BedrockModel
+    BedrockModel(model_id="anthropic.claude-3-5-sonnet-20241022-v2:0", boto_session=session)
+except ImportError:
+    pass
+session.client("transcribe", region_name="us-west-2")
+session.client("polly", region_name="us-west-2")
+"""
+
+FIRST_USE = """
+import config
+started = time.perf_counter()
+config.get_polly_client()
+first = time.perf_counter() - started
+started = time.perf_counter()
+for _ in range(10000):
+    config.polly_client
+print(first * 1000, (time.perf_counter() - started) / 10000 * 1e6)
+"""
+
+
+def timed(code: str) -> list:
+    """Run `code` in a fresh interpreter; return the numbers it prints (ms)."""
+    script = f"import time\nstarted = time.perf_counter()\n{code}\nprint((time.perf_counter() - started) * 1000)"
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))},
+    ).stdout
+    return [float(x) for x in out.split()]
+
+
+def median(code: str, runs: int, index: int = -1) -> float:
+    return statistics.median(timed(code)[index] for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="maximum for `import agent`")
+    parser.add_argument("--modules", nargs="*", default=["config", "agent", "tts_client", "polly"])
+    args = parser.parse_args()
+
+    print(f"import time, median of {args.runs} fresh interpreters")
+    results = {}
+    for module in args.modules:
+        try:
+            results[module] = median(f"import {module}", args.runs)
+            print(f"  {module:12} {results[module]:7.1f} ms")
+        except subprocess.CalledProcessError as e:
+            print(f"  {module:12}   failed: {e.stderr.strip().splitlines()[-1]}")
+    print(f"  {'eager (old)':12} {median(EAGER, args.runs):7.1f} ms  (boto3 session + clients at import)")
+
+    first_ms, warm_us = statistics.median(timed(FIRST_USE)[0] for _ in range(args.runs)), timed(FIRST_USE)[1]
+    print(f"first config.get_polly_client(): {first_ms:.1f} ms; cached config.polly_client: {warm_us:.2f} us")
+
+    agent_ms = results.get("agent")
+    if agent_ms is None or agent_ms > args.budget_ms:
+        print(f"FAIL: import agent over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print(f"ok: import agent {agent_ms:.1f} ms <= {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+MicStream under a slow upstream: memory, lag and losses per overflow policy.
+
+Synthetic mic audio is captured through fakes.FakeInputStream while a consumer
+that takes --send-ms per send_audio_event call (slower than the 20 ms frame
+rate) drains MicStream.generator().
+
+    python -m benchmarks.mic_backpressure --seconds 6 --send-ms 150
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+
+from fakes import FakeInputStream, synthetic_mic_frames
+from transcribe import CHUNK_MS, OVERFLOW_POLICIES, MicStream
+
+
+async def run_policy(policy: str, args) -> dict:
+    frames = list(synthetic_mic_frames([("speech", args.seconds)]))
+    factory = functools.partial(FakeInputStream, frames=frames)
+    max_lag = 0
+    sent_bytes = 0
+    sends = 0
+    async with MicStream(overflow=policy, stream_factory=factory) as mic:
+        async def consume():
+            nonlocal max_lag, sent_bytes, sends
+            async for chunk in mic.generator():
+                max_lag = max(max_lag, mic.lag_frames)
+                sent_bytes += len(chunk)
+                sends += 1
+                await asyncio.sleep(args.send_ms / 1000)  # slow upstream
+
+        consumer = asyncio.create_task(consume())
+        started = time.monotonic()
+        while time.monotonic() - started < args.seconds + 0.1:
+            await asyncio.sleep(0.05)
+    consumer.cancel()
+    return {
+        "policy": policy,
+        "ring_kb": mic._ring.nbytes / 1024,
+        "max_lag_ms": max_lag * CHUNK_MS,
+        "dropped": mic.dropped_frames,
+        "coalesced": mic.coalesced_frames,
+        "batched": mic.batched_frames,
+        "sends": sends,
+        "audio_sent_s": sent_bytes / 2 / mic.samplerate,
+    }
+
+
+async def run(args):
+    print(f"{args.seconds:.0f} s of audio, upstream takes {args.send_ms:.0f} ms per send "
+          f"(frames every {CHUNK_MS} ms)")
+    for policy in OVERFLOW_POLICIES:
+        r = await run_policy(policy, args)
+        print(f"  {r['policy']:12}: ring {r['ring_kb']:.0f} KB, max lag {r['max_lag_ms']:5.0f} ms, "
+              f"dropped {r['dropped']:4}, coalesced {r['coalesced']:4}, batched {r['batched']:4}, "
+              f"{r['sends']:4} sends carrying {r['audio_sent_s']:.1f} s of audio")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--send-ms", type=float, default=150.0, help="upstream time per send")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
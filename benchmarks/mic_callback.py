@@ -0,0 +1,91 @@
+"""
+MicStream callback cost per 20 ms frame: the old copy/astype/tobytes +
+queue.put_nowait callback vs. the current preallocated-ring callback.
+
+Calls the callbacks directly with a fixed int16 block (no audio device) and
+reports mean / p99 time per call and heap allocations per call.
+
+    python -m benchmarks.mic_callback --calls 20000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import numpy as np
+
+from transcribe import CHUNK_SAMPLES, SAMPLE_WIDTH_BYTES, MicStream
+
+
+class LegacyMicStream:
+    """The callback as it was before the ring buffer, for comparison."""
+
+    def __init__(self, chunk_samples=CHUNK_SAMPLES, channels=1):
+        self.chunk_samples = chunk_samples
+        self.channels = channels
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _callback(self, indata, frames, time_info, status):
+        pcm = (indata.copy().astype(np.int16)).tobytes()
+        for start in range(0, len(pcm), self.chunk_samples * SAMPLE_WIDTH_BYTES * self.channels):
+            chunk = pcm[start : start + self.chunk_samples * SAMPLE_WIDTH_BYTES * self.channels]
+            if len(chunk) > 0:
+                try:
+                    self._queue.put_nowait(chunk)
+                except asyncio.QueueFull:
+                    pass
+
+    def drain(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+class RingMicStream(MicStream):
+    def drain(self):
+        self._read_idx = self._write_idx
+
+
+def measure(mic, indata, calls: int) -> dict:
+    timings = np.empty(calls)
+    for i in range(calls):
+        started = time.perf_counter()
+        mic._callback(indata, indata.shape[0], None, None)
+        timings[i] = time.perf_counter() - started
+        if i % 100 == 0:
+            mic.drain()  # the reader keeps up
+    mic.drain()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(1000):
+        mic._callback(indata, indata.shape[0], None, None)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = sum(s.count_diff for s in after.compare_to(before, "filename") if s.count_diff > 0)
+    return {
+        "mean_us": timings.mean() * 1e6,
+        "p99_us": np.percentile(timings, 99) * 1e6,
+        "allocs_per_call": allocations / 1000,
+    }
+
+
+async def run(args):
+    indata = (np.random.default_rng(0).normal(0, 1000, (CHUNK_SAMPLES, 1))).astype(np.int16)
+    legacy = LegacyMicStream()
+    ring = RingMicStream(capacity_frames=2048)
+    ring._loop = asyncio.get_running_loop()
+    for name, mic in (("legacy queue", legacy), ("ring buffer", ring)):
+        r = measure(mic, indata, args.calls)
+        print(f"  {name:13}: {r['mean_us']:6.2f} us/frame mean, {r['p99_us']:6.2f} us p99, "
+              f"{r['allocs_per_call']:.2f} live allocations/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
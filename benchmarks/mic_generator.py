@@ -0,0 +1,87 @@
+"""
+MicStream.generator: per-frame loop overhead and shutdown latency, before and
+after removing the 500 ms wait_for polling.
+
+"polling" reproduces the old generator (asyncio.Queue fed from the audio
+thread, asyncio.wait_for(get(), timeout=0.5) per frame); "event-driven" is the
+current one. Both capture the same synthetic audio through fakes.FakeInputStream.
+
+    python -m benchmarks.mic_generator --seconds 5
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+
+from fakes import FakeInputStream, synthetic_mic_frames
+from transcribe import MicStream
+
+
+class PollingMicStream(MicStream):
+    """Old hand-off: one queue item per frame, timeout polling for close."""
+
+    async def __aenter__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        return await super().__aenter__()
+
+    def _callback(self, indata, frames, time_info, status):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, indata.tobytes())
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._closed.set()  # no wake-up: the generator notices on its next timeout
+        self._stream.stop()
+        self._stream.close()
+
+    async def generator(self):
+        while not self._closed.is_set():
+            try:
+                chunk = await asyncio.wait_for(self._queue.get(), timeout=0.5)
+                yield chunk
+            except asyncio.TimeoutError:
+                continue
+
+
+async def measure(cls, seconds: float) -> dict:
+    frames = list(synthetic_mic_frames([("speech", seconds)]))
+    factory = functools.partial(FakeInputStream, frames=frames)
+    sends = 0
+    mic = cls(stream_factory=factory)
+
+    async def consume():
+        nonlocal sends
+        async for _ in mic.generator():
+            sends += 1
+
+    cpu_started = time.process_time()
+    async with mic:
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(seconds + 0.05)
+        cpu = time.process_time() - cpu_started
+        closing = time.monotonic()
+    await consumer
+    shutdown = time.monotonic() - closing
+    return {
+        "cpu_per_frame_us": cpu / len(frames) * 1e6,
+        "sends": sends,
+        "frames": len(frames),
+        "shutdown_ms": shutdown * 1000,
+    }
+
+
+async def run(args):
+    print(f"{args.seconds:.0f} s of 20 ms frames")
+    for name, cls in (("polling", PollingMicStream), ("event-driven", MicStream)):
+        r = await measure(cls, args.seconds)
+        print(f"  {name:12}: {r['cpu_per_frame_us']:6.1f} us CPU/frame (process-wide), "
+              f"{r['sends']} sends for {r['frames']} frames, shutdown {r['shutdown_ms']:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Hot-path profiling hooks (profiling.py): what they cost the audio callbacks, and that they report.
+
+- cost: transcribe.MicStream's and playback.AudioOutput's callbacks called
+  directly, bare vs. wrapped by Profiler.wrap_callback, per 20 ms block.
+  Disabled, wrap_callback must hand back the callback itself.
+- live: synthetic mic audio through fakes.FakeInputStream (flagging an input
+  overflow every --flag-every blocks) and a reply through fakes.FakeOutputStream,
+  while the event loop is blocked once for --stall-ms. Checks the callback
+  histograms, status counts, loop lag, speaker queue depth, the /metrics text,
+  the periodic log line, /profile?seconds=N stacks and the SIGUSR1 dump, with a
+  thread rendering the metrics non-stop meanwhile (it must never fail).
+
+Exits non-zero on failure.
+
+    python -m benchmarks.profiling_hooks
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from fakes import FakeInputStream, FakeOutputStream, generate_pcm, synthetic_mic_frames
+from playback import AudioOutput
+from profiling import Profiler
+from transcribe import CHUNK_SAMPLES, MicStream
+
+BLOCK_S = CHUNK_SAMPLES / 16000
+
+
+class Flags:
+    """sounddevice.CallbackFlags stand-in."""
+
+    def __init__(self, **flags):
+        self.__dict__.update(flags)
+
+    def __bool__(self):
+        return any(self.__dict__.values())
+
+
+def report(ok: bool, text: str) -> int:
+    print(f"  {'PASS' if ok else 'FAIL'} {text}")
+    return not ok
+
+
+def _spin(stop: threading.Event):
+    """Busy thread the sampling profiler has to find."""
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def _scrape(profiler: Profiler, stop: threading.Event, errors: list):
+    """What /metrics and the log line do, as fast as possible, while the audio threads and the loop update."""
+    while not stop.is_set():
+        try:
+            profiler.prometheus()
+            profiler.describe()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+
+# ---------- Cost ----------
+
+def per_call_ns(callback, args, calls: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        callback(*args)
+    return (time.perf_counter_ns() - started) / calls
+
+
+def cost(args) -> int:
+    failures = 0
+    profiler = Profiler()
+    mic = MicStream(profiler=profiler)
+    indata = np.zeros((CHUNK_SAMPLES, 1), dtype=np.int16)
+    output = AudioOutput(stream_factory=FakeOutputStream, profiler=profiler)
+    output._ring.write(np.zeros(output._ring.capacity, dtype=np.int16))
+    output._primed = True
+    outdata = np.zeros((output.blocksize, 1), dtype=np.int16)
+    for name, callback, data in (("mic", mic._callback, indata), ("speaker", output._callback, outdata)):
+        call = (data, data.shape[0], None, None)
+        per_call_ns(callback, call, 1000)  # warm up
+        bare = min(per_call_ns(callback, call, args.calls) for _ in range(3))
+        timed = min(per_call_ns(profiler.wrap_callback(name, callback), call, args.calls) for _ in range(3))
+        share = (timed - bare) / (BLOCK_S * 1e9)
+        failures += report(share < 0.001, f"{name:7} callback {bare / 1000:5.2f} us bare, {timed / 1000:5.2f} us timed: "
+                           f"+{(timed - bare) / 1000:.2f} us = {share * 100:.4f}% of a 20 ms block (budget 0.1%)")
+    off = Profiler(enabled=False)
+    failures += report(off.wrap_callback("mic", mic._callback) == mic._callback, "disabled: callbacks run unwrapped")
+    return failures
+
+
+# ---------- Live ----------
+
+async def live(args, directory: str) -> int:
+    profiler = Profiler(port=0, log_interval=0.5, profile_dir=directory)
+    frames = list(synthetic_mic_frames([("silence", 0.5), ("speech", 1.5), ("silence", 1.0)]))
+    calls = 0
+
+    def flagging(callback):
+        def inject(indata, frames, time_info, status):
+            nonlocal calls
+            calls += 1
+            callback(indata, frames, time_info, Flags(input_overflow=calls % args.flag_every == 0))
+
+        return inject
+
+    def input_factory(samplerate, channels, dtype, callback, blocksize):
+        return FakeInputStream(samplerate, channels, dtype, flagging(callback), blocksize, frames=frames)
+
+    stop_spin = threading.Event()
+    threading.Thread(target=_spin, args=(stop_spin,), name="busy", daemon=True).start()
+    scrape_errors = []
+    threading.Thread(target=_scrape, args=(profiler, stop_spin, scrape_errors), name="scraper", daemon=True).start()
+    log = io.StringIO()
+    loop = asyncio.get_running_loop()
+    with contextlib.redirect_stderr(log):
+        profiler.start()
+        output = AudioOutput(stream_factory=FakeOutputStream, profiler=profiler)
+        async with MicStream(stream_factory=input_factory, profiler=profiler) as mic:
+            async def consume():
+                async for _ in mic.generator():
+                    pass
+
+            consumer = asyncio.ensure_future(consume())
+            speaking = asyncio.ensure_future(output.write(generate_pcm("A reply long enough to queue a couple of seconds.")))
+            profile = loop.run_in_executor(None, lambda: urllib.request.urlopen(
+                f"http://127.0.0.1:{profiler.port}/profile?seconds=1", timeout=10).read().decode())
+            os.kill(os.getpid(), signal.SIGUSR1)  # start the sampler
+            await asyncio.sleep(1.0)
+            time.sleep(args.stall_ms / 1000)  # a blocking call on the loop
+            await asyncio.sleep(1.0)
+            os.kill(os.getpid(), signal.SIGUSR1)  # dump it
+            await asyncio.sleep(0.1)
+            await speaking
+            await loop.run_in_executor(None, mic._stream.finished.wait)
+            await asyncio.sleep(0.1)
+            consumer.cancel()
+            metrics = await loop.run_in_executor(None, lambda: urllib.request.urlopen(
+                f"http://127.0.0.1:{profiler.port}/metrics", timeout=10).read().decode())
+            profile = await profile
+        await output.drain()
+        output.close()
+        profiler.close()
+    stop_spin.set()
+
+    failures = 0
+    mic_h, speaker_h = profiler.callbacks["mic"], profiler.callbacks["speaker"]
+    failures += report(mic_h.count == len(frames) and speaker_h.count > 0,
+                       f"callback histograms: mic {mic_h.count} calls (of {len(frames)} blocks) p99 "
+                       f"{mic_h.quantile(0.99) * 1e6:.0f} us, speaker {speaker_h.count} calls p99 {speaker_h.quantile(0.99) * 1e6:.0f} us")
+    overflows = profiler.status["mic", "input_overflow"]
+    failures += report(overflows == len(frames) // args.flag_every, f"status flags: {overflows} mic input overflows counted "
+                       f"(injected {len(frames) // args.flag_every})")
+    lag = profiler.loop_lag
+    failures += report(lag.max >= args.stall_ms / 1000 * 0.8,
+                       f"loop lag: max {lag.max * 1000:.0f} ms after a {args.stall_ms:.0f} ms stall, p50 {lag.quantile(0.5) * 1000:.0f} ms "
+                       f"over {lag.count} probes")
+    speaker_max = profiler._queue_max.get("speaker", 0.0)
+    failures += report(speaker_max >= 0.2, f"queue depth: speaker max {speaker_max * 1000:.0f} ms, "
+                       f"mic max {profiler._queue_max.get('mic', 0.0) * 1000:.0f} ms")
+    wanted = ['voice_audio_callback_seconds_count{stream="mic"}', 'voice_audio_status_total{stream="mic",flag="input_overflow"}',
+              'voice_event_loop_lag_seconds_bucket{le="+Inf"}', 'voice_queue_depth_seconds{queue="mic"}',
+              'voice_queue_depth_max_seconds{queue="speaker"}']
+    missing = [w for w in wanted if w not in metrics]
+    failures += report(not missing, f"/metrics: {len(metrics.splitlines())} lines of Prometheus text"
+                       + (f", missing {missing}" if missing else ""))
+    lines = [line for line in log.getvalue().splitlines() if line.startswith("[profile]") and "callback" in line]
+    failures += report(len(lines) >= 3, f"log line: {len(lines)} periodic lines, e.g. {lines[-1] if lines else None!r}")
+    found = "_spin (profiling_hooks.py" in profile and all(line.rsplit(" ", 1)[1].isdigit() for line in profile.splitlines())
+    failures += report(found, f"/profile?seconds=1: {len(profile.splitlines())} folded stacks, busy thread "
+                       f"{'found' if found else 'not found'}")
+    dumps = [name for name in os.listdir(directory) if name.endswith(".folded")]
+    dumped = open(os.path.join(directory, dumps[0])).read() if dumps else ""
+    failures += report(len(dumps) == 1 and "_spin (profiling_hooks.py" in dumped,
+                       f"SIGUSR1: {len(dumps)} dump(s), {len(dumped.splitlines())} folded stacks")
+    failures += report(not scrape_errors, f"concurrent scraping: {len(scrape_errors)} error(s)"
+                       + (f", e.g. {scrape_errors[0]}" if scrape_errors else ""))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000, help="callback calls per cost measurement")
+    parser.add_argument("--flag-every", type=int, default=25, help="mic blocks per injected input overflow")
+    parser.add_argument("--stall-ms", type=float, default=200.0, help="how long the loop is blocked once")
+    args = parser.parse_args()
+    failures = cost(args)
+    with tempfile.TemporaryDirectory() as directory:
+        failures += asyncio.run(live(args, directory))
+    print(f"{failures} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Load test for server.VoiceServer: N simulated clients talking at once.
+
+The server runs in its own process on local fakes: fakes.FakeTranscribeClient
+(streaming Transcribe stand-in, EnergyRecognizer transcripts), fakes.FakePolly
+and a fakes.FakeAgent per session, behind the server's global concurrency
+limits (--bedrock/--transcribe/--polly concurrency, and at most --max-sessions
+connections; all default to config.py's shipped SERVER_* values, and the
+default levels end at the session cap). Each client connects over
+WebSocket and replays a WAV file in real time (x --speed) as 100 ms audio
+messages; every reply carries its turn latency, final transcript to first
+reply audio on the wire. Clients start spread over --ramp seconds.
+
+For each --sessions level it reports p50/p95 turn latency, the server process's
+CPU use and sessions per core (sessions / cores busy). First, malformed clients
+(text that is not JSON, a bad sample_rate, invalid UTF-8, a ?session= id the
+server did not issue) must each get an error and be disconnected, a client
+reconnecting with its issued id must be let in, a client sending odd-length
+audio messages must
+still get every reply, and every session slot must come back. Exits non-zero
+when a session fails, a final gets no reply, or p95 exceeds --p95-budget-ms.
+
+    python -m benchmarks.server_load
+    python -m benchmarks.server_load --sessions 8 32 64 --max-sessions 64
+    python -m benchmarks.server_load --wav samples/question.wav --sessions 16
+"""
+
+import argparse
+import asyncio
+import functools
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import wave
+
+import numpy as np
+
+from batch_transcribe import decode_audio
+from fakes import synthetic_mic_frames
+from server import OP_TEXT, connect
+
+SAMPLE_RATE = 16000
+UTTERANCES = [("silence", 0.5), ("speech", 0.95), ("silence", 3.0), ("speech", 0.65), ("silence", 3.0), ("speech", 1.25), ("silence", 3.0)]  # off word boundaries (fakes.EnergyRecognizer: 10 frames)
+
+
+def synthetic_wav() -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(b"".join(synthetic_mic_frames(UTTERANCES)))
+    return buf.getvalue()
+
+
+# ---------- Server process ----------
+
+def fake_server(first_token_delay: float, **limits):
+    """server.VoiceServer on the fakes (also what benchmarks/worker_scaling.py runs in each worker)."""
+    from fakes import FakeAgent, FakePolly, FakeTranscribeClient
+    from server import VoiceServer
+    from stt import AWSTranscribeBackend
+
+    stt = AWSTranscribeBackend(client_factory=functools.partial(FakeTranscribeClient, setup_delay=0.15, connect_delay=0.0))
+    agent_factory = functools.partial(FakeAgent, first_token_delay=first_token_delay)
+    return VoiceServer(stt=stt, tts=FakePolly(), agent_factory=agent_factory, **limits)
+
+
+async def _serve(conn, options: dict):
+    server = await fake_server(options["first_token_delay"], **options["limits"]).start()
+    conn.send(server.port)
+    loop = asyncio.get_running_loop()
+    while True:
+        command = await loop.run_in_executor(None, conn.recv)
+        if command == "stop":
+            break
+        if command == "cpu":
+            conn.send((time.process_time(), time.monotonic()))
+        elif command == "stats":
+            conn.send(server.stats())
+            server.turn_latencies.clear()
+    await server.close()
+
+
+def serve(conn, options: dict):
+    asyncio.run(_serve(conn, options))
+
+
+# ---------- Clients ----------
+
+async def client(
+    port: int, pcm: bytes, delay: float, speed: float, chunk_ms: int, timeout: float,
+    rate: int = SAMPLE_RATE, path: str = "/", chunk_bytes: int = None,
+) -> dict:
+    """Replay `pcm` (int16 at `rate`) as one caller; turn counts, latencies and errors."""
+    await asyncio.sleep(delay)
+    result = {"finals": 0, "replies": 0, "latencies": [], "errors": [], "worker": None, "session": None}
+    ws = await connect("127.0.0.1", port, path)
+
+    async def receive():
+        while True:
+            message = await ws.recv()
+            if message is None:
+                result["errors"].append("connection closed before done")
+                return
+            if isinstance(message, bytes):
+                continue  # reply audio
+            event = json.loads(message)
+            if event["type"] == "session":
+                result["session"] = event["session"]
+                result["worker"] = event.get("worker")  # workers.WorkerFrontEnd's routing
+            elif event["type"] == "final":
+                result["finals"] += 1
+            elif event["type"] == "reply":
+                result["replies"] += 1
+                if event["first_audio_ms"] is not None:
+                    result["latencies"].append(event["first_audio_ms"])
+            elif event["type"] == "error":
+                result["errors"].append(event["text"])
+            elif event["type"] == "done":
+                return
+
+    receiver = asyncio.create_task(receive())
+    try:
+        await ws.send_json(type="start", sample_rate=rate)
+        chunk = chunk_bytes or rate * 2 * chunk_ms // 1000
+        started = time.monotonic()
+        for i, offset in enumerate(range(0, len(pcm), chunk)):
+            await asyncio.sleep(max(0.0, started + i * chunk / 2 / rate / speed - time.monotonic()))
+            await ws.send(pcm[offset : offset + chunk])
+        await ws.send_json(type="end")
+        await asyncio.wait_for(receiver, timeout)
+    except Exception as e:
+        result["errors"].append(f"{type(e).__name__}: {e}")
+    finally:
+        receiver.cancel()
+        await ws.close()
+    return result
+
+
+MALFORMED = [
+    ("not JSON", "hello"),
+    ("JSON list", "[1, 2]"),
+    ("sample_rate string", json.dumps({"type": "start", "sample_rate": "fast"})),
+    ("sample_rate 0", json.dumps({"type": "start", "sample_rate": 0})),
+    ("invalid UTF-8", b"\xff\xfe"),
+    ("client-chosen id", None, "/?session=caller-1"),
+    ("forged id", None, "/?session=0123456789abcdef0123456789abcdef.0123456789abcdef0123456789abcdef"),
+]
+
+
+async def malformed(port: int, message, path: str = "/", timeout: float = 5.0) -> bool:
+    """Send one bad message (or none, for a bad `path`): the server must disconnect, with an error event for parseable text."""
+    ws = await connect("127.0.0.1", port, path)
+    if isinstance(message, bytes):
+        await ws._send_frame(OP_TEXT, message)
+    elif message is not None:
+        await ws.send(message)
+    errors = 0
+    try:
+        while (reply := await asyncio.wait_for(ws.recv(), timeout)) is not None:
+            errors += isinstance(reply, str) and json.loads(reply)["type"] == "error"
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        await ws.close()
+    return bool(errors) or isinstance(message, bytes)
+
+
+async def check_malformed(conn, port: int, pcm: bytes, args) -> int:
+    failures = 0
+    for name, message, *path in MALFORMED:
+        ok = await malformed(port, message, *path)
+        failures += not ok
+        print(f"  {'PASS' if ok else 'FAIL'} malformed: {name:18} -> {'error and disconnect' if ok else 'still connected'}")
+    audio_s = len(pcm) / 2 / SAMPLE_RATE
+    timeout = audio_s / args.speed + 30
+    even = await client(port, pcm, 0, args.speed, args.chunk_ms, timeout)
+    odd = await client(port, pcm, 0, args.speed, args.chunk_ms, timeout, chunk_bytes=SAMPLE_RATE * 2 * args.chunk_ms // 1000 + 1)
+    ok = not odd["errors"] and odd["finals"] == even["finals"] and odd["replies"] == even["replies"]
+    failures += not ok
+    print(f"  {'PASS' if ok else 'FAIL'} odd-length audio messages: {odd['finals']} finals, {odd['replies']} replies "
+          f"(even: {even['finals']}, {even['replies']}){', ' + odd['errors'][0] if odd['errors'] else ''}")
+    again = await client(port, pcm[: SAMPLE_RATE * 2], 0, args.speed, args.chunk_ms, timeout, path=f"/?session={even['session']}")
+    ok = even["session"] is not None and again["session"] == even["session"] and not again["errors"]
+    failures += not ok
+    print(f"  {'PASS' if ok else 'FAIL'} reconnect with the issued session id: {'let in' if ok else again['errors'] or 'new id'}")
+    await asyncio.sleep(0.5)
+    active = request(conn, "stats")["active_sessions"]
+    failures += active != 0
+    print(f"  {'PASS' if not active else 'FAIL'} {active} sessions still open afterwards")
+    return failures
+
+
+def request(conn, command: str):
+    conn.send(command)
+    return conn.recv()
+
+
+async def run_level(conn, port: int, pcm: bytes, sessions: int, args) -> bool:
+    rng = random.Random(sessions)
+    audio_s = len(pcm) / 2 / SAMPLE_RATE
+    cpu0, wall0 = request(conn, "cpu")
+    results = await asyncio.gather(*(
+        client(port, pcm, rng.uniform(0, args.ramp), args.speed, args.chunk_ms, audio_s / args.speed + 30)
+        for _ in range(sessions)
+    ))
+    cpu1, wall1 = request(conn, "cpu")
+    stats = request(conn, "stats")
+
+    latencies = np.array([x for r in results for x in r["latencies"]])
+    finals = sum(r["finals"] for r in results)
+    errors = [e for r in results for e in r["errors"]]
+    silent = finals - latencies.size  # finals without a spoken reply (failed, or cut off by the next final)
+    cores = (cpu1 - cpu0) / (wall1 - wall0)
+    p50, p95 = (np.percentile(latencies, [50, 95]) if latencies.size else (float("nan"), float("nan")))
+    ok = not errors and finals and not silent and (args.p95_budget_ms is None or p95 <= args.p95_budget_ms)
+    print(f"  {'PASS' if ok else 'FAIL'} {sessions:4d} sessions: {finals} turns, turn latency p50 {p50:4.0f} ms  p95 {p95:4.0f} ms, "
+          f"server CPU {cores * 100:5.1f}% of a core -> {sessions / max(cores, 1e-9):6.0f} sessions per core; "
+          f"{silent} turns without a reply, {stats['dropped_chunks']} audio chunks dropped")
+    for error in errors[:3]:
+        print(f"       error: {error}")
+    return bool(ok)
+
+
+async def run(args, conn, port: int) -> int:
+    wav = open(args.wav, "rb").read() if args.wav else synthetic_wav()
+    pcm = decode_audio(wav).tobytes()
+    print(f"replaying {len(pcm) / 2 / SAMPLE_RATE:.1f} s of audio per client at {args.speed:g}x real time; "
+          f"{os.cpu_count()} CPU(s), server on port {port}")
+    failures = await check_malformed(conn, port, pcm, args)
+    for sessions in args.sessions:
+        failures += not await run_level(conn, port, pcm, sessions, args)
+    return failures
+
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[8, 32, config.server_max_sessions],
+                        help="concurrent clients per run")
+    parser.add_argument("--wav", help="WAV file each client replays (default: synthetic speech, 3 questions)")
+    parser.add_argument("--speed", type=float, default=1.0, help="audio delivery vs real time")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="audio per WebSocket message")
+    parser.add_argument("--ramp", type=float, default=2.0, help="spread client starts over this many seconds")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="fake agent time to first token")
+    parser.add_argument("--max-sessions", type=int, default=config.server_max_sessions, help="connections at once")
+    parser.add_argument("--bedrock-concurrency", type=int, default=config.server_bedrock_concurrency,
+                        help="agent turns at once, all sessions")
+    parser.add_argument("--transcribe-concurrency", type=int, default=config.server_transcribe_concurrency,
+                        help="STT streams at once")
+    parser.add_argument("--polly-concurrency", type=int, default=config.server_polly_concurrency, help="TTS calls at once")
+    parser.add_argument("--p95-budget-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    # spawn, not fork: the server process runs its own event loop and agent threads.
+    context = multiprocessing.get_context("spawn")
+    conn, child_conn = context.Pipe()
+    limits = dict(
+        max_sessions=args.max_sessions,
+        bedrock_concurrency=args.bedrock_concurrency,
+        transcribe_concurrency=args.transcribe_concurrency,
+        polly_concurrency=args.polly_concurrency,
+    )
+    options = {"limits": limits, "first_token_delay": args.first_token_delay}
+    process = context.Process(target=serve, args=(child_conn, options), daemon=True)
+    process.start()
+    try:
+        failures = asyncio.run(run(args, conn, conn.recv()))
+    finally:
+        conn.send("stop")
+        process.join(5)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+STT backend conformance checks: every stt.STTBackend must pass these.
+
+- silence: no final transcript, results() ends after end()
+- utterance: partials, then exactly one non-empty final with the same result id
+- two utterances: two finals, in order, with distinct result ids
+- chunking: 20 ms, 100 ms and odd-sized chunks give the same finals
+- concurrent: parallel streams don't mix (backends with concurrent=True)
+- abandon: close() without end() is clean, and the backend keeps working
+- failed start: a recognizer that fails to load leaves no worker slot taken
+  (LocalSTTBackend)
+
+Runs against Amazon Transcribe's adapter on the local fake endpoint (new stream
+per start, and a pre-warmed TranscribeSession) and LocalSTTBackend's worker
+pool with fakes.EnergyRecognizer. Add Vosk with --vosk-model (and --wav with
+real speech, since Vosk doesn't hear words in synthetic audio). Exits non-zero
+on any failure.
+
+    python -m benchmarks.stt_conformance
+    python -m benchmarks.stt_conformance --vosk-model models/vosk-model-small-en-us-0.15 --wav hello.wav
+"""
+
+import argparse
+import asyncio
+import functools
+import sys
+import time
+import wave
+
+from fakes import EnergyRecognizer, FakeTranscribeClient, synthetic_mic_frames
+from stt import AWSTranscribeBackend, LocalSTTBackend, VoskRecognizer
+from transcribe_session import TranscribeSession
+
+FRAME_BYTES = 640  # 20 ms
+
+
+def silence(seconds: float) -> bytes:
+    return b"".join(synthetic_mic_frames([("silence", seconds)]))
+
+
+async def transcribe(backend, audio: bytes, chunk_bytes: int = FRAME_BYTES, timeout: float = 10.0):
+    """Send `audio` through one stream; return (results, start_ms)."""
+    started = time.monotonic()
+    stream = await backend.start()
+    start_ms = (time.monotonic() - started) * 1000
+    results = []
+
+    async def collect():
+        async for result in stream.results():
+            results.append(result)
+
+    collector = asyncio.create_task(collect())
+    try:
+        for offset in range(0, len(audio), chunk_bytes):
+            await stream.send(audio[offset : offset + chunk_bytes])
+        await stream.end()
+        await asyncio.wait_for(collector, timeout)
+    finally:
+        collector.cancel()
+        await stream.close()
+    return results, start_ms
+
+
+def finals(results):
+    return [r.text for r in results if not r.is_partial]
+
+
+async def check_backend(backend, speech: bytes, timeout: float):
+    """Yield (check, ok, detail) for one backend."""
+    utterance = silence(0.3) + speech + silence(1.0)
+
+    try:
+        results, start_ms = await transcribe(backend, silence(1.0), timeout=timeout)
+        yield "silence", not [t for t in finals(results) if t.strip()], f"start {start_ms:.0f} ms, finals {finals(results)}"
+    except asyncio.TimeoutError:
+        yield "silence", False, "results() did not end after end()"
+
+    results, _ = await transcribe(backend, utterance, timeout=timeout)
+    final = [r for r in results if not r.is_partial]
+    partial_ids = {r.result_id for r in results if r.is_partial}
+    ok = (
+        len(final) == 1
+        and final[0].text.strip() != ""
+        and not results[-1].is_partial
+        and partial_ids <= {final[0].result_id}
+        and len(partial_ids) == 1
+    )
+    yield "utterance", ok, f"{len(results) - len(final)} partials, finals {[r.text for r in final]}"
+    expected = finals(results)
+
+    results, _ = await transcribe(backend, utterance + utterance, timeout=timeout)
+    ids = [r.result_id for r in results if not r.is_partial]
+    ok = finals(results) == expected * 2 and len(set(ids)) == 2
+    yield "two utterances", ok, f"finals {finals(results)}"
+
+    chunkings = {}
+    for chunk_bytes in (FRAME_BYTES, 5 * FRAME_BYTES, 226):
+        results, _ = await transcribe(backend, utterance, chunk_bytes=chunk_bytes, timeout=timeout)
+        chunkings[chunk_bytes] = finals(results)
+    ok = all(f == expected for f in chunkings.values())
+    yield "chunking", ok, ", ".join(f"{n} B: {f}" for n, f in chunkings.items())
+
+    if backend.concurrent:
+        runs = await asyncio.gather(*(transcribe(backend, utterance * (i + 1), timeout=timeout) for i in range(3)))
+        got = [finals(results) for results, _ in runs]
+        ok = got == [expected * (i + 1) for i in range(3)]
+        yield "concurrent", ok, f"finals per stream {[len(f) for f in got]}"
+    else:
+        yield "concurrent", True, "skipped (one stream at a time)"
+
+    stream = await backend.start()
+    await stream.send(speech[: len(speech) // 2])
+    await stream.close()
+    results, _ = await transcribe(backend, utterance, timeout=timeout)
+    yield "abandon", finals(results) == expected, "close() without end(), then a new stream"
+
+
+def broken_recognizer():
+    raise RuntimeError("model failed to load")
+
+
+async def check_failed_start() -> tuple:
+    backend = LocalSTTBackend(broken_recognizer, workers=1)
+    try:
+        for _ in range(3):
+            try:
+                await backend.start()
+            except RuntimeError:
+                pass
+        active = backend.stats()["active"]
+        return active == 0, f"3 failed start()s, {active} slot(s) still taken"
+    finally:
+        backend.close()
+
+
+def load_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != 16000 or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise SystemExit(f"{path}: expected 16 kHz mono int16")
+        return w.readframes(w.getnframes())
+
+
+async def run(args):
+    synthetic = b"".join(synthetic_mic_frames([("speech", 1.2)]))
+    fast = functools.partial(FakeTranscribeClient, setup_delay=0.02, connect_delay=0.05)
+    session = TranscribeSession(client_factory=fast, drain_s=3.0).start()
+    backends = [
+        ("aws (fake endpoint)", AWSTranscribeBackend(client_factory=fast), synthetic),
+        ("aws session (fake endpoint)", AWSTranscribeBackend(session=session), synthetic),
+        ("local (EnergyRecognizer)", LocalSTTBackend(EnergyRecognizer), synthetic),
+    ]
+    if args.vosk_model:
+        speech = load_wav(args.wav) if args.wav else synthetic
+        backends.append(("local (vosk)", LocalSTTBackend(functools.partial(VoskRecognizer, args.vosk_model)), speech))
+
+    failures = 0
+    for name, backend, speech in backends:
+        print(name)
+        try:
+            async for check, ok, detail in check_backend(backend, speech, args.timeout):
+                failures += not ok
+                print(f"  {'PASS' if ok else 'FAIL'} {check:15} {detail}")
+        except Exception as e:
+            failures += 1
+            print(f"  FAIL {type(e).__name__}: {e}")
+        finally:
+            backend.close()
+    print("local (failing recognizer)")
+    ok, detail = await check_failed_start()
+    failures += not ok
+    print(f"  {'PASS' if ok else 'FAIL'} {'failed start':15} {detail}")
+    print(f"{failures} failure(s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vosk-model", help="path to a Vosk model directory")
+    parser.add_argument("--wav", help="16 kHz mono speech to use for the Vosk checks")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
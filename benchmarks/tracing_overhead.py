@@ -0,0 +1,166 @@
+"""
+Turn tracing (tracing.py) end to end, and what it costs.
+
+Synthetic speech (fakes.synthetic_mic_frames) is fed in real time through
+transcribe.stream_to_transcribe with the VAD and fakes.FakeTranscribeClient;
+each final starts a reply through AgentRunner (fakes.FakeAgent) and
+SpeechPipeline (fakes.FakePolly into fakes.FakeOutput), like main.py. Runs
+with the VAD's early final and with Transcribe's own final. Checks, exiting
+non-zero on failure:
+
+- every reply's turn has all nine stages, in causal order, and its JSONL line
+  parses with a root span and one child span per interval.
+- tracing CPU per turn (timed over --turns synthetic turns, JSONL included)
+  is under 1% of the CPU the traced pipeline spends per turn.
+
+Prints the p50/p95/p99 summary per interval, as main.py does on exit.
+
+    python -m benchmarks.tracing_overhead
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import tracing
+from agent_runner import AgentRunner
+from fakes import FakeAgent, FakeOutput, FakePolly, FakeTranscribeClient, synthetic_mic_frames
+from speech import SpeechPipeline
+from stt import AWSTranscribeBackend
+from transcribe import stream_to_transcribe
+from vad import VoiceActivityDetector
+
+REPLY = "Sure. It's a quarter past three."
+UTTERANCES = [("silence", 0.5)] + [("speech", 0.95), ("silence", 3.0), ("speech", 0.65), ("silence", 3.0)] * 2
+ORDER = [  # (earlier, later) stage pairs every turn must satisfy
+    ("speech_end", "final"), ("last_partial", "final"), ("final", "agent_start"), ("agent_start", "first_token"),
+    ("first_token", "agent_done"), ("first_token", "first_tts_byte"), ("first_tts_byte", "playback_start"),
+    ("playback_start", "playback_end"),
+]
+
+
+class PacedFrames:
+    """MicStream stand-in: prerecorded 20 ms frames at real-time pace."""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def generator(self):
+        started = time.monotonic()
+        for i, frame in enumerate(self.frames):
+            await asyncio.sleep(max(0.0, started + i * 0.02 - time.monotonic()))
+            yield frame
+
+
+async def conversation(tracer: tracing.Tracer, early_final: bool) -> list:
+    """Run the synthetic conversation; the SpeechStats of every reply."""
+    runner = AgentRunner(FakeAgent(reply=REPLY, first_token_delay=0.3))
+    speaker = SpeechPipeline(FakePolly().synthesize, FakeOutput())
+    backend = AWSTranscribeBackend(client_factory=functools.partial(FakeTranscribeClient, connect_delay=0.0))
+    replies, tasks = [], []
+
+    async def respond(text):
+        replies.append(await speaker.speak(runner.stream(text)))
+
+    async def on_final(text):
+        tasks.append(asyncio.ensure_future(respond(text)))
+
+    try:
+        await stream_to_transcribe(
+            PacedFrames(list(synthetic_mic_frames(UTTERANCES))),
+            on_final=on_final, vad=VoiceActivityDetector(), early_final=early_final, backend=backend, tracer=tracer,
+        )
+        await asyncio.gather(*tasks)
+    finally:
+        runner.close()
+    return replies
+
+
+def check_turns(replies, path: str) -> list:
+    problems = []
+    for i, stats in enumerate(replies):
+        stamps = stats.trace.stamps
+        missing = [s for s in tracing.STAGES if s not in stamps]
+        if missing:
+            problems.append(f"turn {i}: missing {missing}")
+        problems += [f"turn {i}: {a} after {b}" for a, b in ORDER if a in stamps and b in stamps and stamps[a] > stamps[b]]
+    with open(path) as f:
+        events = [json.loads(line) for line in f]
+    if len(events) != len(replies):
+        problems.append(f"{len(events)} JSONL lines for {len(replies)} turns")
+    for event in events:
+        spans = event["spans"]
+        if spans[0]["name"] != "voice.turn" or any(s["parentSpanId"] != spans[0]["spanId"] for s in spans[1:]):
+            problems.append(f"bad span tree in {event['trace_id']}")
+        if len(spans) != len(event["intervals_ms"]):  # "turn" is the root, every other interval a child
+            problems.append(f"{len(spans) - 1} child spans for {len(event['intervals_ms'])} intervals")
+    return problems
+
+
+def tracing_cost_us(path: str, turns: int) -> float:
+    """CPU per turn for the tracing calls one traced turn makes, JSONL line included."""
+    tracer = tracing.Tracer(path)
+    started = time.thread_time()
+    with tracing.stream_turns(tracer) as stream:
+        for i in range(turns):
+            result_id = f"r{i}"
+            for _ in range(5):
+                stream.partial(result_id)
+            stream.speech_end(result_id)
+            with tracing.use(stream.final(result_id, "What time is it?")) as turn:
+                trace = tracing.current()
+                for stage in ("agent_start", "first_token", "first_token", "agent_done"):
+                    trace.mark(stage)
+                for stage in ("first_tts_byte", "playback_start", "playback_end"):
+                    trace.mark(stage)
+                turn.finish()
+    elapsed = time.thread_time() - started
+    tracer.close()
+    return elapsed / turns * 1e6
+
+
+async def run(args) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        summary_tracer = None
+        for early_final in (True, False):
+            label = "VAD early final" if early_final else "Transcribe final"
+            path = os.path.join(tmp, f"traces-{early_final}.jsonl")
+            tracer = tracing.Tracer(path)
+            cpu = time.process_time()
+            replies = await conversation(tracer, early_final)
+            cpu_per_turn = (time.process_time() - cpu) / max(len(replies), 1)
+            tracer.close()
+            problems = check_turns(replies, path)
+            failures += bool(problems) or not replies
+            print(f"  {'PASS' if not problems and replies else 'FAIL'} {label}: {len(replies)} turns traced, all nine stages "
+                  f"in order, {os.path.getsize(path) / max(len(replies), 1):.0f} bytes of JSONL per turn; "
+                  f"pipeline CPU {cpu_per_turn * 1000:.1f} ms per turn")
+            for problem in problems[:5]:
+                print(f"       {problem}")
+            summary_tracer = summary_tracer or (tracer, cpu_per_turn)
+
+        tracer, cpu_per_turn = summary_tracer
+        print("\n" + tracer.format_summary() + "\n")
+        cost = tracing_cost_us(os.path.join(tmp, "cost.jsonl"), args.turns)
+        share = cost / (cpu_per_turn * 1e6)
+        ok = share < 0.01
+        failures += not ok
+        print(f"  {'PASS' if ok else 'FAIL'} tracing CPU {cost:.0f} us per turn = {share * 100:.2f}% of the pipeline's "
+              f"{cpu_per_turn * 1000:.1f} ms per turn (budget 1%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20000, help="synthetic turns for the cost measurement")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
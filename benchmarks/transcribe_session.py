@@ -0,0 +1,142 @@
+"""
+Transcribe setup cost per recording, and recovery, with and without a persistent session.
+
+Runs against fakes.FakeTranscribeClient (a local fake streaming endpoint with
+connect + stream setup latency, idle timeout and injected failures):
+
+- per-recording: stream_to_transcribe opening a new client and stream each time,
+  as the Streamlit apps did; record-press -> streaming is the setup time.
+- session: transcribe_session.TranscribeSession, warmed before the first press,
+  kept alive across idle gaps longer than the fake's idle timeout, rotated
+  between recordings.
+- failover: the stream breaks mid-utterance; the session reconnects and replays,
+  and the recording must still produce the same final transcript.
+- shared: two users record at the same time on one session; the second must
+  get a fresh stream rather than take the warm one from the first, and both
+  recordings must produce the full final transcript.
+
+    python -m benchmarks.transcribe_session --recordings 5
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from fakes import FakeTranscribeClient, synthetic_mic_frames
+from transcribe import CHUNK_MS, stream_to_transcribe
+from transcribe_session import TranscribeSession
+
+UTTERANCE = [("silence", 0.3), ("speech", 1.2), ("silence", 0.7)]
+
+
+class FramesSource:
+    """MicStream stand-in: yields prerecorded frames, `speed` x real time."""
+
+    def __init__(self, frames, speed: float):
+        self.frames = frames
+        self.speed = speed
+
+    async def generator(self):
+        for frame in self.frames:
+            await asyncio.sleep(CHUNK_MS / 1000 / self.speed)
+            yield frame
+
+
+async def record(frames, args, session=None, client=None, owner=None) -> dict:
+    finals = []
+
+    async def on_final(text):
+        finals.append(text)
+
+    pressed = time.monotonic()
+    if session is None:
+        # What stream_to_transcribe does without a session, on the fake endpoint.
+        started = time.monotonic()
+        stream = await client.start_stream_transcription()
+        setup = time.monotonic() - started
+        for frame in frames:
+            await asyncio.sleep(CHUNK_MS / 1000 / args.speed)
+            await stream.input_stream.send_audio_event(audio_chunk=frame)
+        await stream.input_stream.end_stream()
+        async for event in stream.output_stream:
+            finals.extend(r.alternatives[0].transcript for r in event.transcript.results if not r.is_partial)
+        return {"setup_ms": setup * 1000, "finals": finals}
+    await stream_to_transcribe(FramesSource(frames, args.speed), on_final=on_final, session=session, owner=owner)
+    return {"setup_ms": session.lease_wait_ms[-1], "finals": finals, "total_ms": (time.monotonic() - pressed) * 1000}
+
+
+async def run(args):
+    frames = list(synthetic_mic_frames(UTTERANCE))
+    expected = None
+    print(f"{args.recordings} recordings, {args.gap:.1f} s idle between them "
+          f"(fake endpoint closes idle streams after {args.idle_timeout:.1f} s)")
+
+    setups = []
+    for _ in range(args.recordings):
+        r = await record(frames, args, client=FakeTranscribeClient(idle_timeout=args.idle_timeout))
+        setups.append(r["setup_ms"])
+        expected = r["finals"]
+        await asyncio.sleep(args.gap)
+    print(f"  per-recording: record -> streaming p50 {np.percentile(setups, 50):4.0f} ms, "
+          f"max {max(setups):4.0f} ms, {args.recordings} streams opened")
+
+    session = TranscribeSession(
+        client_factory=lambda: FakeTranscribeClient(idle_timeout=args.idle_timeout),
+        keepalive_s=args.idle_timeout / 3,
+        rotate_after_s=args.rotate_s,
+    ).start()
+    await asyncio.sleep(1.0)  # page load -> first press
+    ok = True
+    for _ in range(args.recordings):
+        r = await record(frames, args, session=session)
+        ok &= r["finals"] == expected
+        await asyncio.sleep(args.gap)
+    s = session.stats()
+    session.close()
+    print(f"  session      : record -> streaming p50 {s['lease_wait_p50_ms']:4.0f} ms, "
+          f"max {s['lease_wait_max_ms']:4.0f} ms, {s['streams_opened']} streams opened "
+          f"(setup p50 {s['setup_p50_ms']:.0f} ms, off the critical path), {s['rotations']} rotations, "
+          f"{s['keepalives']} keepalives, transcripts {'match' if ok else 'DIFFER'}")
+
+    fail_after = len(b"".join(frames)) // 2  # break every stream mid-utterance
+    session = TranscribeSession(
+        client_factory=lambda: FakeTranscribeClient(idle_timeout=args.idle_timeout, fail_after_bytes=fail_after),
+        keepalive_s=args.idle_timeout / 3,
+    ).start()
+    await asyncio.sleep(1.0)
+    r = await record(frames, args, session=session)
+    s = session.stats()
+    session.close()
+    print(f"  failover     : {s['reconnects']} reconnect(s), {s['replayed_kb']:.0f} KB replayed, "
+          f"final {r['finals']} ({'matches' if r['finals'] == expected else 'DIFFERS from'} unbroken run {expected})")
+
+    session = TranscribeSession(
+        client_factory=lambda: FakeTranscribeClient(idle_timeout=args.idle_timeout),
+        keepalive_s=args.idle_timeout / 3,
+    ).start()
+    await asyncio.sleep(1.0)
+    first = asyncio.ensure_future(record(frames, args, session=session, owner="alice"))
+    await asyncio.sleep(0.3 / args.speed)  # bob presses record while alice is mid-sentence
+    second = await record(frames, args, session=session, owner="bob")
+    first = await first
+    s = session.stats()
+    session.close()
+    both = first["finals"] == expected and second["finals"] == expected
+    print(f"  shared       : 2 users at once, {s['overflow_streams']} fresh stream(s), "
+          f"finals {first['finals']} and {second['finals']} ({'both match' if both else 'DIFFER from'} {expected})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=1.5, help="idle seconds between recordings")
+    parser.add_argument("--idle-timeout", type=float, default=1.0, help="fake endpoint's no-audio timeout")
+    parser.add_argument("--rotate-s", type=float, default=4.0, help="rotate streams older than this")
+    parser.add_argument("--speed", type=float, default=4.0, help="audio delivery vs real time")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+TTS backends: first-audio latency per engine and text length, and failover.
+
+- polly: fakes.FakePolly (round trip + per-character cost, whole body at once).
+- local: tts_backends.LocalTTSClient driving a stand-in synthesizer process that
+  streams a 22.05 kHz WAV on stdout, `--rtf` x faster than real time after a
+  short startup (what espeak-ng does); resampled to 16 kHz while it streams.
+  Pass --command to time a real engine instead, e.g. --command "espeak-ng --stdout --stdin".
+- router: tts_backends.TTSRouter over both, with Polly throttling --throttle of
+  its calls; every utterance must still come back, short ones from the local engine.
+
+Also checks that the local stream decodes to the expected 16 kHz length, that
+streaming resampling matches one-shot resampling, and that cancelled playback
+(playback.AudioOutput.play_stream) and cancelled open_stream calls give the
+local engine's worker slots back.
+
+    python -m benchmarks.tts_backends
+    python -m benchmarks.tts_backends --throttle 0.5
+"""
+
+import argparse
+import asyncio
+import shlex
+import sys
+import time
+
+import numpy as np
+
+from fakes import SECONDS_PER_CHAR, FakeOutputStream, FakePolly, generate_pcm
+from playback import AudioOutput
+from resample import Resampler
+from tts_backends import LOCAL_WORKERS, LocalTTSClient, TTSRouter
+
+TEXTS = [
+    "Okay.",
+    "Let me check.",
+    "Sure, I can help with that.",
+    "It's currently a quarter past three in the afternoon, and sunny.",
+    "If you'd like, I can also set a reminder, check your calendar, or tell you the weather for the rest of the day.",
+]
+FIRST_AUDIO_BYTES = 640  # 20 ms at 16 kHz
+
+# Stand-in synthesizer: WAV header, then a tone in 10 ms blocks at `rtf` x real time
+# (stdlib only, so process startup is close to a native engine's).
+FAKE_ENGINE = """
+import array, math, struct, sys, time
+rate, rtf, startup = 22050, {rtf}, {startup}
+text = sys.argv[1]
+n = max(1, int(len(text) * {seconds_per_char} * rate))
+freq = 180.0 + (sum(map(ord, text)) % 60)
+out = sys.stdout.buffer
+out.write(b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVEfmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+          + b"data" + struct.pack("<I", 0xFFFFFFFF))
+time.sleep(startup)
+block = rate // 100
+for i in range(0, n, block):
+    out.write(array.array("h", (int(6553 * math.sin(2 * math.pi * freq * k / rate)) for k in range(i, min(n, i + block)))).tobytes())
+    out.flush()
+    time.sleep(0.01 / rtf)
+"""
+
+
+async def first_audio(client, text: str):
+    """(ms to the first 20 ms of audio, total bytes)."""
+    started = time.monotonic()
+    body = await client.open_stream(text)
+    loop = asyncio.get_running_loop()
+    first = await loop.run_in_executor(None, body.read, FIRST_AUDIO_BYTES)
+    first_ms = (time.monotonic() - started) * 1000
+    rest = await loop.run_in_executor(None, body.read)
+    return first_ms, len(first) + len(rest)
+
+
+def check_resampler() -> bool:
+    x = np.frombuffer(generate_pcm(TEXTS[-1], samplerate=22050, noise_level=0.05), dtype=np.int16)
+    whole = Resampler(22050, 16000).process(x)
+    r = Resampler(22050, 16000)
+    chunked = np.concatenate([r.process(x[i : i + 331]) for i in range(0, x.size, 331)])
+    return whole.size == chunked.size and int(np.abs(whole.astype(int) - chunked).max()) <= 1
+
+
+async def check_cancel(local, text: str) -> bool:
+    """Cancel playback mid-stream, and open_stream mid-spawn, more times than there are worker slots."""
+    output = AudioOutput(stream_factory=FakeOutputStream)
+    for _ in range(LOCAL_WORKERS * 2):
+        playing = asyncio.ensure_future(output.play_stream(await local.open_stream(text)))
+        await asyncio.sleep(0.05)
+        opening = asyncio.ensure_future(local.open_stream(text))
+        await asyncio.sleep(0)
+        for task in (playing, opening):
+            task.cancel()
+        await asyncio.gather(playing, opening, return_exceptions=True)
+    output.close()
+    deadline = time.monotonic() + 5.0
+    while local._slots._value < LOCAL_WORKERS and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)  # bodies spawned after their open_stream was cancelled close on their own
+    return local._slots._value == LOCAL_WORKERS
+
+
+async def run(args):
+    if args.command:
+        command = shlex.split(args.command)
+    else:
+        command = [sys.executable, "-c", FAKE_ENGINE.format(rtf=args.rtf, startup=args.startup, seconds_per_char=SECONDS_PER_CHAR), "{text}"]
+    local = LocalTTSClient(command=command, wav=True)
+    polly = FakePolly(base_latency=args.polly_latency)
+
+    print(f"first audio (ms)  {'chars':>5}  {'polly':>6}  {'local':>6}")
+    ok = True
+    for text in TEXTS:
+        polly_ms, _ = await first_audio(polly, text)
+        local_ms, size = await first_audio(local, text)
+        if not args.command:
+            expected = len(generate_pcm(text, samplerate=22050)) // 2 * 16000 // 22050 * 2
+            ok &= abs(size - expected) <= 4
+        print(f"                  {len(text):5d}  {polly_ms:6.0f}  {local_ms:6.0f}")
+    print(f"  local stream length {'ok' if ok else 'WRONG'}, streaming resampler {'ok' if check_resampler() else 'MISMATCH'}")
+    print(f"  cancelled playback and open_stream: worker slots {'released' if await check_cancel(local, TEXTS[-1]) else 'LEAKED'}")
+
+    router = TTSRouter(FakePolly(base_latency=args.polly_latency, throttle_rate=args.throttle, seed=1), local, cooldown_s=args.cooldown)
+    results = []
+    started = time.monotonic()
+    for _ in range(args.rounds):
+        for text in TEXTS:
+            ms, size = await first_audio(router, text)
+            results.append((ms, size))
+            await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+    s = router.stats()
+    latencies = [ms for ms, _ in results]
+    print(f"router, polly throttling {args.throttle:.0%}: {len(results)} utterances in {elapsed:.1f} s, "
+          f"{sum(1 for _, size in results if size)} with audio, first audio p50 {np.percentile(latencies, 50):.0f} ms "
+          f"p95 {np.percentile(latencies, 95):.0f} ms")
+    print(f"  routed {s['routed']}, {s['failovers']} failovers, errors {s['errors']}")
+    router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--command", help='real local engine, e.g. "espeak-ng --stdout --stdin"')
+    parser.add_argument("--rtf", type=float, default=10.0, help="stand-in engine speed vs real time")
+    parser.add_argument("--startup", type=float, default=0.03, help="stand-in engine startup seconds")
+    parser.add_argument("--polly-latency", type=float, default=0.15)
+    parser.add_argument("--throttle", type=float, default=0.3, help="fraction of Polly calls throttled")
+    parser.add_argument("--cooldown", type=float, default=1.0, help="seconds a failed engine is skipped")
+    parser.add_argument("--rounds", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
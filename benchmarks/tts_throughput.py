@@ -0,0 +1,54 @@
+"""
+Polly client throughput and latency against a local stub server.
+
+Starts fakes.StubPollyServer, points tts_client.PollyTTSClient at it and fires
+--requests syntheses at each concurrency level.
+
+    python -m benchmarks.tts_throughput --requests 64 --concurrency 1 4 8
+"""
+
+import argparse
+import asyncio
+import time
+
+from fakes import StubPollyServer
+from tts_client import PollyTTSClient
+
+PHRASES = [
+    "Sure, I can help with that.",
+    "It's currently a quarter past three in the afternoon.",
+    "If you'd like, I can also set a reminder for you.",
+    "Just let me know what you need next.",
+]
+
+
+async def run_level(url: str, concurrency: int, requests: int) -> dict:
+    client = PollyTTSClient(endpoint_url=url, max_concurrency=concurrency)
+    await client.synthesize("warm up")  # open the first pooled connection
+    started = time.monotonic()
+    await asyncio.gather(*(client.synthesize(PHRASES[i % len(PHRASES)]) for i in range(requests)))
+    elapsed = time.monotonic() - started
+    stats = client.stats()
+    client.close()
+    return {"concurrency": concurrency, "per_sec": requests / elapsed, **stats}
+
+
+async def run(args):
+    with StubPollyServer(base_latency=args.latency) as server:
+        print(f"stub Polly at {server.url}, {args.latency * 1000:.0f} ms round trip, {args.requests} requests")
+        for concurrency in args.concurrency:
+            r = await run_level(server.url, concurrency, args.requests)
+            print(f"  concurrency {r['concurrency']:3}: {r['per_sec']:7.1f} syntheses/s, "
+                  f"p50 {r['p50_ms']:6.1f} ms, p95 {r['p95_ms']:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.1, help="stub round trip in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
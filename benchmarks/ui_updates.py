@@ -0,0 +1,176 @@
+"""
+Streamlit live updates while recording: sleep-and-rerun polling vs live.LiveChannel push.
+
+A recording thread replays transcripts.jsonl (partials, final) in real time and
+streams a fakes.FakeAgent-paced reply, publishing into a LiveChannel, for
+--seconds. A UI thread consumes it the two ways the apps have:
+
+- polling: the old `time.sleep(0.5); st.rerun()`; every rerun re-executes the
+  script and re-renders the whole history.
+- push: live.follow() redraws only the live panel when the channel changes (or
+  every live.WAKE_S), plus one full rerun per turn when it is over.
+
+Streamlit isn't needed: a full rerun is modelled as --rerun-ms of CPU plus
+--message-ms per history message, a panel redraw as --panel-ms. Reported per
+minute of recording: full reruns, panel redraws, UI-thread CPU, and how long a
+partial transcript or agent token waits before it is on screen.
+
+    python -m benchmarks.ui_updates --seconds 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from fakes import DEFAULT_REPLY
+from live import LiveChannel, follow
+
+DEFAULT_EVENTS = Path(__file__).with_name("transcripts.jsonl")
+POLL_S = 0.5
+
+
+def burn(ms: float):
+    """Spend `ms` of CPU, like rendering would."""
+    end = time.thread_time() + ms / 1000
+    while time.thread_time() < end:
+        pass
+
+
+class Recorder:
+    """Replays utterances into a channel; notes when each version was published."""
+
+    def __init__(self, channel: LiveChannel, utterances, seconds: float, tokens_per_second: float):
+        self.channel = channel
+        self.utterances = utterances
+        self.seconds = seconds
+        self.tokens_per_second = tokens_per_second
+        self.published = {}  # version -> time
+        self.turns = 0
+        self.finished = threading.Event()
+
+    def _mark(self):
+        self.published[self.channel.version] = time.monotonic()
+
+    def run(self):
+        started = time.monotonic()
+        words = DEFAULT_REPLY.split(" ")[:20]
+        while time.monotonic() - started < self.seconds:
+            events = self.utterances[self.turns % len(self.utterances)]
+            self.turns += 1
+            self.channel.reset(status="listening")
+            begin = time.monotonic()
+            for t, kind, text in events:
+                time.sleep(max(0.0, begin + t - time.monotonic()))
+                if kind == "partial":
+                    self.channel.publish(partial=text)
+                    self._mark()
+                elif kind == "final":
+                    self.channel.publish(final=text, partial="", status="thinking")
+                    self._mark()
+                    time.sleep(0.3)  # first token
+                    for word in words:
+                        self.channel.append("reply", word + " ")
+                        self._mark()
+                        time.sleep(1 / self.tokens_per_second)
+                    self.channel.publish(status="done")
+            time.sleep(1.0)  # user reads the reply, presses record again
+        self.finished.set()
+
+
+def polling_ui(channel: LiveChannel, recorder: Recorder, args, seen: dict, counts: dict):
+    history = 0
+    while not recorder.finished.is_set():
+        version, state = channel.wait(-1, 0)
+        burn(args.rerun_ms + args.message_ms * history)
+        counts["reruns"] += 1
+        seen.setdefault(version, time.monotonic())
+        if state["status"] == "done":
+            history += 2
+            channel.reset()  # the script moved the turn into history
+        time.sleep(POLL_S)
+
+
+def push_ui(channel: LiveChannel, recorder: Recorder, args, seen: dict, counts: dict):
+    history = 0
+
+    def render(state):
+        burn(args.panel_ms)
+        counts["redraws"] += 1
+        seen.setdefault(channel.version, time.monotonic())
+
+    while not recorder.finished.is_set():
+        _, state = channel.wait(-1, 0)
+        if state["status"] != "listening":
+            channel.wait(channel.version, 0.05)  # idle until the next record press
+            continue
+        burn(args.rerun_ms + args.message_ms * history)  # the record press
+        counts["reruns"] += 1
+        follow(channel, render)
+        history += 2
+        channel.reset()
+        burn(args.rerun_ms + args.message_ms * history)  # one rerun with the finished turn
+        counts["reruns"] += 1
+
+
+def measure(ui, utterances, args) -> dict:
+    channel = LiveChannel()
+    recorder = Recorder(channel, utterances, args.seconds, args.tokens_per_second)
+    seen, counts = {}, {"reruns": 0, "redraws": 0}
+    cpu = {}
+
+    def ui_thread():
+        started = time.thread_time()
+        ui(channel, recorder, args, seen, counts)
+        cpu["s"] = time.thread_time() - started
+
+    thread = threading.Thread(target=ui_thread)
+    thread.start()
+    started = time.monotonic()
+    recorder.run()
+    thread.join()
+    elapsed = time.monotonic() - started
+
+    # A published version is on screen once any render shows it or a later one.
+    shown = sorted(seen.items())
+    waits = []
+    for version, at in recorder.published.items():
+        later = [t for v, t in shown if v >= version]
+        if later:
+            waits.append((min(later) - at) * 1000)
+    per_min = 60 / elapsed
+    return {
+        "reruns": counts["reruns"] * per_min,
+        "redraws": counts["redraws"] * per_min,
+        "cpu": cpu["s"] * per_min,
+        "p50": float(np.percentile(waits, 50)),
+        "p95": float(np.percentile(waits, 95)),
+        "turns": recorder.turns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", default=DEFAULT_EVENTS)
+    parser.add_argument("--seconds", type=float, default=20.0, help="recording time per mode")
+    parser.add_argument("--rerun-ms", type=float, default=15.0, help="CPU per full script rerun")
+    parser.add_argument("--message-ms", type=float, default=0.5, help="extra rerun CPU per history message")
+    parser.add_argument("--panel-ms", type=float, default=0.5, help="CPU per live panel redraw")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    args = parser.parse_args()
+    with open(args.events) as f:
+        utterances = [json.loads(line)["events"] for line in f if line.strip()]
+
+    print(f"per minute of recording ({args.seconds:.0f} s per mode)")
+    for name, ui in (("polling", polling_ui), ("push", push_ui)):
+        r = measure(ui, utterances, args)
+        print(f"  {name:8} {r['reruns']:5.0f} full reruns, {r['redraws']:5.0f} panel redraws, "
+              f"UI CPU {r['cpu']:5.2f} s, update on screen after p50 {r['p50']:4.0f} ms p95 {r['p95']:4.0f} ms "
+              f"({r['turns']} turns)")
+
+
+if __name__ == "__main__":
+    main()
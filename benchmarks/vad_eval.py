@@ -0,0 +1,122 @@
+"""
+Offline VAD evaluation over WAV fixtures: frames suppressed and endpoint latency.
+
+Each fixture is a 16 kHz mono int16 WAV; an optional <name>.json next to it
+lists the labelled speech segments as {"speech": [[start_s, end_s], ...]}.
+Endpoint latency is measured from the labelled end of each segment to the VAD's
+local end-of-utterance event.
+
+Without --fixtures a synthetic set is written to a temp directory first
+(clean, noisy, and short-pause speech from fakes.synthetic_mic_frames).
+
+    python -m benchmarks.vad_eval
+    python -m benchmarks.vad_eval --fixtures recordings/ --eou-ms 500
+"""
+
+import argparse
+import json
+import tempfile
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from fakes import synthetic_mic_frames
+from vad import END_OF_UTTERANCE_MS, FRAME_SAMPLES, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+SYNTHETIC = {
+    "clean": ([("silence", 1.0), ("speech", 2.5), ("silence", 1.5), ("speech", 1.0), ("silence", 1.5)], 0.001),
+    "noisy": ([("silence", 1.0), ("speech", 2.5), ("silence", 1.5), ("speech", 1.0), ("silence", 1.5)], 0.006),
+    "short_pauses": ([("silence", 0.8), ("speech", 1.0), ("silence", 0.3), ("speech", 1.0), ("silence", 2.0)], 0.001),
+}
+
+
+def write_synthetic(directory: Path):
+    for name, (pattern, noise_level) in SYNTHETIC.items():
+        pcm = b"".join(synthetic_mic_frames(pattern, noise_level=noise_level))
+        with wave.open(str(directory / f"{name}.wav"), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(pcm)
+        # Labels: speech segments, with pauses shorter than the VAD's hangover merged.
+        segments, t = [], 0.0
+        for kind, seconds in pattern:
+            if kind == "speech":
+                if segments and t - segments[-1][1] < 0.5:
+                    segments[-1][1] = t + seconds
+                else:
+                    segments.append([t, t + seconds])
+            t += seconds
+        (directory / f"{name}.json").write_text(json.dumps({"speech": segments}))
+
+
+def evaluate(path: Path, args) -> dict:
+    with wave.open(str(path), "rb") as w:
+        if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError(f"{path.name}: expected 16 kHz mono int16")
+        pcm = w.readframes(w.getnframes())
+    vad = VoiceActivityDetector(end_of_utterance_ms=args.eou_ms)
+    chunk_bytes = FRAME_SAMPLES * 2 * args.batch_frames
+    starts, ends = [], []
+    for offset in range(0, len(pcm), chunk_bytes):
+        result = vad.process(pcm[offset : offset + chunk_bytes])
+        t = vad.frames_in * FRAME_SAMPLES / SAMPLE_RATE
+        if result.started:
+            starts.append(t)
+        if result.ended:
+            ends.append(t)
+
+    labels = path.with_suffix(".json")
+    latencies, missed = [], 0
+    if labels.exists():
+        for _, end in json.loads(labels.read_text())["speech"]:
+            after = [e for e in ends if e >= end]
+            if after:
+                latencies.append(after[0] - end)
+            else:
+                missed += 1
+    return {
+        "name": path.stem,
+        "seconds": len(pcm) / 2 / SAMPLE_RATE,
+        "suppressed": vad.suppressed_ratio,
+        "utterances": len(starts),
+        "latencies_ms": [l * 1000 for l in latencies],
+        "missed": missed,
+        "labelled": labels.exists(),
+    }
+
+
+def run(args):
+    if args.fixtures:
+        directory = Path(args.fixtures)
+    else:
+        directory = Path(tempfile.mkdtemp(prefix="vad_fixtures_"))
+        write_synthetic(directory)
+    paths = sorted(directory.glob("*.wav"))
+    if not paths:
+        raise SystemExit(f"no .wav fixtures in {directory}")
+    print(f"{len(paths)} fixtures from {directory}, end of utterance after {args.eou_ms} ms")
+    for path in paths:
+        r = evaluate(path, args)
+        line = (f"  {r['name']:14}: {r['seconds']:5.1f} s, {r['suppressed']:4.0%} frames suppressed, "
+                f"{r['utterances']} utterances")
+        if r["labelled"]:
+            if r["latencies_ms"]:
+                line += (f", endpoint latency mean {np.mean(r['latencies_ms']):.0f} ms "
+                         f"max {np.max(r['latencies_ms']):.0f} ms")
+            line += f", {r['missed']} missed"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="directory of .wav (+ optional .json labels)")
+    parser.add_argument("--eou-ms", type=int, default=END_OF_UTTERANCE_MS)
+    parser.add_argument("--batch-frames", type=int, default=1, help="frames per process() call")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
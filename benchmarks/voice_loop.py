@@ -0,0 +1,283 @@
+"""
+Offline end-to-end benchmark of the voice loop, saved as JSON for comparing commits.
+
+Each WAV fixture is played into transcribe.MicStream through
+fakes.FakeInputStream in real time and runs the loop as main.py wires it:
+
+- stream_to_transcribe with the VAD's early final, on fakes.FakeTranscribeClient.
+  Finals are scripted from the fixture's <name>.json ({"transcripts": [...]}),
+  one per utterance.
+- AgentRunner on fakes.FakeAgent, the Bedrock model stand-in, with
+  --first-token and --tps token rate.
+- SpeechPipeline on fakes.FakePolly, playing through playback.AudioOutput on
+  fakes.FakeOutputStream, under BargeInController.
+
+Per fixture and overall it reports turn latency (VAD end of speech to playback
+start), time to first audio (reply start to first audio), the tracing stage
+breakdown, CPU and RSS. Results go to --out, by default
+benchmarks/results/voice_loop-<commit>.json. With --compare it also prints the
+change against an earlier result and fails on regressions over --tolerance.
+Also exits non-zero when a turn gets no reply or a final differs from its script.
+
+Without --fixtures a synthetic set is written to a temp directory first
+(fakes.synthetic_mic_frames: clean and noisy questions, and a follow-up asked
+over the reply, which barges in).
+
+    python -m benchmarks.voice_loop
+    python -m benchmarks.voice_loop --compare benchmarks/results/voice_loop-c56c7e2.json
+    python -m benchmarks.voice_loop --fixtures recordings/ --first-token 0.8 --tps 25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+import tracing
+from agent_runner import AgentRunner
+from bargein import BargeInController
+from batch_transcribe import decode_audio
+from fakes import FakeAgent, FakeInputStream, FakeOutputStream, FakePolly, FakeTranscribeClient, synthetic_mic_frames
+from playback import AudioOutput
+from speech import SpeechPipeline
+from stt import AWSTranscribeBackend
+from transcribe import CHUNK_SAMPLES, MicStream, stream_to_transcribe
+from vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+RESULTS = Path(__file__).parent / "results"
+REPLY = "Sure. It's a quarter past three in the afternoon."
+QUESTIONS = ["What time is it?", "Set a timer for ten minutes.", "What's the weather like tomorrow?"]
+SYNTHETIC = {
+    "clean": ([("silence", 0.5), ("speech", 0.95), ("silence", 5.5), ("speech", 1.25), ("silence", 5.5), ("speech", 1.45), ("silence", 5.5)], 0.001),
+    "noisy": ([("silence", 0.5), ("speech", 0.95), ("silence", 5.5), ("speech", 1.25), ("silence", 5.5), ("speech", 1.45), ("silence", 5.5)], 0.006),
+    "follow_up": ([("silence", 0.5), ("speech", 0.95), ("silence", 1.5), ("speech", 1.25), ("silence", 5.5)], 0.001),
+}
+# Overall metrics compared by --compare: (key, absolute slack on top of --tolerance)
+COMPARED = [
+    ("turn_ms.p50", 20.0), ("turn_ms.p95", 20.0), ("first_audio_ms.p50", 20.0), ("first_audio_ms.p95", 20.0),
+    ("cpu_pct", 0.5), ("peak_rss_mb", 5.0),
+]
+
+
+def write_synthetic(directory: Path):
+    for name, (pattern, noise_level) in SYNTHETIC.items():
+        with wave.open(str(directory / f"{name}.wav"), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(b"".join(synthetic_mic_frames(pattern, noise_level=noise_level)))
+        utterances = sum(kind == "speech" for kind, _ in pattern)
+        (directory / f"{name}.json").write_text(json.dumps({"transcripts": QUESTIONS[:utterances]}))
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"n": 0, "p50": None, "p95": None}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"n": len(values), "p50": round(float(p50), 1), "p95": round(float(p95), 1)}
+
+
+def rss_mb() -> float:
+    """Current RSS (Linux /proc; elsewhere the peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+# ---------- One fixture ----------
+
+async def run_fixture(path: Path, args) -> dict:
+    pcm = decode_audio(path.read_bytes()).tobytes()
+    frame_bytes = CHUNK_SAMPLES * 2
+    frames = [pcm[i : i + frame_bytes] for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+    labels = path.with_suffix(".json")
+    script = json.loads(labels.read_text()).get("transcripts", []) if labels.exists() else []
+
+    inputs, devices = [], []
+
+    def input_factory(*a, **kw):
+        inputs.append(FakeInputStream(*a, frames=frames, **kw))
+        return inputs[-1]
+
+    def device_factory(**kw):
+        devices.append(FakeOutputStream(**kw))
+        return devices[-1]
+
+    tracer = tracing.Tracer(otel=False)  # in memory: percentiles only
+    output = AudioOutput(stream_factory=device_factory)
+    speaker = SpeechPipeline(FakePolly(base_latency=args.tts_latency).synthesize, output)
+    barge_in = BargeInController(output)
+    runner = AgentRunner(FakeAgent(reply=args.reply, first_token_delay=args.first_token, tokens_per_second=args.tps))
+    client = FakeTranscribeClient(transcripts=script)
+    backend = AWSTranscribeBackend(client_factory=lambda: client)
+    finals, replies, turns = [], [], []
+
+    async def respond(tokens):
+        replies.append(await speaker.speak(tokens))
+
+    async def on_final(text):
+        finals.append(text)
+        turns.append(barge_in.start_turn(respond(runner.stream(text))))
+
+    cpu, wall = time.process_time(), time.monotonic()
+    try:
+        async with MicStream(stream_factory=input_factory) as mic:
+            transcribing = asyncio.ensure_future(stream_to_transcribe(
+                mic, on_final=on_final, on_partial=barge_in.on_partial, on_audio=barge_in.on_audio,
+                vad=VoiceActivityDetector(), early_final=True, backend=backend, tracer=tracer,
+            ))
+            await asyncio.get_running_loop().run_in_executor(None, inputs[0].finished.wait)
+        await transcribing
+        await asyncio.gather(*turns, return_exceptions=True)
+    finally:
+        runner.close()
+        output.close()
+    cpu, wall = time.process_time() - cpu, time.monotonic() - wall
+
+    answered = [r for r in replies if r.first_audio is not None]
+    stages = {name: {"n": s["n"], "p50": round(s["p50_ms"], 1), "p95": round(s["p95_ms"], 1)}
+              for name, s in tracer.summary().items()}
+    return {
+        "audio_s": round(len(pcm) / 2 / SAMPLE_RATE, 2),
+        "finals": len(finals),
+        "replies": len(answered),
+        "interrupted": sum(t.cancelled() for t in turns),
+        "script_mismatches": [[got, want] for got, want in zip(finals, script) if got != want]
+        + ([["<missing>", want] for want in script[len(finals):]]),
+        "turn_ms": [round(r.trace.intervals()["turn"] * 1000, 1) for r in answered if "turn" in r.trace.intervals()],
+        "first_audio_ms": [round(r.time_to_first_audio * 1000, 1) for r in answered],
+        "stages_ms": stages,
+        "cpu_s": round(cpu, 3),
+        "cpu_pct": round(cpu / wall * 100, 2),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+# ---------- Results ----------
+
+def git_commit() -> dict:
+    def git(*argv):
+        return subprocess.run(["git", *argv], capture_output=True, text=True, cwd=Path(__file__).parent, timeout=30).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def lookup(result: dict, key: str):
+    for part in key.split("."):
+        result = result.get(part) if isinstance(result, dict) else None
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> int:
+    print(f"\nvs {baseline.get('commit') or 'baseline'} ({baseline.get('created', '?')}), tolerance {tolerance:.0%}:")
+    regressions = 0
+    for key, slack in COMPARED:
+        new, old = lookup(result["overall"], key), lookup(baseline.get("overall", {}), key)
+        if new is None or old is None:
+            print(f"  {key:20} {'-':>9} -> {new if new is not None else '-':>9}")
+            continue
+        worse = new > old * (1 + tolerance) + slack
+        regressions += worse
+        change = (new - old) / old * 100 if old else float("nan")
+        print(f"  {key:20} {old:9.1f} -> {new:9.1f}  {change:+6.1f}%{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+async def run(args) -> int:
+    if args.fixtures:
+        directory = Path(args.fixtures)
+    else:
+        directory = Path(tempfile.mkdtemp(prefix="voice_loop_fixtures_"))
+        write_synthetic(directory)
+    paths = sorted(directory.glob("*.wav"))
+    if not paths:
+        raise SystemExit(f"no .wav fixtures in {directory}")
+    print(f"{len(paths)} fixtures from {directory}; agent first token {args.first_token * 1000:.0f} ms at {args.tps:g} tokens/s, "
+          f"TTS round trip {args.tts_latency * 1000:.0f} ms; {os.cpu_count()} CPU(s)")
+
+    failures = 0
+    fixtures = {}
+    for path in paths:
+        r = fixtures[path.stem] = await run_fixture(path, args)
+        silent = r["finals"] - r["replies"] - r["interrupted"]
+        ok = r["finals"] and not silent and not r["script_mismatches"]
+        failures += not ok
+        turn, first = percentiles(r["turn_ms"]), percentiles(r["first_audio_ms"])
+        print(f"  {'PASS' if ok else 'FAIL'} {path.stem:12}: {r['audio_s']:5.1f} s, {r['finals']} turns "
+              f"({r['interrupted']} interrupted, {silent} without a reply), turn latency p50 {turn['p50'] or 0:4.0f} ms, "
+              f"first audio p50 {first['p50'] or 0:4.0f} ms, CPU {r['cpu_pct']:4.1f}% of a core, RSS {r['rss_mb']:.0f} MB")
+        for got, want in r["script_mismatches"][:3]:
+            print(f"       final {got!r}, scripted {want!r}")
+
+    turn_ms = [x for r in fixtures.values() for x in r["turn_ms"]]
+    first_audio_ms = [x for r in fixtures.values() for x in r["first_audio_ms"]]
+    cpu_s = sum(r["cpu_s"] for r in fixtures.values())
+    audio_s = sum(r["audio_s"] for r in fixtures.values())
+    result = {
+        **git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {k: getattr(args, k) for k in ("first_token", "tps", "tts_latency", "reply")},
+        "overall": {
+            "turns": len(turn_ms),
+            "turn_ms": percentiles(turn_ms),
+            "first_audio_ms": percentiles(first_audio_ms),
+            "cpu_s": round(cpu_s, 3),
+            "cpu_pct": round(cpu_s / audio_s * 100, 2),  # fixtures play in real time
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "fixtures": fixtures,
+    }
+    o = result["overall"]
+    print(f"  overall: {o['turns']} turns, turn latency p50 {o['turn_ms']['p50']} ms p95 {o['turn_ms']['p95']} ms, "
+          f"first audio p50 {o['first_audio_ms']['p50']} ms p95 {o['first_audio_ms']['p95']} ms, "
+          f"CPU {o['cpu_pct']}% of a core, peak RSS {o['peak_rss_mb']} MB")
+
+    out = Path(args.out or RESULTS / f"voice_loop-{result['commit'] or 'local'}{'-dirty' if result['dirty'] else ''}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n")
+    print(f"saved {out}")
+
+    if args.compare:
+        failures += compare(result, json.loads(Path(args.compare).read_text()), args.tolerance)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="directory of 16 kHz .wav (+ optional .json scripted transcripts)")
+    parser.add_argument("--first-token", type=float, default=0.3, help="fake agent seconds to first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="fake agent tokens per second")
+    parser.add_argument("--tts-latency", type=float, default=0.15, help="fake Polly round trip in seconds")
+    parser.add_argument("--reply", default=REPLY, help="what the fake agent says every turn")
+    parser.add_argument("--out", help="result JSON (default: benchmarks/results/voice_loop-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression for --compare")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Browser (WebRTC) audio through webrtc_ingest.WebRTCAudioSource into the STT pipeline.
+
+Synthetic streamlit-webrtc frames (fakes.synthetic_webrtc_frames: the same
+speech/silence as fakes.synthetic_mic_frames, at browser rates and layouts)
+go through stream_to_transcribe with the VAD and LocalSTTBackend's
+EnergyRecognizer. Checks, exiting non-zero on any failure:
+
+- formats: 48 kHz stereo s16, 48 kHz mono fltp and 44.1 kHz stereo s16 give
+  the same finals as the 16 kHz frames a local MicStream would capture.
+- anti-aliasing: a 10 kHz tone at 48 kHz (above the 8 kHz output Nyquist) is
+  suppressed instead of folding back into the speech band.
+- sessions: --sessions browsers at once, each pulled from its own (fake)
+  audio_receiver in real time x --speed, all transcribed correctly.
+
+Also reports the CPU cost of converting one 20 ms browser frame.
+
+    python -m benchmarks.webrtc_ingest --sessions 8
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from fakes import EnergyRecognizer, FakeAudioReceiver, synthetic_mic_frames, synthetic_webrtc_frames
+from stt import LocalSTTBackend
+from transcribe import stream_to_transcribe
+from vad import VoiceActivityDetector
+from webrtc_ingest import WebRTCAudioSource
+
+UTTERANCES = [("silence", 0.5), ("speech", 0.95), ("silence", 1.0), ("speech", 0.65), ("silence", 1.0)]  # off word boundaries (fakes.EnergyRecognizer: 10 frames)
+FORMATS = [(48000, 2, "s16"), (48000, 1, "fltp"), (44100, 2, "s16")]
+
+
+class FramesSource:
+    """MicStream stand-in over prerecorded 16 kHz frames."""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def generator(self):
+        for frame in self.frames:
+            yield frame
+
+
+async def transcribe(source, backend) -> list:
+    finals = []
+
+    async def on_final(text):
+        finals.append(text)
+
+    await stream_to_transcribe(source, on_final=on_final, vad=VoiceActivityDetector(), backend=backend)
+    return finals
+
+
+async def pushed(frames, backend) -> list:
+    async with WebRTCAudioSource(max_frames=100_000) as source:  # everything is pushed up front
+        for frame in frames:
+            source.push(frame)
+        source.close()
+        return await transcribe(source, backend)
+
+
+def alias_rms(lowpass: bool) -> float:
+    from resample import Resampler
+
+    t = np.arange(48000) / 48000
+    tone = (8000 * np.sin(2 * np.pi * 10000 * t)).astype(np.int16)
+    out = Resampler(48000, 16000, lowpass=lowpass).process(tone)[200:]
+    return float(np.sqrt(np.mean(out.astype(np.float64) ** 2)))
+
+
+def frame_cost_us(rate: int, channels: int, fmt: str, n: int = 500) -> float:
+    frames = list(synthetic_webrtc_frames([("speech", n * 0.02)], rate, channels, fmt))
+    source = WebRTCAudioSource(max_frames=10)
+    started = time.thread_time()
+    for frame in frames:
+        source.push(frame)
+    return (time.thread_time() - started) / len(frames) * 1e6
+
+
+async def run(args):
+    backend = LocalSTTBackend(EnergyRecognizer)
+    backend.warm()  # as get_stt_backend() does; audio would otherwise pile up while workers spawn
+    failures = 0
+    try:
+        expected = await transcribe(FramesSource(list(synthetic_mic_frames(UTTERANCES))), backend)
+        print(f"local 16 kHz mic: finals {expected}")
+        for rate, channels, fmt in FORMATS:
+            finals = await pushed(synthetic_webrtc_frames(UTTERANCES, rate, channels, fmt), backend)
+            ok = finals == expected
+            failures += not ok
+            print(f"  {'PASS' if ok else 'FAIL'} {rate} Hz {channels} ch {fmt:4}: finals {finals}, "
+                  f"{frame_cost_us(rate, channels, fmt):.0f} us CPU per 20 ms frame")
+
+        plain, filtered = alias_rms(False), alias_rms(True)
+        ok = filtered < plain / 100
+        failures += not ok
+        print(f"  {'PASS' if ok else 'FAIL'} 10 kHz tone at 48 kHz: RMS {plain:.0f} without the low-pass, {filtered:.1f} with it")
+
+        async def browser(i):
+            frames = synthetic_webrtc_frames(UTTERANCES, 48000, 2, "s16", seed=i)
+            async with WebRTCAudioSource(receiver=FakeAudioReceiver(frames, speed=args.speed)) as source:
+                return await transcribe(source, backend), source.stats()
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(browser(i) for i in range(args.sessions)))
+        elapsed = time.monotonic() - started
+        good = sum(r == expected for r, _ in results)
+        dropped = sum(stats["dropped_frames"] for _, stats in results)
+        failures += good != args.sessions
+        print(f"  {'PASS' if good == args.sessions else 'FAIL'} {args.sessions} browser sessions at once "
+              f"({args.speed:.0f}x real time): {good} transcribed correctly in {elapsed:.1f} s, {dropped} frames dropped")
+    finally:
+        backend.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=4.0, help="browser audio delivery vs real time")
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
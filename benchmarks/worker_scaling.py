@@ -0,0 +1,213 @@
+"""
+Sessions per machine as workers.WorkerFrontEnd adds worker processes.
+
+For each --workers count the front-end runs in its own process with that many
+workers, each a server.VoiceServer on the fakes (benchmarks/server_load.py's
+fake_server: FakeTranscribeClient, FakePolly, a FakeAgent per session).
+Clients replay synthetic speech at 48 kHz, as browsers send it, so workers
+resample (with the anti-aliasing low-pass) on top of VAD and recognition.
+The --sessions levels run in order until one fails (errors, turns without a
+reply, dropped audio, or p95 turn latency over --p95-budget-ms); the last
+passing level is that worker count's capacity, and scaling efficiency is
+capacity / (workers x capacity with one worker). Workers beyond the machine's
+CPU count can't add capacity.
+
+Also checks, exiting non-zero on failure:
+
+- sticky routing: sessions spread over the workers, and session ids that
+  reconnect (in reverse order) land on the worker they started on.
+- draining: a worker drained mid-call (and replaced) finishes every call on
+  it, and sessions that connect meanwhile go to the other workers.
+
+    python -m benchmarks.worker_scaling --workers 1 2 4 --sessions 50 100 200 400
+"""
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch_transcribe import decode_audio
+from benchmarks.server_load import client, fake_server, synthetic_wav
+from resample import Resampler
+
+CLIENT_RATE = 48000
+
+
+# ---------- Front-end process ----------
+
+async def _front(conn, options: dict):
+    from workers import WorkerFrontEnd
+
+    factory = functools.partial(fake_server, options["first_token_delay"], **options["limits"])
+    front = await WorkerFrontEnd(options["workers"], server_factory=factory, max_sessions=options["max_sessions"]).start()
+    conn.send(front.port)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            command = await loop.run_in_executor(None, conn.recv)
+            if command == "stop":
+                break
+            if command == "cpu":
+                stats = await front.worker_stats()
+                conn.send((time.process_time() + sum(s["cpu_s"] for s in stats.values() if s), time.monotonic()))
+            elif command == "stats":
+                conn.send((front.stats(), await front.worker_stats()))
+            elif command[0] == "drain":
+                conn.send(await front.drain(command[1], replace=True))
+    finally:
+        await front.close()
+
+
+def front_main(conn, options: dict):
+    asyncio.run(_front(conn, options))
+
+
+class FrontEnd:
+    """Starts the front-end process and talks to it."""
+
+    def __init__(self, workers: int, args):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        limits = dict(bedrock_concurrency=32, transcribe_concurrency=1000, polly_concurrency=32)  # per worker
+        options = {"workers": workers, "max_sessions": max(args.sessions), "limits": limits,
+                   "first_token_delay": args.first_token_delay}
+        # Not a daemon: the front-end starts processes of its own.
+        self.process = context.Process(target=front_main, args=(child, options))
+        self.process.start()
+        self.port = self.conn.recv()
+
+    async def request(self, command):
+        def call():
+            self.conn.send(command)
+            return self.conn.recv()
+
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    def close(self):
+        self.conn.send("stop")
+        self.process.join(10)
+
+
+# ---------- Checks ----------
+
+def summarize(results) -> dict:
+    latencies = np.array([x for r in results for x in r["latencies"]])
+    finals = sum(r["finals"] for r in results)
+    return {
+        "finals": finals,
+        "silent": finals - latencies.size,
+        "errors": [e for r in results for e in r["errors"]],
+        "p50": float(np.percentile(latencies, 50)) if latencies.size else float("nan"),
+        "p95": float(np.percentile(latencies, 95)) if latencies.size else float("nan"),
+    }
+
+
+async def callers(front: FrontEnd, pcm: bytes, n: int, args, ramp: float, paths=None) -> list:
+    audio_s = len(pcm) / 2 / CLIENT_RATE
+    step = ramp / max(n - 1, 1)
+    return await asyncio.gather(*(
+        client(front.port, pcm, i * step, 1.0, args.chunk_ms, audio_s + 30, rate=CLIENT_RATE,
+               path=paths[i] if paths else "/")
+        for i in range(n)
+    ))
+
+
+async def level(front: FrontEnd, pcm: bytes, sessions: int, args) -> tuple:
+    cpu0, wall0 = await front.request("cpu")
+    results = await callers(front, pcm, sessions, args, args.ramp)
+    cpu1, wall1 = await front.request("cpu")
+    stats, _ = await front.request("stats")
+    s = summarize(results)
+    dropped = sum(w["dropped_chunks"] for w in stats["workers"].values())
+    ok = not s["errors"] and s["finals"] and not s["silent"] and not dropped and s["p95"] <= args.p95_budget_ms
+    cores = (cpu1 - cpu0) / (wall1 - wall0)
+    per_worker = np.bincount([r["worker"] for r in results if r["worker"] is not None])
+    print(f"    {'PASS' if ok else 'FAIL'} {sessions:4d} sessions: turn latency p50 {s['p50']:4.0f} ms  p95 {s['p95']:5.0f} ms, "
+          f"CPU {cores * 100:5.1f}% of a core, sessions per worker {per_worker.tolist()}, "
+          f"{s['silent']} turns without a reply, {dropped} audio chunks dropped")
+    for error in s["errors"][:3]:
+        print(f"         error: {error}")
+    return bool(ok), cores
+
+
+async def sticky(front: FrontEnd, args) -> bool:
+    pcm = bytes(CLIENT_RATE * 2)  # one second of silence: just connect, route and hang up
+    first = await callers(front, pcm, 8, args, 0.0)
+    paths = [f"/?session={r['session']}" for r in first]  # the ids the front-end issued
+    # Reconnect in reverse order, so least-loaded routing alone would reshuffle them.
+    again = await callers(front, pcm, len(paths), args, 0.0, paths=paths[::-1])
+    before, after = [r["worker"] for r in first], [r["worker"] for r in again[::-1]]
+    ok = before == after and len(set(before)) > 1 and not any(r["errors"] for r in first + again)
+    print(f"  {'PASS' if ok else 'FAIL'} sticky routing: 8 session ids on workers {before}, reconnected to {after}")
+    return ok
+
+
+async def drain(front: FrontEnd, pcm: bytes, args) -> bool:
+    old = asyncio.ensure_future(callers(front, pcm, 16, args, 2.0))
+    await asyncio.sleep(4.0)  # mid-call
+    draining = asyncio.ensure_future(front.request(("drain", 0)))
+    await asyncio.sleep(0.5)
+    new = await callers(front, pcm, 8, args, 2.0)
+    old, drain_s = await old, await draining
+    s = summarize(old + new)
+    on_drained = sum(r["worker"] == 0 for r in old)
+    routed_away = all(r["worker"] != 0 for r in new)
+    ok = not s["errors"] and not s["silent"] and s["finals"] == 3 * 24 and routed_away and on_drained
+    print(f"  {'PASS' if ok else 'FAIL'} draining: worker 0 drained in {drain_s:.1f} s with {on_drained} live calls, "
+          f"{s['finals']} turns all answered, {len(new)} new sessions on workers {sorted({r['worker'] for r in new})}")
+    for error in s["errors"][:3]:
+        print(f"       error: {error}")
+    return ok
+
+
+async def run(args) -> int:
+    pcm = Resampler(16000, CLIENT_RATE).process(decode_audio(synthetic_wav())).tobytes()
+    print(f"{os.cpu_count()} CPU(s); each caller replays {len(pcm) / 2 / CLIENT_RATE:.1f} s of 48 kHz audio with 3 questions")
+    failures = 0
+    capacity = {}
+    for workers in args.workers:
+        print(f"  {workers} worker(s):")
+        front = FrontEnd(workers, args)
+        try:
+            capacity[workers] = 0
+            for sessions in args.sessions:
+                ok, _ = await level(front, pcm, sessions, args)
+                if not ok:
+                    break
+                capacity[workers] = sessions
+        finally:
+            front.close()
+    base = capacity[args.workers[0]] / args.workers[0]
+    for workers, sessions in capacity.items():
+        efficiency = sessions / (workers * base) if base else float("nan")
+        print(f"  {workers} worker(s): {sessions:4d} sessions per machine, scaling efficiency {efficiency * 100:3.0f}%")
+
+    front = FrontEnd(max(2, max(args.workers)), args)
+    try:
+        failures += not await sticky(front, args)
+        failures += not await drain(front, pcm, args)
+    finally:
+        front.close()
+    print(f"{failures} failing check(s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[50, 100, 200, 400], help="load levels, ascending")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="audio per WebSocket message")
+    parser.add_argument("--ramp", type=float, default=4.0, help="spread client starts over this many seconds")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="fake agent time to first token")
+    parser.add_argument("--p95-budget-ms", type=float, default=1500.0)
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
+
+
+if __name__ == "__main__":
+    main()
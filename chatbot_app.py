@@ -1,11 +1,12 @@
 import streamlit as st
 import asyncio
 import threading
-from agent import agent
+from sessions import get_agent_pool, new_session_id
 from polly import synthesize_and_play_direct
+from tts_client import get_tts_client
 from transcribe import MicStream, stream_to_transcribe
-import time
-import queue
+from transcribe_session import get_transcribe_session
+from live import LiveChannel, follow
 
 
 # Configure Streamlit page
@@ -16,19 +17,24 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Transcribe stream opens in the background now, so pressing record doesn't pay the setup
+transcribe_session = get_transcribe_session()
+
 # Initialize session state
+if 'agent_session' not in st.session_state:
+    st.session_state.agent_session = new_session_id()  # this browser session's own agent in the pool
+agent_session = st.session_state.agent_session  # read once: agent calls also run on recording threads
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'is_recording' not in st.session_state:
     st.session_state.is_recording = False
-if 'current_partial' not in st.session_state:
-    st.session_state.current_partial = ""
-if 'result_queue' not in st.session_state:
-    st.session_state.result_queue = queue.Queue()
+if 'live' not in st.session_state:
+    st.session_state.live = LiveChannel()  # recording thread -> UI updates
 if 'enable_tts' not in st.session_state:
     st.session_state.enable_tts = True
 if 'auto_play_audio' not in st.session_state:
     st.session_state.auto_play_audio = False
+live = st.session_state.live
 
 
 # Custom CSS for ChatGPT-like styling
@@ -115,7 +121,8 @@ def process_agent_response(response):
 def get_agent_response(user_input):
     """Get response from the agent"""
     try:
-        result = agent(user_input)
+        with get_agent_pool().session(agent_session) as agent:
+            result = agent(user_input)
         return process_agent_response(result)
     except Exception as e:
         return f"Error: {e}"
@@ -138,8 +145,21 @@ def play_audio_async(text):
     thread.start()
 
 
-def start_voice_recording(result_queue):
+async def stream_agent_response(user_input, channel):
+    """Stream the agent's reply into the live channel as it is generated"""
+    try:
+        with get_agent_pool().session(agent_session) as agent:
+            async for event in agent.stream_async(user_input):
+                if "data" in event:
+                    channel.append("reply", event["data"])
+    except Exception as e:
+        channel.append("reply", f"Error: {e}")
+
+
+def start_voice_recording(channel):
     """Start voice recording with live transcription"""
+    channel.reset(status="listening")
+
     def record_voice():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -147,26 +167,27 @@ def start_voice_recording(result_queue):
         try:
             async def on_partial(text):
                 """Handle partial transcription results"""
-                result_queue.put({"type": "partial", "text": text})
+                channel.publish(partial=text)
             
             async def on_final(text):
-                """Handle final transcription"""
+                """Handle final transcription and stream the agent response"""
                 if text.strip():
-                    result_queue.put({"type": "final", "text": text.strip()})
-                result_queue.put({"type": "done"})
+                    channel.publish(final=text.strip(), partial="", status="thinking")
+                    await stream_agent_response(text.strip(), channel)
+                channel.publish(status="done")
             
             async def record_with_transcribe():
                 """Main recording function"""
                 async with MicStream() as mic:
-                    await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final)
+                    await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final, session=transcribe_session, owner=agent_session)
             
             # Run the recording with timeout
             loop.run_until_complete(asyncio.wait_for(record_with_transcribe(), timeout=30.0))
             
         except asyncio.TimeoutError:
-            result_queue.put({"type": "timeout"})
+            channel.publish(status="timeout")
         except Exception as e:
-            result_queue.put({"type": "error", "message": str(e)})
+            channel.publish(status="error", error=str(e))
     
     # Start recording thread
     thread = threading.Thread(target=record_voice, daemon=True)
@@ -174,6 +195,34 @@ def start_voice_recording(result_queue):
     return thread
 
 
+def render_live(panel, state):
+    """Draw the in-progress turn from the channel's state"""
+    with panel.container():
+        if state["final"]:
+            with st.chat_message("user"):
+                st.write(state["final"])
+            with st.chat_message("assistant"):
+                st.write(state["reply"] or "🤔")
+        elif state["partial"]:
+            st.info(f"**Transcribing:** {state['partial']}")
+
+
+def finish_recording(state):
+    """Move a finished recording's turn into the conversation"""
+    if state["final"]:
+        st.session_state.messages.append({"role": "user", "content": state["final"]})
+        st.session_state.messages.append({"role": "assistant", "content": state["reply"]})
+        
+        # Auto-play response if enabled
+        if st.session_state.auto_play_audio and st.session_state.enable_tts:
+            play_audio_async(state["reply"])
+    elif state["status"] == "timeout":
+        st.session_state.notice = ("warning", "⏰ Recording timed out")
+    elif state["status"] == "error":
+        st.session_state.notice = ("error", f"❌ Recording error: {state['error']}")
+    st.session_state.is_recording = False
+
+
 def main():
     # Header with settings
     col1, col2, col3 = st.columns([2, 1, 1])
@@ -187,47 +236,13 @@ def main():
     with col3:
         if st.button("🗑️ Clear"):
             st.session_state.messages = []
+            get_agent_pool().reset(agent_session)
             st.rerun()
     
-    # Check for recording results
-    try:
-        while not st.session_state.result_queue.empty():
-            result = st.session_state.result_queue.get_nowait()
-            
-            if result["type"] == "partial":
-                st.session_state.current_partial = result["text"]
-            
-            elif result["type"] == "final":
-                user_text = result["text"]
-                st.session_state.messages.append({"role": "user", "content": user_text})
-                
-                # Get agent response
-                agent_response = get_agent_response(user_text)
-                st.session_state.messages.append({"role": "assistant", "content": agent_response})
-                
-                # Auto-play response if enabled
-                if st.session_state.auto_play_audio and st.session_state.enable_tts:
-                    play_audio_async(agent_response)
-                
-                st.session_state.is_recording = False
-                st.session_state.current_partial = ""
-            
-            elif result["type"] == "done":
-                st.session_state.is_recording = False
-                st.session_state.current_partial = ""
-            
-            elif result["type"] == "timeout":
-                st.session_state.is_recording = False
-                st.session_state.current_partial = ""
-                st.warning("⏰ Recording timed out")
-            
-            elif result["type"] == "error":
-                st.session_state.is_recording = False
-                st.session_state.current_partial = ""
-                st.error(f"❌ Recording error: {result['message']}")
-                
-    except queue.Empty:
-        pass
+    # Outcome of the last recording, shown once
+    notice = st.session_state.pop("notice", None)
+    if notice:
+        getattr(st, notice[0])(notice[1])
     
     # Chat messages container
     chat_container = st.container()
@@ -273,18 +288,14 @@ def main():
         st.markdown('<div class="recording-status">🔴 <strong>Recording...</strong> Speak now!</div>', 
                    unsafe_allow_html=True)
         
-        if st.session_state.current_partial:
-            st.info(f"**Transcribing:** {st.session_state.current_partial}")
+        # Filled in by follow() at the end of the script
+        live_panel = st.empty()
         
         # Stop button
         if st.button("⏹️ Stop Recording", type="secondary"):
             st.session_state.is_recording = False
-            st.session_state.current_partial = ""
+            live.reset()
             st.rerun()
-        
-        # Auto-refresh
-        time.sleep(0.5)
-        st.rerun()
     
     # Bottom input area (ChatGPT-like)
     st.markdown("---")
@@ -328,12 +339,8 @@ def main():
         
         elif voice_btn:
             st.session_state.is_recording = True
-            st.session_state.current_partial = ""
-            # Clear queue
-            while not st.session_state.result_queue.empty():
-                st.session_state.result_queue.get_nowait()
             # Start recording
-            start_voice_recording(st.session_state.result_queue)
+            start_voice_recording(live)
             st.rerun()
     
     # Settings in sidebar
@@ -356,6 +363,17 @@ def main():
             st.metric("Your Messages", user_msgs)
             st.metric("Agent Responses", total - user_msgs)
         
+        tts_stats = get_tts_client().stats() if hasattr(get_tts_client(), "stats") else {}
+        if tts_stats.get("cache", {}).get("lookups"):
+            cache_stats = tts_stats["cache"]
+            st.metric("TTS Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            st.caption(f"{cache_stats['bytes_saved'] / 1024:.0f} KB of audio served without calling Polly")
+
+        stt_stats = transcribe_session.stats()
+        if stt_stats["lease_wait_p50_ms"] is not None:
+            st.metric("Record → Streaming", f"{stt_stats['lease_wait_p50_ms']:.0f} ms")
+            st.caption(f"{stt_stats['streams_opened']} Transcribe streams opened, {stt_stats['reconnects']} reconnects")
+
         st.markdown("---")
         st.header("💡 Tips")
         st.markdown("""
@@ -364,6 +382,12 @@ def main():
         - **Audio**: Toggle 🔊 to enable/disable TTS
         - **Clear**: Remove all conversation history
         """)
+    
+    # While recording, push live updates into the panel (no reruns); rerun once when the turn is done
+    if st.session_state.is_recording:
+        state = follow(live, lambda state: render_live(live_panel, state))
+        finish_recording(state)
+        st.rerun()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 
-import boto3
-from strands.models import BedrockModel
+import os
+import shlex
+import threading
 
 
 
@@ -9,23 +10,136 @@ model_id = "anthropic.claude-3-5-sonnet-20241022-v2:0"
 
 region_name = "us-west-2"
 
+# Polly: parallel synthesize_speech calls (and pooled HTTP connections); threads start on demand,
+# so the voice server's share (SERVER_POLLY_CONCURRENCY) costs the single-user apps nothing
+polly_max_concurrency = int(os.environ.get("POLLY_MAX_CONCURRENCY", "32"))
 
+# Set to a local stub (e.g. fakes.StubPollyServer) to run TTS offline
+polly_endpoint_url = os.environ.get("POLLY_ENDPOINT_URL") or None
 
+# Synthesized speech cache (memory LRU + on-disk tier); set TTS_CACHE_DIR="" to disable
+tts_cache_dir = os.environ.get("TTS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "voice_agent", "tts")) or None
+tts_cache_memory_mb = int(os.environ.get("TTS_CACHE_MEMORY_MB", "32"))
 
+# Text-to-speech: "polly", "local" (CPU synthesizer, see tts_backends.py) or "auto" (short phrases local, failover)
+tts_backend = os.environ.get("TTS_BACKEND", "polly")
+tts_local_command = shlex.split(os.environ.get("TTS_LOCAL_COMMAND", "espeak-ng --stdout --stdin -v en-us -s 170"))
 
-# Create a custom boto3 session
-session = boto3.Session( # Optional: Use a specific profile
-)
+# Start the agent on stable partial transcripts (see endpointing.py); SPECULATIVE_TURNS=0 waits for finals
+speculative_turns = os.environ.get("SPECULATIVE_TURNS", "1") != "0"
 
-# Create a Bedrock model with the custom session
-bedrock_model = BedrockModel(
-    model_id=model_id,
-    boto_session=session
-)
+# Speech-to-text: "aws" (Transcribe streaming) or "local" (Vosk in worker processes, see stt.py)
+stt_backend = os.environ.get("STT_BACKEND", "aws")
+vosk_model_path = os.environ.get("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
 
+# Streamlit apps: per-session agents kept at once, and how long an idle session's conversation is kept
+agent_pool_size = int(os.environ.get("AGENT_POOL_SIZE", "64"))
+agent_idle_ttl_s = float(os.environ.get("AGENT_IDLE_TTL_S", "1800"))
 
+# Clip (file-mode) transcription: clips at once, and how much faster than real time to stream
+# them to Transcribe (0 = as fast as it accepts; the local engine is never paced)
+batch_workers = int(os.environ.get("BATCH_WORKERS", "4"))
+batch_speed = float(os.environ.get("BATCH_SPEED", "2")) or None
 
-transcribe_client = boto3.client('transcribe',region_name="us-west-2")
+# Voice server (server.py): listen address, connections at once, and concurrent calls across all sessions
+# (Polly calls also queue on POLLY_MAX_CONCURRENCY threads, so raise both together). Sized together:
+# benchmarks/server_load.py keeps p95 turn latency in budget at 64 sessions with 32 turns and 32 Polly
+# calls at once, while 100 sessions or 16 turns at once cut replies off; every session holds a stream
+server_host = os.environ.get("SERVER_HOST", "0.0.0.0")
+server_port = int(os.environ.get("SERVER_PORT", "8765"))
+server_max_sessions = int(os.environ.get("SERVER_MAX_SESSIONS", "64"))
+server_bedrock_concurrency = int(os.environ.get("SERVER_BEDROCK_CONCURRENCY", "32"))
+server_transcribe_concurrency = int(os.environ.get("SERVER_TRANSCRIBE_CONCURRENCY", str(server_max_sessions)))
+server_polly_concurrency = int(os.environ.get("SERVER_POLLY_CONCURRENCY", str(polly_max_concurrency)))
 
-polly_client = boto3.client('polly',region_name='us-west-2')
+# Key that signs the session ids the voice server issues (a client can only reattach to an id it was given).
+# Random per process unless set; set the same value on every front-end that shares clients
+server_session_secret = os.environ.get("SERVER_SESSION_SECRET", "").encode() or os.urandom(32)
 
+# Worker processes behind the voice server front-end (workers.py); 0 = one per CPU.
+# The limits above are split between them, SERVER_MAX_SESSIONS applies to each
+server_workers = int(os.environ.get("SERVER_WORKERS", "0")) or os.cpu_count() or 1
+
+# Per-turn latency tracing (tracing.py); TRACING=0 turns it off. By default only the in-process p50/p95/p99 are
+# kept; set TRACE_LOG to a path to append finished turns as JSONL (unbounded, and each line holds the user's
+# transcript). Turns go to OpenTelemetry as well when it is installed
+tracing_enabled = os.environ.get("TRACING", "1") != "0"
+trace_log = os.environ.get("TRACE_LOG", "") or None
+
+# Hot-path profiling (profiling.py), off unless PROFILING=1: audio callback timings, PortAudio over/underflows,
+# event-loop lag and queue depths as Prometheus text on PROFILING_PORT (/metrics; /profile?seconds=N for stacks,
+# PROFILING_PORT=0 for no endpoint) and a log line every PROFILING_LOG_S seconds. SIGUSR1 starts the sampling
+# profiler and the next SIGUSR1 writes its folded stacks to PROFILE_DIR
+profiling = os.environ.get("PROFILING", "0") == "1"
+profiling_host = os.environ.get("PROFILING_HOST", "127.0.0.1")
+profiling_port = int(os.environ.get("PROFILING_PORT", "9464"))
+profiling_log_s = float(os.environ.get("PROFILING_LOG_S", "10"))
+profile_dir = os.environ.get("PROFILE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "voice_agent", "profiles"))
+
+# Append each utterance's transcript events to this JSONL file (for benchmarks/early_endpointing.py)
+transcript_log = os.environ.get("TRANSCRIPT_LOG") or None
+
+
+
+
+
+# AWS clients and the Bedrock model are built on first use (importing config stays cheap,
+# so entry points and Streamlit reruns don't pay for boto3/strands until they need them).
+# config.session etc. still work; they call the getters below.
+
+_lock = threading.RLock()
+_session = None
+_bedrock_model = None
+_transcribe_client = None
+_polly_client = None
+
+
+def get_session():
+    """Shared boto3 session, created on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            import boto3
+
+            _session = boto3.Session()  # Optional: Use a specific profile
+        return _session
+
+
+def get_bedrock_model():
+    global _bedrock_model
+    with _lock:
+        if _bedrock_model is None:
+            from strands.models import BedrockModel
+
+            _bedrock_model = BedrockModel(model_id=model_id, boto_session=get_session())
+        return _bedrock_model
+
+
+def get_transcribe_client():
+    global _transcribe_client
+    with _lock:
+        if _transcribe_client is None:
+            _transcribe_client = get_session().client("transcribe", region_name=region_name)
+        return _transcribe_client
+
+
+def get_polly_client():
+    global _polly_client
+    with _lock:
+        if _polly_client is None:
+            _polly_client = get_session().client("polly", region_name=region_name)
+        return _polly_client
+
+
+_lazy = {
+    "session": get_session,
+    "bedrock_model": get_bedrock_model,
+    "transcribe_client": get_transcribe_client,
+    "polly_client": get_polly_client,
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        return _lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
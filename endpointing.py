@@ -0,0 +1,195 @@
+"""
+Early endpointing (speculative turns) for the voice loop.
+- Starts the agent on a partial transcript once it has been unchanged for a short
+  window, or as soon as the local VAD reports end of speech, instead of waiting
+  for Transcribe's final result.
+- The speculative reply is generated but held back. When the final arrives it is
+  committed if the words match (buffered deltas are replayed, the rest streams on),
+  otherwise it is cancelled, rolled back out of the agent's history, and the turn
+  restarts on the final text.
+- Counts head start gained per committed turn and speculative calls wasted.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from agent_runner import AgentRunner, Checkpoint
+
+# ---------- Config ----------
+STABLE_MS = 400  # partial unchanged this long -> speculate
+MIN_SPECULATE_CHARS = 6  # don't speculate on "hi" / "uh"
+
+_NOT_WORD = re.compile(r"[^\w\s']+")
+
+
+def normalize(text: str) -> str:
+    """Compare transcripts by words only (finals add casing and punctuation)."""
+    return " ".join(_NOT_WORD.sub(" ", text.lower()).split())
+
+
+class _Speculation:
+    """An agent turn started on a partial; deltas are buffered until commit."""
+
+    def __init__(self, runner: AgentRunner, prompt: str):
+        self.prompt = prompt
+        self.key = normalize(prompt)
+        self.started = time.monotonic()
+        self.checkpoint = Checkpoint()
+        self._deltas: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(runner))
+
+    async def _pump(self, runner: AgentRunner):
+        try:
+            async for delta in runner.stream(self.prompt, checkpoint=self.checkpoint):
+                self._deltas.put_nowait(delta)
+            self._deltas.put_nowait(None)
+        except Exception as e:
+            self._deltas.put_nowait(e)
+
+    async def replay(self) -> AsyncIterator[str]:
+        """Buffered deltas first, then the rest as the agent produces them."""
+        try:
+            while True:
+                item = await self._deltas.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.task.cancel()
+
+
+class EarlyEndpointer:
+    """Turns Transcribe partials into agent turns before the final arrives.
+
+    Wire on_partial / on_final (and on_speech_end from the VAD) to
+    transcribe.stream_to_transcribe. Each turn is handed to
+    `start_turn(text, tokens)`, where `tokens` is the async iterator of the
+    agent's text deltas (e.g. for speech.SpeechPipeline.speak).
+    """
+
+    def __init__(
+        self,
+        runner: AgentRunner,
+        start_turn: Callable[[str, AsyncIterator[str]], object],
+        stable_ms: int = STABLE_MS,
+        min_chars: int = MIN_SPECULATE_CHARS,
+    ):
+        self.runner = runner
+        self.start_turn = start_turn
+        self.stable_ms = stable_ms
+        self.min_chars = min_chars
+        self._partial = ""
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._speculation: Optional[_Speculation] = None
+        self.speculated = 0
+        self.committed = 0
+        self.wasted = 0
+        self.head_starts: List[float] = []  # seconds the agent ran before each committed final
+
+    # ---------- Transcript events ----------
+
+    async def on_partial(self, text: str):
+        if text == self._partial:
+            return
+        self._partial = text
+        if self._speculation is not None and normalize(text) != self._speculation.key:
+            self._discard()  # the user kept talking
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.stable_ms / 1000, self._speculate, text)
+
+    async def on_speech_end(self, text: Optional[str] = None):
+        """Local end of utterance (vad.VoiceActivityDetector): speculate right away."""
+        self._speculate(text or self._partial)
+
+    async def on_final(self, text: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._partial = ""
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None and speculation.key == normalize(text):
+            self.committed += 1
+            self.head_starts.append(time.monotonic() - speculation.started)
+            tokens = speculation.replay()
+        else:
+            if speculation is not None:
+                self._discard(speculation)
+            tokens = self.runner.stream(text)
+        self.start_turn(text, tokens)
+
+    # ---------- Speculation ----------
+
+    def _speculate(self, text: str):
+        if len(text.strip()) < self.min_chars:
+            return
+        if self._speculation is not None:
+            if self._speculation.key == normalize(text):
+                return
+            self._discard()
+        self._speculation = _Speculation(self.runner, text)
+        self.speculated += 1
+
+    def _discard(self, speculation: Optional[_Speculation] = None):
+        if speculation is None:
+            speculation, self._speculation = self._speculation, None
+        speculation.task.cancel()
+        self.runner.rollback(speculation.checkpoint)
+        self.wasted += 1
+
+    def stats(self) -> dict:
+        head_starts = sorted(self.head_starts)
+        return {
+            "speculated": self.speculated,
+            "committed": self.committed,
+            "wasted": self.wasted,
+            "wasted_rate": self.wasted / self.speculated if self.speculated else 0.0,
+            "mean_head_start_ms": 1000 * sum(head_starts) / len(head_starts) if head_starts else 0.0,
+        }
+
+
+# ---------- Recording ----------
+
+class TranscriptRecorder:
+    """Logs transcript events with timestamps, for benchmarks/early_endpointing.py.
+
+    Wraps the callbacks passed to stream_to_transcribe and appends one JSON line
+    per utterance to `path`: {"events": [[t, "partial"|"speech_end"|"final", text], ...]}.
+    """
+
+    def __init__(self, path: str, on_partial=None, on_final=None, on_speech_end=None):
+        self.path = path
+        self._on_partial = on_partial
+        self._on_final = on_final
+        self._on_speech_end = on_speech_end
+        self._events: list = []
+        self._started: Optional[float] = None
+
+    def _record(self, kind: str, text: str):
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        self._events.append([round(now - self._started, 3), kind, text])
+
+    async def on_partial(self, text: str):
+        self._record("partial", text)
+        if self._on_partial:
+            await self._on_partial(text)
+
+    async def on_speech_end(self, text: Optional[str] = None):
+        self._record("speech_end", text or "")
+        if self._on_speech_end:
+            await self._on_speech_end(text)
+
+    async def on_final(self, text: str):
+        self._record("final", text)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"events": self._events}) + "\n")
+        self._events, self._started = [], None
+        if self._on_final:
+            await self._on_final(text)
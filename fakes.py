@@ -0,0 +1,642 @@
+"""
+Deterministic local stand-ins for the voice loop's cloud services.
+- fake_agent_stream: token stream with configurable first-token delay and token rate.
+- FakeAgent: strands.Agent stand-in (stream_async and __call__), optionally blocking.
+- FakePolly: Polly-shaped TTS returning generated 16 kHz int16 PCM (sine, optional noise) after a simulated
+  round trip, optionally throttling.
+- StubPollyServer: local HTTP server speaking Polly's SynthesizeSpeech REST API.
+- FakeOutput: real-time paced audio sink that records when audio started.
+- FakeOutputStream: sounddevice.OutputStream stand-in driving the callback from a thread.
+- synthetic_mic_frames: 20 ms int16 frames of background noise and speech-like bursts.
+- FakeInputStream: sounddevice.InputStream stand-in feeding frames to the callback in real time.
+- FakeAudioFrame / synthetic_webrtc_frames / FakeAudioReceiver: browser (streamlit-webrtc) audio frames.
+- EnergyRecognizer: deterministic energy-based recognizer (an stt.LocalSTTBackend engine).
+- FakeTranscribeClient: streaming Transcribe stand-in with setup latency, idle timeout, injected failures and
+  optionally scripted transcripts.
+
+Used to measure latency offline (see benchmarks/), no AWS credentials needed.
+"""
+
+import asyncio
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---------- Config ----------
+SAMPLE_RATE = 16000
+SECONDS_PER_CHAR = 0.065  # ~15 chars/s, roughly Polly's speaking rate
+FRAME_SAMPLES = 320  # 20 ms at 16 kHz, same as transcribe.CHUNK_SAMPLES
+
+DEFAULT_REPLY = (
+    "Sure, I can help with that. It's currently a quarter past three in the afternoon. "
+    "If you'd like, I can also set a reminder, check your calendar, or tell you the weather "
+    "for the rest of the day. Just let me know what you need next."
+)
+
+
+# ---------- Agent ----------
+
+async def fake_agent_stream(
+    text: str = DEFAULT_REPLY,
+    first_token_delay: float = 0.6,
+    tokens_per_second: float = 40.0,
+) -> AsyncIterator[str]:
+    """Yield `text` word by word like a streaming LLM."""
+    await asyncio.sleep(first_token_delay)
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        yield word if i == len(words) - 1 else word + " "
+        await asyncio.sleep(1.0 / tokens_per_second)
+
+
+class FakeAgent:
+    """strands.Agent stand-in with a scripted reply.
+
+    With blocking=True the delays are time.sleep calls, like a synchronous
+    HTTP call made inside the model, stalling whatever loop runs the agent.
+    """
+
+    def __init__(
+        self,
+        reply: str = DEFAULT_REPLY,
+        first_token_delay: float = 0.6,
+        tokens_per_second: float = 40.0,
+        blocking: bool = False,
+    ):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.blocking = blocking
+        self.calls = 0
+        self.messages = []  # conversation history, like strands.Agent.messages
+
+    async def _sleep(self, seconds: float):
+        if self.blocking:
+            time.sleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
+
+    async def stream_async(self, prompt: str):
+        self.calls += 1
+        self.messages.append({"role": "user", "content": [{"text": prompt}]})
+        await self._sleep(self.first_token_delay)
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            yield {"data": word if i == len(words) - 1 else word + " "}
+            await self._sleep(1.0 / self.tokens_per_second)
+        self.messages.append({"role": "assistant", "content": [{"text": self.reply}]})
+
+    def __call__(self, prompt: str):
+        self.calls += 1
+        self.messages.append({"role": "user", "content": [{"text": prompt}]})
+        time.sleep(self.first_token_delay + len(self.reply.split(" ")) / self.tokens_per_second)
+        self.messages.append({"role": "assistant", "content": [{"text": self.reply}]})
+        return FakeAgentResult(self.reply)
+
+
+class FakeAgentResult:
+    def __init__(self, text: str):
+        self.message = {"role": "assistant", "content": [{"text": text}]}
+
+    def __str__(self):
+        return self.message["content"][0]["text"]
+
+
+# ---------- TTS ----------
+
+def generate_pcm(
+    text: str,
+    samplerate: int = SAMPLE_RATE,
+    seconds_per_char: float = SECONDS_PER_CHAR,
+    noise_level: float = 0.0,
+) -> bytes:
+    """Deterministic speech-length tone for `text` (plus seeded noise) as int16 PCM bytes."""
+    n = max(1, int(len(text) * seconds_per_char * samplerate))
+    t = np.arange(n, dtype=np.float32) / samplerate
+    seed = sum(map(ord, text))
+    freq = 180.0 + (seed % 60)
+    wave = 0.2 * np.sin(2 * np.pi * freq * t)
+    if noise_level:
+        wave += noise_level * np.random.default_rng(seed).standard_normal(n)
+    return (np.clip(wave, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+class ThrottlingException(Exception):
+    """What FakePolly raises when throttled, like botocore's ClientError code."""
+
+
+class FakePolly:
+    """Polly stand-in: fixed round trip plus a per-character synthesis cost.
+
+    With throttle_rate > 0 a seeded fraction of calls raises ThrottlingException
+    after the round trip; `throttled` counts them.
+    """
+
+    name = "polly"
+    engine = "standard"
+
+    def __init__(
+        self,
+        base_latency: float = 0.15,
+        latency_per_char: float = 0.001,
+        throttle_rate: float = 0.0,
+        noise_level: float = 0.0,
+        seed: int = 0,
+    ):
+        self.base_latency = base_latency
+        self.latency_per_char = latency_per_char
+        self.throttle_rate = throttle_rate
+        self.noise_level = noise_level
+        self._rng = np.random.default_rng(seed)
+        self.calls = 0
+        self.throttled = 0
+
+    def _latency(self, text: str) -> float:
+        return self.base_latency + self.latency_per_char * len(text)
+
+    def _maybe_throttle(self):
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            self.throttled += 1
+            raise ThrottlingException("Rate exceeded")
+
+    async def synthesize(self, text: str, voice_id: str = "Joanna") -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self._latency(text))
+        self._maybe_throttle()
+        return generate_pcm(text, noise_level=self.noise_level)
+
+    async def open_stream(self, text: str, voice_id: str = "Joanna"):
+        return io.BytesIO(await self.synthesize(text, voice_id))
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "throttled": self.throttled}
+
+    def close(self):
+        pass
+
+    def synthesize_speech(self, Text, OutputFormat="pcm", VoiceId="Joanna", SampleRate="16000", **kwargs):
+        """Blocking boto3-compatible signature (drop-in for config.polly_client)."""
+        self.calls += 1
+        time.sleep(self._latency(Text))
+        pcm = generate_pcm(Text, samplerate=int(SampleRate))
+        return {"AudioStream": io.BytesIO(pcm), "ContentType": "audio/pcm"}
+
+
+class StubPollyServer:
+    """Local stand-in for the Polly endpoint (POST /v1/speech), run on a thread.
+
+    Point a boto3 Polly client (or tts_client.PollyTTSClient) at `url` to
+    exercise the real HTTP path - connection pooling, threads, parsing -
+    without AWS. Latency follows the same model as FakePolly.
+    """
+
+    def __init__(self, base_latency: float = 0.15, latency_per_char: float = 0.001, port: int = 0):
+        latency = FakePolly(base_latency, latency_per_char)._latency
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                text = body.get("Text", "")
+                time.sleep(latency(text))
+                pcm = generate_pcm(text, samplerate=int(body.get("SampleRate", SAMPLE_RATE)))
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/pcm")
+                self.send_header("Content-Length", str(len(pcm)))
+                self.send_header("x-amzn-RequestCharacters", str(len(text)))
+                self.end_headers()
+                self.wfile.write(pcm)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubPollyServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+# ---------- Audio output ----------
+
+class FakeOutput:
+    """Audio sink that 'plays' PCM in real time without a sound device."""
+
+    def __init__(self, samplerate: int = SAMPLE_RATE, realtime: bool = True):
+        self.samplerate = samplerate
+        self.realtime = realtime
+        self.first_write: Optional[float] = None
+        self.bytes_written = 0
+        self._play_until = 0.0
+
+    async def write(self, pcm: bytes):
+        now = time.monotonic()
+        if self.first_write is None:
+            self.first_write = now
+        self.bytes_written += len(pcm)
+        duration = len(pcm) / 2 / self.samplerate
+        self._play_until = max(self._play_until, now) + duration
+        if self.realtime:
+            # Behave like a blocking device write: return once most of it is queued.
+            await asyncio.sleep(max(0.0, self._play_until - now - 0.05))
+
+    async def drain(self):
+        if self.realtime:
+            await asyncio.sleep(max(0.0, self._play_until - time.monotonic()))
+
+
+class FakeOutputStream:
+    """sounddevice.OutputStream stand-in: a thread pulls one block per block period.
+
+    Pass as `stream_factory` to playback.AudioOutput to run playback without a device.
+    """
+
+    def __init__(self, samplerate, channels, dtype, blocksize, callback):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.blocks_played = 0
+        self.last_audible: Optional[float] = None  # when a non-silent block was last played
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        deadline = time.monotonic()
+        while self._running.is_set():
+            outdata = np.zeros((self.blocksize, self.channels), dtype=np.int16)
+            self.callback(outdata, self.blocksize, None, None)
+            self.blocks_played += 1
+            if outdata.any():
+                self.last_audible = time.monotonic()
+            deadline += period
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+# ---------- Microphone ----------
+
+def synthetic_mic_frames(
+    pattern: Sequence[Tuple[str, float]],
+    samplerate: int = SAMPLE_RATE,
+    frame_samples: int = FRAME_SAMPLES,
+    seed: int = 0,
+    noise_level: float = 0.001,
+) -> Iterator[bytes]:
+    """Yield int16 PCM frames for a pattern like [("silence", 1.0), ("speech", 0.8)].
+
+    Silence is background noise (about -60 dBFS at the default `noise_level`);
+    speech is a voiced harmonic signal with a syllable-rate envelope (about -20 dBFS).
+    """
+    rng = np.random.default_rng(seed)
+    for kind, seconds in pattern:
+        n = int(seconds * samplerate)
+        t = np.arange(n, dtype=np.float32) / samplerate
+        noise = rng.normal(0, noise_level, n).astype(np.float32)
+        if kind == "speech":
+            f0 = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+            phase = 2 * np.pi * np.cumsum(f0) / samplerate
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+            envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 4 * t))
+            signal = 0.15 * envelope * voiced + noise
+        else:
+            signal = noise
+        pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+        for start in range(0, n - frame_samples + 1, frame_samples):
+            yield pcm[start : start + frame_samples].tobytes()
+
+
+class FakeInputStream:
+    """sounddevice.InputStream stand-in: a thread delivers `frames` at real-time pace.
+
+    Pass `functools.partial(FakeInputStream, frames=...)` as `stream_factory`
+    to transcribe.MicStream. `speed` > 1 delivers faster than real time.
+    """
+
+    def __init__(self, samplerate, channels, dtype, callback, blocksize, frames=(), speed: float = 1.0):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.frames = frames
+        self.speed = speed
+        self.finished = threading.Event()
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        deadline = time.monotonic()
+        for pcm in self.frames:
+            if not self._running.is_set():
+                break
+            indata = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.channels)
+            self.callback(indata, indata.shape[0], None, None)
+            deadline += indata.shape[0] / self.samplerate / self.speed
+            time.sleep(max(0.0, deadline - time.monotonic()))
+        self.finished.set()
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+class _Named:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+class FakeAudioFrame:
+    """av.AudioFrame stand-in, as streamlit-webrtc delivers browser audio.
+
+    `samples` is (samples, channels) int16; `format` is "s16" (packed:
+    to_ndarray() is (1, samples * channels)) or "fltp" (planar float:
+    (channels, samples)).
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int, format: str = "s16"):
+        self._samples = samples
+        self.sample_rate = sample_rate
+        self.samples = samples.shape[0]
+        self.layout = _Named(channels=[None] * samples.shape[1])
+        self.format = _Named(name=format, is_planar=format.endswith("p"))
+
+    def to_ndarray(self) -> np.ndarray:
+        if self.format.name == "fltp":
+            return (self._samples.T / 32768).astype(np.float32)
+        return self._samples.reshape(1, -1)
+
+
+def synthetic_webrtc_frames(
+    pattern: Sequence[Tuple[str, float]],
+    sample_rate: int = 48000,
+    channels: int = 2,
+    format: str = "s16",
+    frame_ms: int = 20,
+    seed: int = 0,
+) -> Iterator[FakeAudioFrame]:
+    """synthetic_mic_frames' audio as browser frames at `sample_rate` (interpolated up from 16 kHz)."""
+    pcm = np.frombuffer(b"".join(synthetic_mic_frames(pattern, seed=seed)), dtype=np.int16).astype(np.float32)
+    n = int(pcm.size * sample_rate / SAMPLE_RATE)
+    up = np.interp(np.arange(n) * SAMPLE_RATE / sample_rate, np.arange(pcm.size), pcm).astype(np.int16)
+    stereo = np.repeat(up[:, None], channels, axis=1)
+    step = sample_rate * frame_ms // 1000
+    for start in range(0, n - step + 1, step):
+        yield FakeAudioFrame(stereo[start : start + step], sample_rate, format)
+
+
+class FakeAudioReceiver:
+    """streamlit-webrtc AudioReceiver stand-in: get_frames() hands out `frames` in real time."""
+
+    def __init__(self, frames, speed: float = 1.0):
+        self._frames = list(frames)
+        self._speed = speed
+        self._next = time.monotonic()
+
+    def get_frames(self, timeout: float = 1.0):
+        if not self._frames:
+            raise ConnectionError("browser disconnected")  # what the real receiver does at the end
+        frame = self._frames.pop(0)
+        self._next += frame.samples / frame.sample_rate / self._speed
+        time.sleep(max(0.0, self._next - time.monotonic()))
+        return [frame]
+
+
+# ---------- Transcribe ----------
+
+class _FakeInputStream:
+    def __init__(self, stream: "FakeTranscribeStream"):
+        self._stream = stream
+
+    async def send_audio_event(self, audio_chunk: bytes):
+        self._stream._receive(audio_chunk)
+
+    async def end_stream(self):
+        self._stream._finish()
+
+
+class EnergyRecognizer:
+    """Deterministic "speech recognizer": partials every 200 ms of speech, a final after 500 ms of silence
+    (`final_silence_frames` of 20 ms).
+
+    It only looks at frame energy, so the words are placeholders ("w1 w2 ..."),
+    but the same audio always yields the same transcript. Same interface as
+    stt.VoskRecognizer: accept(pcm) and finish() return [(is_partial, text), ...].
+    """
+
+    SPEECH_DB = -40.0
+    FRAMES_PER_WORD = 10
+    FINAL_SILENCE_FRAMES = 25
+
+    def __init__(self, final_silence_frames: int = FINAL_SILENCE_FRAMES):
+        self.final_silence_frames = final_silence_frames
+        self._pending = b""
+        self._speech_frames = 0
+        self._silence_frames = 0
+
+    def accept(self, pcm: bytes):
+        data = self._pending + pcm
+        frame_bytes = FRAME_SAMPLES * 2
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        frames = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, FRAME_SAMPLES).astype(np.float32)
+        levels = 20 * np.log10(np.maximum(np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0, 1e-6))
+        results = []
+        for level in levels:
+            if level >= self.SPEECH_DB:
+                self._silence_frames = 0
+                self._speech_frames += 1
+                if self._speech_frames % self.FRAMES_PER_WORD == 1:
+                    results.append((True, self._words()))
+            elif self._speech_frames:
+                self._silence_frames += 1
+                if self._silence_frames >= self.final_silence_frames:
+                    results.append(self._final())
+        return results
+
+    def finish(self):
+        return [self._final()] if self._speech_frames else []
+
+    def _words(self) -> str:
+        return " ".join(f"w{i + 1}" for i in range(self._speech_frames // self.FRAMES_PER_WORD + 1))
+
+    def _final(self):
+        text = self._words().capitalize() + "."
+        self._speech_frames = self._silence_frames = 0
+        return (False, text)
+
+
+class FakeTranscribeStream:
+    """One streaming transcription, recognized by EnergyRecognizer, as Transcribe events.
+
+    With `transcripts`, utterance n's final reads transcripts[n] (cycling) and
+    its partials the matching number of leading words, instead of "w1 w2 ...".
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float,
+        fail_after_bytes: Optional[int],
+        transcripts: Sequence[str] = (),
+        final_silence_frames: int = EnergyRecognizer.FINAL_SILENCE_FRAMES,
+    ):
+        self.input_stream = _FakeInputStream(self)
+        self.output_stream = self._results()
+        self.bytes_received = 0
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._fail_after_bytes = fail_after_bytes
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._recognizer = EnergyRecognizer(final_silence_frames)
+        self._transcripts = list(transcripts)
+        self._utterance = 0
+        self._last_audio = time.monotonic()
+        self._watchdog = asyncio.ensure_future(self._watch_idle(idle_timeout))
+
+    async def _results(self):
+        while True:
+            item = await self._events.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def _watch_idle(self, idle_timeout: float):
+        while not self._closed:
+            await asyncio.sleep(min(idle_timeout, 0.1))
+            if time.monotonic() - self._last_audio > idle_timeout:
+                self._fail(TimeoutError(f"no new audio was received for {idle_timeout:.0f} seconds"))
+
+    def _fail(self, error: Exception):
+        if self._closed:
+            return
+        self._error = error
+        self._closed = True
+        self._watchdog.cancel()
+        self._events.put_nowait(error)
+
+    def _receive(self, audio: bytes):
+        if self._error is not None:
+            raise ConnectionError(f"stream is closed: {self._error}")
+        if self._closed:
+            raise ConnectionError("stream is closed")
+        self.bytes_received += len(audio)
+        self._last_audio = time.monotonic()
+        if self._fail_after_bytes is not None and self.bytes_received > self._fail_after_bytes:
+            self._fail(ConnectionResetError("connection reset by peer"))
+            raise ConnectionError("connection reset by peer")
+        for partial, text in self._recognizer.accept(audio):
+            self._emit(partial, text)
+
+    def _emit(self, partial: bool, text: str):
+        from amazon_transcribe.model import Alternative, Result, Transcript, TranscriptEvent
+
+        if self._transcripts:
+            script = self._transcripts[self._utterance % len(self._transcripts)]
+            text = " ".join(script.split()[: len(text.split())]) if partial else script
+        result = Result(
+            result_id=f"fake-{id(self):x}-{self._utterance}",
+            is_partial=partial,
+            alternatives=[Alternative(transcript=text, items=[], entities=[])],
+        )
+        self._events.put_nowait(TranscriptEvent(transcript=Transcript(results=[result])))
+        if not partial:
+            self._utterance += 1
+
+    def _finish(self):
+        if self._closed:
+            return
+        for partial, text in self._recognizer.finish():
+            self._emit(partial, text)
+        self._closed = True
+        self._watchdog.cancel()
+        self._events.put_nowait(None)
+
+
+class FakeTranscribeClient:
+    """TranscribeStreamingClient stand-in: a local fake streaming endpoint.
+
+    Each start_stream_transcription costs `setup_delay` (stream handshake); the
+    first one on a client also pays `connect_delay` (TCP + TLS), which later
+    streams reuse. Streams close after `idle_timeout` seconds without audio,
+    like the service's 15 s limit, and with `fail_after_bytes` the first
+    `fail_streams` streams break after receiving that much audio. `transcripts`
+    scripts what each stream's utterances say (see FakeTranscribeStream), and
+    `final_silence_ms` is the pause the service waits for before a final
+    (longer than the VAD's silence tail keeps a result open across pauses).
+    """
+
+    def __init__(
+        self,
+        setup_delay: float = 0.15,
+        connect_delay: float = 0.25,
+        idle_timeout: float = 15.0,
+        fail_after_bytes: Optional[int] = None,
+        fail_streams: int = 1,
+        transcripts: Sequence[str] = (),
+        final_silence_ms: int = 500,
+    ):
+        self.setup_delay = setup_delay
+        self.connect_delay = connect_delay
+        self.idle_timeout = idle_timeout
+        self.fail_after_bytes = fail_after_bytes
+        self.fail_streams = fail_streams
+        self.transcripts = transcripts
+        self.final_silence_ms = final_silence_ms
+        self.streams = []
+        self._connected = False
+
+    async def start_stream_transcription(self, **kwargs) -> FakeTranscribeStream:
+        await asyncio.sleep(self.setup_delay + (0 if self._connected else self.connect_delay))
+        self._connected = True
+        fail_after = self.fail_after_bytes if len(self.streams) < self.fail_streams else None
+        final_silence_frames = self.final_silence_ms * SAMPLE_RATE // 1000 // FRAME_SAMPLES
+        stream = FakeTranscribeStream(self.idle_timeout, fail_after, self.transcripts, final_silence_frames)
+        self.streams.append(stream)
+        return stream
@@ -0,0 +1,67 @@
+"""
+Push updates from recording threads to the Streamlit UI.
+- Worker threads publish() state changes (partial transcript, final, agent
+  reply tokens, status) into a per-session LiveChannel; they never touch
+  st.session_state.
+- The script follow()s the channel while a recording runs, redrawing only its
+  live placeholders (st.empty) the moment something changes. Streamlit sends
+  each placeholder update to the browser over its websocket, so there is no
+  sleep-and-rerun loop: the history is rendered once per turn, and a partial
+  shows up as soon as Transcribe delivers it.
+"""
+
+import threading
+from typing import Callable, Tuple
+
+# ---------- Config ----------
+WAKE_S = 0.25  # follow() redraws at least this often, so a button click can interrupt it
+DONE = ("done", "error", "timeout")  # statuses that end a recording
+
+
+class LiveChannel:
+    """Latest live state of one session, versioned; readers block until it changes."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.version = 0
+        self.state = {}
+        self.reset()
+
+    def reset(self, **state):
+        with self._cond:
+            self.state = {"status": "idle", "partial": "", "final": "", "reply": "", "error": "", **state}
+            self.version += 1
+            self._cond.notify_all()
+
+    def publish(self, **changes):
+        with self._cond:
+            self.state.update(changes)
+            self.version += 1
+            self._cond.notify_all()
+
+    def append(self, key: str, text: str):
+        """Extend a text field in place, e.g. agent reply tokens."""
+        with self._cond:
+            self.state[key] = self.state.get(key, "") + text
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, version: int, timeout: float = WAKE_S) -> Tuple[int, dict]:
+        """Wait until the state is newer than `version`; return (version, copy of state)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version, dict(self.state)
+
+
+def follow(channel: LiveChannel, render: Callable[[dict], None], wake_s: float = WAKE_S) -> dict:
+    """Call render(state) on every change until the recording is over; return the last state.
+
+    Also redraws every `wake_s` without a change: Streamlit only acts on a
+    button click (stopping this loop) when the script next writes an element.
+    """
+    version = -1
+    while True:
+        version, state = channel.wait(version, wake_s)
+        render(state)
+        if state["status"] in DONE:
+            return state
@@ -2,60 +2,105 @@
 
 
 import asyncio
+import config
 from transcribe import MicStream, stream_to_transcribe
-from agent import agent
-
-from polly import synthesize_and_play_direct
+from agent import get_agent
+
+from tts_client import get_tts_client
+from playback import AudioOutput
+from speech import SpeechPipeline
+from bargein import BargeInController
+from agent_runner import AgentRunner
+from phrase_bank import FillerPolicy, PhraseBank
+from vad import VoiceActivityDetector
+from endpointing import EarlyEndpointer, TranscriptRecorder
+from stt import get_stt_backend
+from tracing import get_tracer
+from profiling import get_profiler
+
+output = AudioOutput()
+tts = get_tts_client()
+phrases = PhraseBank(tts)
+speaker = SpeechPipeline(tts.synthesize, output, filler=FillerPolicy(phrases))
+barge_in = BargeInController(output)
+runner = AgentRunner(get_agent())
+stt = get_stt_backend()
 
 
 async def on_parital(text):
     print(f"[you]:  {text}")
+    # User talks over the agent: stop speaking and drop the running reply.
+    await barge_in.on_partial(text)
+    if config.speculative_turns:
+        await endpointer.on_partial(text)
     
 
 
+def start_turn(text, tokens):
+    # Run the reply as its own task so partials keep flowing (and can barge in).
+    barge_in.start_turn(respond(tokens))
+
+
+# Speculative turns: the agent starts on a stable partial and is committed on the final.
+endpointer = EarlyEndpointer(runner, start_turn)
+
+
 async def on_final(text):
-    result = agent(text)
-    print(result)
-    
+    if config.speculative_turns:
+        await endpointer.on_final(text)
+    else:
+        start_turn(text, runner.stream(text))
+
+
+async def respond(tokens):
     try:
-        # Handle the structured response from the agent
-        if hasattr(result, 'message'):
-            response_data = result.message
-        elif hasattr(result, 'text'):
-            response_data = result.text
-        elif hasattr(result, 'content'):
-            response_data = result.content
-        else:
-            response_data = str(result)
-        
-        # Extract text from the nested structure
-        if isinstance(response_data, dict):
-            if 'content' in response_data and isinstance(response_data['content'], list):
-                # Handle structure: {'role': 'assistant', 'content': [{'text': 'actual text'}]}
-                response_text = response_data['content'][0]['text']
-            elif 'content' in response_data and isinstance(response_data['content'], str):
-                # Handle structure: {'role': 'assistant', 'content': 'actual text'}
-                response_text = response_data['content']
-            elif 'text' in response_data:
-                # Handle structure: {'text': 'actual text'}
-                response_text = response_data['text']
-            else:
-                response_text = str(response_data)
-        else:
-            response_text = str(response_data)
-        
-        print(f"[agent]: {response_text}")
-        # await synthesize_and_play_direct(response_text)
-        
+        # Speak sentence by sentence while the agent (on its own thread) is still generating.
+        stats = await speaker.speak(tokens)
+        if stats.filler:
+            print(f"[agent]: ({stats.filler})")
+        print(f"[agent]: {stats.text}")
+        if stats.time_to_first_audio is not None:
+            print(f"[tts] first audio after {stats.time_to_first_audio * 1000:.0f} ms")
+        if stats.trace.stamps:
+            print(f"[trace] {stats.trace.describe()}")
+
+    except asyncio.CancelledError:
+        print("[agent]: (interrupted)")
+        raise
     except Exception as e:
         print(f"Error processing agent response: {e}")
-        print(f"Response structure: {result}")
     
 
 
 async def main():
-    async with MicStream() as mic:
-        await stream_to_transcribe(mic,on_partial=on_parital,on_final=on_final)
+    # Opt-in (PROFILING=1): callback timings, loop lag and queue depths on /metrics and in the log.
+    profiler = get_profiler().start()
+    # Fillers load from disk (or synthesize once) while the mic is already live.
+    warm_phrases = asyncio.create_task(phrases.warm())
+    try:
+        async with MicStream() as mic:
+            callbacks = dict(on_partial=on_parital, on_final=on_final, on_speech_end=endpointer.on_speech_end)
+            if config.transcript_log:
+                recorder = TranscriptRecorder(config.transcript_log, **callbacks)
+                callbacks = dict(on_partial=recorder.on_partial, on_final=recorder.on_final, on_speech_end=recorder.on_speech_end)
+            # With speculative turns the VAD's end of speech starts the agent early and Transcribe's final commits it.
+            await stream_to_transcribe(mic,on_audio=barge_in.on_audio,vad=VoiceActivityDetector(),early_final=not config.speculative_turns,backend=stt,**callbacks)
+    finally:
+        warm_phrases.cancel()
+        runner.close()
+        stt.close()
+        tts.close()
+        output.close()
+        print(f"[barge-in] {barge_in.stats()}")
+        if config.speculative_turns:
+            print(f"[endpointing] {endpointer.stats()}")
+        print(f"[stt] {stt.name}: {stt.stats()}")
+        if hasattr(tts, "stats"):
+            print(f"[tts] {tts.stats()}")
+        print(f"[trace] {get_tracer().format_summary()}")
+        if profiler.enabled:
+            profiler.close()
+            print(f"[profile] {profiler.describe()}")
 
 
 if __name__ == "__main__":
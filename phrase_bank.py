@@ -0,0 +1,106 @@
+"""
+Pre-synthesized fillers and acknowledgements for the voice agent.
+- PhraseBank synthesizes a small set of phrases at startup, all in parallel, and
+  persists them in the TTS cache's disk tier; later starts mmap them from disk
+  without calling Polly.
+- FillerPolicy plays one of them if the agent has not produced its first sentence
+  within a delay after the user finished speaking, masking LLM latency with no
+  extra TTS request on the hot path.
+"""
+
+import asyncio
+import itertools
+from typing import List, Optional, Sequence, Tuple
+
+from tts_cache import Audio, TTSCache, cache_key
+from tts_client import DEFAULT_VOICE, SAMPLE_RATE, TTSClient
+
+# ---------- Config ----------
+DEFAULT_PHRASES = [
+    "Let me check that.",
+    "One moment.",
+    "Sure, give me a second.",
+    "Okay, let me think.",
+    "Got it, one sec.",
+]
+FILLER_DELAY_MS = 700  # silence we tolerate before playing a filler
+
+
+class PhraseBank:
+    """A fixed set of phrases kept as ready-to-play PCM."""
+
+    def __init__(
+        self,
+        tts: TTSClient,
+        phrases: Sequence[str] = DEFAULT_PHRASES,
+        voice_id: str = DEFAULT_VOICE,
+        cache: Optional[TTSCache] = None,
+    ):
+        self.tts = getattr(tts, "inner", tts)  # bypass CachedTTSClient, we persist ourselves
+        self.phrases = list(phrases)
+        self.voice_id = voice_id
+        if cache is None:
+            cache = getattr(tts, "cache", None)
+        if cache is None:
+            import config
+
+            # The disk tier get_tts_client() would use; memory only when TTS_CACHE_DIR="" turned it off.
+            cache = TTSCache(config.tts_cache_dir)
+        self.cache = cache
+        self.engine = getattr(self.tts, "engine", "standard")
+        self._audio: List[Tuple[str, Audio]] = []
+        self._cycle = None
+        self.synthesized = 0  # phrases that needed a TTS call during warm()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._audio)
+
+    async def warm(self):
+        """Load every phrase from disk, synthesizing the missing ones in parallel."""
+        audio = await asyncio.gather(*(self._load(text) for text in self.phrases))
+        self._audio = [(text, pcm) for text, pcm in zip(self.phrases, audio) if pcm]
+        self._cycle = itertools.cycle(self._audio)
+
+    async def _load(self, text: str) -> Optional[Audio]:
+        key = cache_key(text, self.voice_id, SAMPLE_RATE, self.engine)
+        audio = self.cache.get(key)
+        if audio is None:
+            try:
+                audio = await self.tts.synthesize(text, self.voice_id)
+            except Exception as e:
+                print(f"[phrases] could not synthesize {text!r}: {e}")
+                return None
+            self.synthesized += 1
+            self.cache.put(key, audio, persist=True)
+        return audio
+
+    def next(self) -> Optional[Tuple[str, Audio]]:
+        """Next phrase (text, pcm), rotating so the same filler isn't repeated back to back."""
+        if not self._audio:
+            return None
+        return next(self._cycle)
+
+
+class FillerPolicy:
+    """Plays a filler when the first sentence of a reply is late."""
+
+    def __init__(self, bank: PhraseBank, delay_ms: int = FILLER_DELAY_MS):
+        self.bank = bank
+        self.delay_ms = delay_ms
+        self.played = 0
+
+    async def play_if_slow(self, first_segment: asyncio.Event, output) -> Optional[str]:
+        """Wait up to `delay_ms` for `first_segment`; otherwise play a filler on `output`."""
+        try:
+            await asyncio.wait_for(first_segment.wait(), self.delay_ms / 1000)
+            return None
+        except asyncio.TimeoutError:
+            pass
+        phrase = self.bank.next()
+        if phrase is None:
+            return None
+        text, audio = phrase
+        self.played += 1
+        await output.write(audio)
+        return text
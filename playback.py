@@ -0,0 +1,221 @@
+"""
+Continuous PCM playback for the voice agent.
+- One persistent sounddevice.OutputStream per conversation instead of sd.play per reply.
+- PCM goes through a fixed-size ring buffer drained by the PortAudio callback, so
+  playback starts once a short prebuffer is filled and memory stays bounded
+  no matter how long the reply is.
+- Polly's AudioStream can be played chunk by chunk (play_stream) as it downloads.
+- stop() silences the speaker on the next callback block (used for barge-in).
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+
+import numpy as np
+import sounddevice as sd
+
+import profiling
+
+# ---------- Config ----------
+SAMPLE_RATE = 16000  # Hz, matches Polly's 'pcm' output at SampleRate='16000'
+CHANNELS = 1
+BLOCK_SAMPLES = 320  # 20 ms callback blocks
+BUFFER_SECONDS = 2.0  # ring capacity; writers wait when it is full
+PREBUFFER_MS = 200  # audio queued before the first sample is played
+STREAM_CHUNK_BYTES = 4096  # read size for Polly's AudioStream
+
+
+class RingBuffer:
+    """Fixed-capacity int16 FIFO shared by one writer and the audio callback."""
+
+    def __init__(self, capacity: int):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._read = 0  # absolute sample counters; index = counter % capacity
+        self._write = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def available(self) -> int:
+        return self._write - self._read
+
+    @property
+    def free(self) -> int:
+        return self._capacity - self.available
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copy as many samples as fit; return how many were written."""
+        with self._lock:
+            n = min(len(samples), self._capacity - (self._write - self._read))
+            start = self._write % self._capacity
+            first = min(n, self._capacity - start)
+            self._buf[start : start + first] = samples[:first]
+            self._buf[: n - first] = samples[first:n]
+            self._write += n
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Fill `out` from the buffer without allocating; return samples copied."""
+        with self._lock:
+            n = min(len(out), self._write - self._read)
+            start = self._read % self._capacity
+            first = min(n, self._capacity - start)
+            out[:first] = self._buf[start : start + first]
+            out[first:n] = self._buf[: n - first]
+            self._read += n
+        return n
+
+    def clear(self):
+        with self._lock:
+            self._read = self._write
+
+
+class AudioOutput:
+    """Persistent int16 output stream fed through a RingBuffer.
+
+    With `profiler` (default profiling.get_profiler()) enabled, the callback is
+    timed and the unplayed audio reported as the "speaker" queue.
+    """
+
+    def __init__(
+        self,
+        samplerate=SAMPLE_RATE,
+        channels=CHANNELS,
+        blocksize=BLOCK_SAMPLES,
+        buffer_seconds=BUFFER_SECONDS,
+        prebuffer_ms=PREBUFFER_MS,
+        stream_factory=None,
+        profiler=None,
+    ):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self._ring = RingBuffer(int(samplerate * buffer_seconds) * channels)
+        self._prebuffer = int(samplerate * prebuffer_ms / 1000) * channels
+        self._primed = False
+        self._carry = b""  # odd trailing byte from the previous chunk
+        self._stream_factory = stream_factory or sd.OutputStream
+        self._stream: Optional[sd.OutputStream] = None
+        self._stop_requested: Optional[float] = None
+        self._profiler = profiler or profiling.get_profiler()
+        self.underflows = 0
+        self.stop_latencies: Deque[float] = deque(maxlen=1000)  # stop() -> first silent block, seconds; recent ones
+
+    def _callback(self, outdata, frames, time_info, status):  # sounddevice callback
+        if status:
+            if status.output_underflow:
+                self.underflows += 1
+            print(f"[speaker] status: {status}", file=sys.stderr)
+        out = outdata.reshape(-1)
+        if self._stop_requested is not None:
+            out[:] = 0
+            self.stop_latencies.append(time.monotonic() - self._stop_requested)
+            self._stop_requested = None
+            return
+        n = self._ring.read_into(out) if self._primed else 0
+        if n < len(out):
+            out[n:] = 0
+            if n == 0:
+                # Ran dry: wait for a fresh prebuffer before resuming.
+                self._primed = False
+
+    def start(self):
+        if self._stream is None:
+            self._stream = self._stream_factory(
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype="int16",
+                blocksize=self.blocksize,
+                callback=self._profiler.wrap_callback("speaker", self._callback),
+            )
+            self._profiler.queue("speaker", self._queued_seconds)
+            self._stream.start()
+
+    def _queued_seconds(self) -> float:
+        return self._ring.available / self.channels / self.samplerate
+
+    def close(self):
+        self._profiler.remove_queue("speaker", self._queued_seconds)
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._ring.clear()
+        self._carry = b""
+
+    def stop(self):
+        """Drop everything queued; the next callback block is silence."""
+        self._primed = False
+        self._ring.clear()
+        self._carry = b""
+        if self._stream is not None:
+            self._stop_requested = time.monotonic()
+
+    async def _feed(self, chunk: bytes):
+        """Queue a byte chunk as int16, carrying an odd trailing byte to the next one."""
+        view = memoryview(chunk)
+        if self._carry and len(view):
+            await self._write_samples(np.frombuffer(self._carry + bytes(view[:1]), dtype=np.int16))
+            self._carry = b""
+            view = view[1:]
+        if len(view) % 2:
+            self._carry = bytes(view[-1:])
+            view = view[:-1]
+        await self._write_samples(np.frombuffer(view, dtype=np.int16))
+
+    async def _write_samples(self, samples: np.ndarray):
+        block_seconds = self.blocksize / self.samplerate
+        while len(samples):
+            n = self._ring.write(samples)
+            samples = samples[n:]
+            if self._ring.available >= self._prebuffer:
+                self._primed = True
+            if len(samples):
+                await asyncio.sleep(block_seconds)
+
+    async def write(self, pcm: bytes):
+        """Queue a complete PCM segment, waiting while the ring buffer is full."""
+        self.start()
+        await self._feed(pcm)
+        self._primed = True
+
+    async def play_stream(self, body, chunk_bytes: int = STREAM_CHUNK_BYTES):
+        """Play a file-like PCM body (e.g. Polly's AudioStream) as it is read.
+
+        The body is closed when it ends, fails or playback is cancelled.
+        """
+        self.start()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_bytes)
+                if not chunk:
+                    break
+                await self._feed(chunk)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        self._primed = True
+
+    async def drain(self):
+        """Wait until everything written so far has been played."""
+        block_seconds = self.blocksize / self.samplerate
+        while self._stream is not None and self._ring.available > 0:
+            await asyncio.sleep(block_seconds)
+        if self._stream is not None:
+            # Let the last callback block reach the device.
+            await asyncio.sleep(block_seconds)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
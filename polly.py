@@ -1,55 +1,32 @@
 
-from config import polly_client
 import asyncio
-import sounddevice as sd
 
-import numpy as np
-from typing import Optional
-import threading
-from queue import Queue
-import time
-from config import polly_client
-import asyncio
-import sounddevice as sd
-import numpy as np
-from typing import AsyncGenerator, Optional
-import threading
-from queue import Queue
-import time
-from config import polly_client
-import asyncio
-import sounddevice as sd
-import numpy as np
-from typing import AsyncGenerator
-import time
+from playback import AudioOutput
+from tts_client import DEFAULT_VOICE, get_tts_client
 
-# Even simpler version - play entire audio at once
-async def synthesize_and_play_direct(text: str, voice_id: str = "Joanna"):
-    """Convert text to speech and play directly without chunking."""
+# Streamed playback - audio starts as soon as the first chunks arrive
+async def synthesize_and_play_direct(text: str, voice_id: str = DEFAULT_VOICE):
+    """Convert text to speech and play it while the audio is still streaming in."""
     try:
         print(f"Direct synthesis and playback: {text[:50]}...")
         
-        response = polly_client.synthesize_speech(
-            Text=text,
-            OutputFormat='pcm',
-            VoiceId=voice_id,
-            SampleRate='16000'
-        )
-        
-        audio_data = response['AudioStream'].read()
-        print(f"Generated {len(audio_data)} bytes of audio")
+        audio_stream = await get_tts_client().open_stream(text, voice_id)
         
-        # Convert and play entire audio at once
-        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-        print(f"Playing complete audio: {len(audio_array)} samples")
-        
-        sd.play(audio_array, samplerate=16000, blocking=True)
+        # Play the AudioStream as it downloads instead of read()-ing it all first.
+        async with AudioOutput() as output:
+            await output.play_stream(audio_stream)
+            await output.drain()
         print("Direct playback completed")
         
     except Exception as e:
         print(f"Error in direct playback: {e}")
         raise
 
+
+async def synthesize_pcm(text: str, voice_id: str = DEFAULT_VOICE) -> bytes:
+    """Synthesize one segment to raw 16 kHz int16 PCM without blocking the loop."""
+    return await get_tts_client().synthesize(text, voice_id)
+
 async def main():
     print("=== Voice Agent Audio - Immediate Playback ===")
     
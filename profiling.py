@@ -0,0 +1,382 @@
+"""
+Opt-in hot-path instrumentation: the PortAudio callbacks and the event loop.
+- Duration histograms for the mic (transcribe.MicStream) and speaker
+  (playback.AudioOutput) callbacks, and their PortAudio status flags
+  (input/output overflow and underflow) counted per stream.
+- Event-loop lag: a task asks to wake every LAG_INTERVAL_S and records how late
+  it actually woke (scheduled vs. actual).
+- Queue depths, in seconds of audio: the mic ring's unread backlog and the
+  speaker ring's unplayed audio, current and max, sampled with the lag.
+- Exposed as Prometheus text on http://PROFILING_HOST:PROFILING_PORT/metrics and
+  as a "[profile]" line on stderr every PROFILING_LOG_S seconds. The /metrics
+  thread reads snapshots taken under a lock; the audio callbacks never take it
+  (their status counters are preseeded, so they only update existing keys).
+- StackSampler, a sampling profiler over every thread, writes folded stacks
+  ("thread;outer;inner count" lines, for flamegraph.pl, inferno or speedscope):
+  SIGUSR1 starts it and the next SIGUSR1 dumps to PROFILE_DIR, and
+  /profile?seconds=N samples for N seconds and returns the stacks.
+- Off by default (config.profiling). When off the callbacks run unwrapped, so
+  the audio threads pay nothing; when on, benchmarks/profiling_hooks.py
+  measures what a callback pays.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# ---------- Config ----------
+CALLBACK_BOUNDS = (50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3)  # s; a block is 20 ms
+LAG_BOUNDS = (1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3, 100e-3, 200e-3, 500e-3, 1.0, 2.0)  # s
+LAG_INTERVAL_S = 0.05  # event-loop lag probe period
+SAMPLE_INTERVAL_S = 0.005  # sampling profiler period (200 Hz)
+MAX_PROFILE_S = 300.0  # longest /profile?seconds=N
+STATUS_FLAGS = ("input_overflow", "input_underflow", "output_overflow", "output_underflow")
+
+
+class Histogram:
+    """Fixed-bucket histogram. observe() is a bisect and a few adds, cheap enough for an audio callback."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket: above the largest bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile `q` (the max past the last bound)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def prometheus(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        braces = f"{{{labels}}}" if labels else ""
+        lines += [f"{name}_sum{braces} {self.sum:.6f}", f"{name}_count{braces} {self.count}"]
+        return lines
+
+
+class StackSampler:
+    """Samples every thread's Python stack each `interval` seconds from a daemon thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self.stacks, self.samples = Counter(), 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling; the folded stacks."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.folded()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class Profiler:
+    """Callback histograms, status counters, loop lag and queue depths for one process."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        log_interval: float = 0.0,
+        profile_dir: Optional[str] = None,
+        lag_interval: float = LAG_INTERVAL_S,
+    ):
+        self.enabled = enabled
+        self.host = host
+        self.port = port
+        self.log_interval = log_interval
+        self.profile_dir = profile_dir
+        self.lag_interval = lag_interval
+        self.callbacks: Dict[str, Histogram] = {}
+        self.status: Counter = Counter()  # (stream, flag) -> callbacks reporting it
+        self.loop_lag = Histogram(LAG_BOUNDS)
+        self.sampler = StackSampler()
+        self._queues: Dict[str, Callable[[], float]] = {}
+        self._queue_max: Dict[str, float] = {}
+        self._lock = threading.Lock()  # callbacks/status keys and queues vs. the /metrics thread
+        self._tasks: List[asyncio.Task] = []
+        self._http = None  # http.server.ThreadingHTTPServer
+        self._signal_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ----- hooks -----
+
+    def wrap_callback(self, stream: str, callback: Callable) -> Callable:
+        """`callback` timed into the `stream` histogram, counting status flags; `callback` itself when disabled."""
+        if not self.enabled:
+            return callback
+        with self._lock:
+            histogram = self.callbacks.setdefault(stream, Histogram(CALLBACK_BOUNDS))
+            for flag in STATUS_FLAGS:
+                self.status.setdefault((stream, flag), 0)  # the callback must not insert keys
+        status_counts = self.status
+        clock = time.perf_counter
+
+        def timed(data, frames, time_info, status):
+            started = clock()
+            try:
+                callback(data, frames, time_info, status)
+            finally:
+                histogram.observe(clock() - started)
+                if status:
+                    for flag in STATUS_FLAGS:
+                        if getattr(status, flag, False):
+                            status_counts[stream, flag] += 1
+
+        return timed
+
+    def queue(self, name: str, depth: Callable[[], float]):
+        """Report `depth()` (seconds of audio waiting) as queue `name` until remove_queue."""
+        if self.enabled:
+            with self._lock:
+                self._queues[name] = depth
+                self._queue_max.setdefault(name, 0.0)
+
+    def remove_queue(self, name: str, depth: Callable[[], float]):
+        with self._lock:
+            if self._queues.get(name) == depth:
+                del self._queues[name]
+
+    def _sample_queues(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """(current depths, max depths), sampled now."""
+        with self._lock:
+            depths = {name: depth() for name, depth in self._queues.items()}
+            for name, seconds in depths.items():
+                if seconds > self._queue_max[name]:
+                    self._queue_max[name] = seconds
+            return depths, dict(self._queue_max)
+
+    def _snapshot(self):
+        """(callback histograms, status counts) to iterate outside the lock."""
+        with self._lock:
+            return list(self.callbacks.items()), sorted(self.status.items())
+
+    # ----- lifecycle -----
+
+    def start(self) -> "Profiler":
+        """Start the loop-lag probe, log line, HTTP endpoint and SIGUSR1 toggle (call from the event loop)."""
+        if not self.enabled or self._tasks:
+            return self
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._watch_loop()))
+        if self.log_interval > 0:
+            self._tasks.append(loop.create_task(self._log()))
+        if self.port is not None:
+            self._serve()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.toggle_sampler)
+            self._signal_loop = loop
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # no SIGUSR1 (Windows) or not the main thread
+        return self
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._signal_loop is not None:
+            self._signal_loop.remove_signal_handler(signal.SIGUSR1)
+            self._signal_loop = None
+        if self.sampler.running:
+            self.toggle_sampler()
+
+    async def _watch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag.observe(max(0.0, loop.time() - scheduled))
+            self._sample_queues()
+
+    async def _log(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            print(f"[profile] {self.describe()}", file=sys.stderr)
+
+    def toggle_sampler(self) -> Optional[str]:
+        """Start the sampling profiler, or stop it and write its folded stacks; the file written."""
+        if not self.sampler.running:
+            self.sampler.start()
+            print(f"[profile] sampling every {self.sampler.interval * 1000:g} ms; send SIGUSR1 again to dump", file=sys.stderr)
+            return None
+        folded = self.sampler.stop()
+        directory = self.profile_dir or "."
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w") as f:
+            f.write(folded)
+        print(f"[profile] {self.sampler.samples} samples -> {path}", file=sys.stderr)
+        return path
+
+    # ----- output -----
+
+    def describe(self) -> str:
+        parts = []
+        callbacks, status = self._snapshot()
+        for stream, h in callbacks:
+            parts.append(f"{stream} callback p50 {h.quantile(0.5) * 1e3:.2f} ms p99 {h.quantile(0.99) * 1e3:.2f} ms "
+                         f"max {h.max * 1e3:.2f} ms (n={h.count})")
+        parts += [f"{stream} {flag} {n}" for (stream, flag), n in status if n]
+        lag = self.loop_lag
+        if lag.count:
+            parts.append(f"loop lag p99 {lag.quantile(0.99) * 1e3:.0f} ms max {lag.max * 1e3:.0f} ms")
+        depths, maxima = self._sample_queues()
+        for name, most in maxima.items():  # closed queues too, for the summary at exit
+            parts.append(f"{name} queue {depths.get(name, 0.0) * 1e3:.0f} ms (max {most * 1e3:.0f} ms)")
+        return ", ".join(parts) or "no samples yet"
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        callbacks, status = self._snapshot()
+        lines = [
+            "# HELP voice_audio_callback_seconds PortAudio callback duration.",
+            "# TYPE voice_audio_callback_seconds histogram",
+        ]
+        for stream, h in callbacks:
+            lines += h.prometheus("voice_audio_callback_seconds", f'stream="{stream}"')
+        lines += [
+            "# HELP voice_audio_status_total Callbacks reporting a PortAudio status flag.",
+            "# TYPE voice_audio_status_total counter",
+        ]
+        lines += [f'voice_audio_status_total{{stream="{s}",flag="{f}"}} {n}' for (s, f), n in status]
+        lines += [
+            "# HELP voice_event_loop_lag_seconds How late the event loop woke a sleeping task.",
+            "# TYPE voice_event_loop_lag_seconds histogram",
+        ]
+        lines += self.loop_lag.prometheus("voice_event_loop_lag_seconds")
+        depths, maxima = self._sample_queues()
+        lines += [
+            "# HELP voice_queue_depth_seconds Audio waiting in a queue.",
+            "# TYPE voice_queue_depth_seconds gauge",
+        ]
+        lines += [f'voice_queue_depth_seconds{{queue="{name}"}} {seconds:.4f}' for name, seconds in depths.items()]
+        lines += [
+            "# HELP voice_queue_depth_max_seconds Most audio seen waiting in a queue.",
+            "# TYPE voice_queue_depth_max_seconds gauge",
+        ]
+        lines += [f'voice_queue_depth_max_seconds{{queue="{name}"}} {seconds:.4f}' for name, seconds in maxima.items()]
+        return "\n".join(lines) + "\n"
+
+    def _serve(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        profiler = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    self._reply(profiler.prometheus(), "text/plain; version=0.0.4")
+                elif url.path == "/profile":
+                    try:
+                        seconds = float(parse_qs(url.query).get("seconds", ["10"])[0])
+                    except ValueError:
+                        self.send_error(400, "seconds must be a number")
+                        return
+                    sampler = StackSampler()  # its own, so it doesn't disturb a SIGUSR1 session
+                    sampler.start()
+                    time.sleep(min(max(seconds, 0.0), MAX_PROFILE_S))
+                    self._reply(sampler.stop(), "text/plain")
+                else:
+                    self.send_error(404)
+
+            def _reply(self, text: str, content_type: str):
+                body = text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._http.daemon_threads = True
+        self.port = self._http.server_address[1]
+        threading.Thread(target=self._http.serve_forever, name="profiling-http", daemon=True).start()
+
+
+# ---------- Shared profiler ----------
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """Process-wide Profiler from config (profiling, profiling_host/port, profiling_log_s, profile_dir)."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            import config
+
+            _profiler = Profiler(
+                enabled=config.profiling,
+                host=config.profiling_host,
+                port=config.profiling_port or None,
+                log_interval=config.profiling_log_s,
+                profile_dir=config.profile_dir,
+            )
+        return _profiler
@@ -0,0 +1,69 @@
+"""
+Streaming sample-rate conversion for int16 mono PCM.
+- Vectorized linear interpolation; the fractional read position and the last
+  input sample carry over between chunks, so chunk boundaries are seamless and
+  any chunk size gives the same output.
+- lowpass=True adds a windowed-sinc anti-aliasing filter before downsampling
+  (e.g. 48 kHz browser audio -> 16 kHz), with its history carried over too.
+- process_bytes takes PCM split anywhere, even mid-sample: an odd trailing
+  byte waits for the next chunk.
+"""
+
+import numpy as np
+
+# ---------- Config ----------
+LOWPASS_TAPS = 63  # odd; (taps - 1) / 2 input samples of delay
+LOWPASS_CUTOFF = 0.9  # fraction of the output Nyquist frequency
+
+
+def lowpass_kernel(src_rate: int, dst_rate: int, taps: int = LOWPASS_TAPS) -> np.ndarray:
+    cutoff = LOWPASS_CUTOFF * 0.5 * dst_rate / src_rate  # cycles per input sample
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class Resampler:
+    """Converts a stream of int16 chunks from `src_rate` to `dst_rate`."""
+
+    def __init__(self, src_rate: int, dst_rate: int, lowpass: bool = False):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._step = src_rate / dst_rate  # input samples per output sample
+        self._pos = 0.0  # next output position, relative to the first sample of the next x
+        self._last = None  # last input sample of the previous chunk
+        self._kernel = lowpass_kernel(src_rate, dst_rate) if lowpass and src_rate > dst_rate else None
+        self._history = np.zeros(0 if self._kernel is None else self._kernel.size - 1, dtype=np.float32)
+        self._odd = b""  # first byte of a sample split between process_bytes chunks
+
+    def _filter(self, x: np.ndarray) -> np.ndarray:
+        padded = np.concatenate((self._history, x))
+        self._history = padded[padded.size - self._history.size :]
+        return np.convolve(padded, self._kernel, mode="valid")
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.src_rate == self.dst_rate:
+            return samples.astype(np.int16, copy=False)
+        x = samples.astype(np.float32)
+        if self._kernel is not None:
+            x = self._filter(x)
+        if self._last is not None:
+            x = np.concatenate(([self._last], x))
+        if x.size == 0:
+            return np.zeros(0, dtype=np.int16)
+        end = x.size - 1
+        n = int((end - self._pos) // self._step) + 1 if end >= self._pos else 0
+        pos = self._pos + self._step * np.arange(n)
+        i = pos.astype(np.int64)
+        frac = pos - i
+        out = x[i] * (1 - frac) + x[np.minimum(i + 1, end)] * frac
+        self._pos += self._step * n - end
+        self._last = x[-1]
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+    def process_bytes(self, pcm: bytes) -> bytes:
+        if self._odd:
+            pcm = self._odd + pcm
+        even = len(pcm) - len(pcm) % 2
+        self._odd = bytes(pcm[even:])
+        return self.process(np.frombuffer(pcm, dtype=np.int16, count=even // 2)).tobytes()
@@ -0,0 +1,578 @@
+"""
+Multi-session voice server: many concurrent voice conversations in one process.
+- One asyncio event loop serves every connection over a minimal WebSocket
+  endpoint (RFC 6455 on asyncio streams, standard library only). Binary
+  messages in are the client's microphone as int16 mono PCM (16 kHz unless a
+  {"type": "start", "sample_rate": N} message says otherwise); binary messages
+  out are the agent's reply as 16 kHz int16 PCM; text messages are JSON events
+  (session, partial, final, reply, error, done). {"type": "end"} ends the audio.
+  Malformed messages (text that is not a JSON object, a bad sample_rate) get
+  an error event and close the connection with 1007.
+- Each connection is a VoiceSession with its own STT stream (VAD +
+  stt.STTBackend), its own agent (agent.new_agent, run by an AgentRunner) and
+  its own TTS queue (a speech.SpeechPipeline writing to the socket).
+- The first message is {"type": "session", "session": id}. The id is signed by
+  the server (config.server_session_secret); reconnecting with ?session=<id>
+  gets the conversation back, and ids the server did not issue are refused
+  with an error event and close 1008.
+- Global limits (config.server_*): connections at once, and asyncio
+  semaphores capping concurrent Bedrock turns, Transcribe streams and Polly
+  calls across all sessions.
+- Turn latency is final transcript to first reply audio on the wire.
+  benchmarks/server_load.py replays WAV files over N clients against fakes.
+
+Run:
+  python server.py
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from resample import Resampler
+
+# ---------- Config ----------
+SAMPLE_RATE = 16000
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 192000  # client rates accepted by {"type": "start"}
+MAX_MESSAGE_BYTES = 1 << 20  # larger client messages close the connection (1009)
+MAX_BUFFERED_CHUNKS = 200  # audio messages queued per session; the oldest are dropped past this
+LATENCY_WINDOW = 1000  # recent turns kept for the latency percentiles
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+# ---------- WebSocket ----------
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    if not payload:
+        return payload
+    n = len(payload)
+    keystream = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "little") ^ int.from_bytes(keystream, "little")).to_bytes(n, "little")
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> tuple:
+    """(request or status line, {lower-case header: value}) of an HTTP/1.1 head."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+class WebSocket:
+    """One WebSocket connection: recv() messages, send() text or bytes.
+
+    Clients mask what they send (`client=True`), servers don't. Pings are
+    answered inside recv(); fragmented messages are reassembled.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, client: bool = False):
+        self.reader = reader
+        self.writer = writer
+        self.client = client
+        self.closed = False
+        self._send_lock = asyncio.Lock()
+
+    async def _frame(self) -> tuple:
+        b0, b1 = await self.reader.readexactly(2)
+        length = b1 & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await self.reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await self.reader.readexactly(8))
+        if length > MAX_MESSAGE_BYTES:
+            raise ValueError(f"message of {length} bytes")
+        key = await self.reader.readexactly(4) if b1 & 0x80 else None
+        payload = await self.reader.readexactly(length)
+        return bool(b0 & 0x80), b0 & 0x0F, _mask(payload, key) if key else payload
+
+    async def recv(self) -> Optional[Union[bytes, str]]:
+        """Next message (str for text, bytes for binary), or None once the connection is closed."""
+        message, opcode = b"", None
+        while not self.closed:
+            try:
+                fin, op, payload = await self._frame()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+            except ValueError:
+                await self.close(1009)
+                return None
+            if op == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if op == OP_PONG:
+                continue
+            if op == OP_CLOSE:
+                await self.close()
+                return None
+            if op != OP_CONT:
+                opcode = op
+            message += payload
+            if len(message) > MAX_MESSAGE_BYTES:
+                await self.close(1009)
+                return None
+            if fin:
+                if opcode != OP_TEXT:
+                    return message
+                try:
+                    return message.decode()
+                except UnicodeDecodeError:
+                    await self.close(1007)
+                    return None
+        return None
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        n = len(payload)
+        if n < 126:
+            head = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        if self.client:
+            key = os.urandom(4)
+            head = head[:1] + bytes([head[1] | 0x80]) + head[2:] + key
+            payload = _mask(payload, key)
+        async with self._send_lock:
+            self.writer.write(head + payload)
+            await self.writer.drain()
+
+    async def send(self, data: Union[bytes, str]):
+        if self.closed:
+            raise ConnectionError("websocket is closed")
+        if isinstance(data, str):
+            await self._send_frame(OP_TEXT, data.encode())
+        else:
+            await self._send_frame(OP_BINARY, bytes(data))
+
+    async def send_json(self, **event):
+        await self.send(json.dumps(event))
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self._send_frame(OP_CLOSE, struct.pack("!H", code))
+        except ConnectionError:
+            pass
+        self.writer.close()
+
+
+async def connect(host: str, port: int, path: str = "/") -> WebSocket:
+    """Open a client WebSocket to a VoiceServer (used by benchmarks/server_load.py)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status, headers = await _read_headers(reader)
+    if status.split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != _accept_key(key):
+        writer.close()
+        raise ConnectionError(f"websocket handshake failed: {status}")
+    return WebSocket(reader, writer, client=True)
+
+
+async def accept(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, admit: Callable[[], bool] = lambda: True
+) -> Optional[Tuple[WebSocket, Optional[str]]]:
+    """Server side of the opening handshake: (WebSocket, ?session= id), or None if refused.
+
+    Non-WebSocket requests get 426; when `admit()` is false the client gets 503.
+    """
+    try:
+        request, headers = await _read_headers(reader)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return None
+    if headers.get("upgrade", "").lower() != "websocket" or "sec-websocket-key" not in headers:
+        writer.write(b"HTTP/1.1 426 Upgrade Required\r\nSec-WebSocket-Version: 13\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        return None
+    if not admit():
+        writer.write(b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 5\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        return None
+    writer.write(
+        b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        + f"Sec-WebSocket-Accept: {_accept_key(headers['sec-websocket-key'])}\r\n\r\n".encode()
+    )
+    path = request.split(" ")[1] if request.count(" ") >= 2 else "/"
+    session_id = parse_qs(urlsplit(path).query).get("session", [None])[0]
+    return WebSocket(reader, writer), session_id
+
+
+# ---------- Session ids ----------
+
+def _sign(secret: bytes, nonce: str) -> str:
+    return hmac.new(secret, nonce.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def issue_session_id(secret: bytes) -> str:
+    """A new random session id, signed with `secret`."""
+    nonce = uuid.uuid4().hex
+    return f"{nonce}.{_sign(secret, nonce)}"
+
+
+def resolve_session_id(secret: bytes, requested: Optional[str]) -> Optional[str]:
+    """The id a connection runs under: `requested` if this server issued it, a new one if
+    the client asked for none, or None (refuse the connection) for any other id."""
+    if requested is None:
+        return issue_session_id(secret)
+    nonce, _, signature = requested.partition(".")
+    if nonce and hmac.compare_digest(signature, _sign(secret, nonce)):
+        return requested
+    return None
+
+
+async def refuse_session(ws):
+    await ws.send_json(type="error", text="unknown session id")
+    await ws.close(1008)
+
+
+# ---------- Sessions ----------
+
+class _SocketAudio:
+    """transcribe.MicStream stand-in fed with the client's audio messages."""
+
+    def __init__(self, max_chunks: int = MAX_BUFFERED_CHUNKS):
+        self._chunks: deque = deque(maxlen=max_chunks)
+        self._data = asyncio.Event()
+        self._resampler = Resampler(SAMPLE_RATE, SAMPLE_RATE)  # also carries a sample split between messages
+        self._closed = False
+        self.dropped_chunks = 0
+
+    def set_rate(self, sample_rate: int):
+        self._resampler = Resampler(sample_rate, SAMPLE_RATE, lowpass=True)
+
+    def push(self, pcm: bytes):
+        pcm = self._resampler.process_bytes(pcm)
+        if not pcm:
+            return
+        if len(self._chunks) == self._chunks.maxlen:
+            self.dropped_chunks += 1
+        self._chunks.append(pcm)
+        self._data.set()
+
+    def close(self):
+        self._closed = True
+        self._data.set()
+
+    async def generator(self):
+        while True:
+            if self._chunks:
+                yield b"".join(self._chunks.popleft() for _ in range(len(self._chunks)))
+            elif self._closed:
+                return
+            else:
+                self._data.clear()
+                await self._data.wait()
+
+
+class _SocketOutput:
+    """speech.SpeechPipeline output that sends reply audio to the client."""
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.first_write: Optional[float] = None
+
+    async def write(self, pcm: bytes):
+        if self.first_write is None:
+            self.first_write = time.monotonic()
+        await self.ws.send(pcm)
+
+    async def drain(self):
+        pass  # the client plays at its own pace
+
+
+class VoiceSession:
+    """One client's conversation: STT stream, agent and TTS queue of its own."""
+
+    def __init__(self, server: "VoiceServer", ws, session_id: Optional[str] = None):
+        from agent_runner import AgentRunner
+        from speech import SpeechPipeline
+
+        self.server = server
+        self.ws = ws  # a WebSocket, or anything with the same recv/send/send_json/close
+        self.session_id = session_id
+        self.audio = _SocketAudio()
+        self.agent = server._checkout_agent(session_id)
+        self.runner = AgentRunner(self.agent)
+        self.speaker = SpeechPipeline(self._synthesize, _SocketOutput(ws), max_inflight=server.max_inflight)
+        self._reply: Optional[asyncio.Task] = None
+        self.turns = 0
+
+    async def _synthesize(self, text: str) -> bytes:
+        async with self.server.polly:
+            return await self.server.tts.synthesize(text)
+
+    async def _tokens(self, prompt: str):
+        async with self.server.bedrock:
+            async for token in self.runner.stream(prompt):
+                yield token
+
+    async def _read(self):
+        """Feed the client's messages to the STT stream; its audio ends however this does."""
+        try:
+            while True:
+                message = await self.ws.recv()
+                if message is None:
+                    break
+                if isinstance(message, bytes):
+                    self.audio.push(message)
+                    continue
+                try:
+                    event = json.loads(message)
+                except ValueError:
+                    await self._reject("expected a JSON object")
+                    break
+                if not isinstance(event, dict):
+                    await self._reject("expected a JSON object")
+                    break
+                if event.get("type") == "start":
+                    rate = event.get("sample_rate", SAMPLE_RATE)
+                    if type(rate) is not int or not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+                        await self._reject(f"sample_rate must be an integer from {MIN_SAMPLE_RATE} to {MAX_SAMPLE_RATE}")
+                        break
+                    self.audio.set_rate(rate)
+                elif event.get("type") == "end":
+                    break
+        finally:
+            self.audio.close()
+
+    async def _reject(self, text: str):
+        await self._send(type="error", text=text)
+        await self.ws.close(1007)
+
+    async def _send(self, **event):
+        try:
+            await self.ws.send_json(**event)
+        except ConnectionError:
+            pass  # the client left; the session winds down when its audio ends
+
+    async def on_partial(self, text: str):
+        await self._send(type="partial", text=text)
+
+    async def on_final(self, text: str):
+        await self._send(type="final", text=text)
+        if self._reply is not None and not self._reply.done():
+            self._reply.cancel()  # the user moved on; drop the rest of the old reply
+        self._reply = asyncio.create_task(self.respond(text))
+
+    async def respond(self, text: str):
+        try:
+            stats = await self.speaker.speak(self._tokens(text))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._send(type="error", text=f"{type(e).__name__}: {e}")
+            return
+        self.turns += 1
+        latency = stats.time_to_first_audio
+        if latency is not None:
+            self.server.turn_latencies.append(latency)
+        await self._send(type="reply", text=stats.text, first_audio_ms=None if latency is None else round(latency * 1000))
+
+    async def run(self):
+        from transcribe import stream_to_transcribe
+        from vad import VoiceActivityDetector
+
+        reader = asyncio.create_task(self._read())
+        try:
+            async with self.server.transcribe:
+                await stream_to_transcribe(
+                    self.audio,
+                    on_partial=self.on_partial,
+                    on_final=self.on_final,
+                    vad=VoiceActivityDetector(),
+                    backend=self.server.stt,
+                )
+            if reader.done() and reader.exception() is not None:
+                raise reader.exception()
+            if self._reply is not None:
+                await asyncio.gather(self._reply, return_exceptions=True)
+            await self._send(type="done", turns=self.turns)
+        finally:
+            reader.cancel()
+            if self._reply is not None:
+                self._reply.cancel()
+            self.runner.close()
+            self.server._return_agent(self.session_id, self.agent)
+            self.server.dropped_chunks += self.audio.dropped_chunks
+
+
+class VoiceServer:
+    """Hosts concurrent VoiceSessions on one event loop.
+
+    `stt`, `tts` and `agent_factory` default to stt.get_stt_backend(),
+    tts_client.get_tts_client() and agent.new_agent; pass fakes to run offline.
+    A client that reconnects with the ?session= id it was issued gets its agent
+    (and so the conversation) back, while it is among the `max_sessions` most
+    recent. Ids are signed with `session_secret` (config.server_session_secret).
+    """
+
+    def __init__(
+        self,
+        stt=None,
+        tts=None,
+        agent_factory: Optional[Callable] = None,
+        max_sessions: Optional[int] = None,
+        bedrock_concurrency: Optional[int] = None,
+        transcribe_concurrency: Optional[int] = None,
+        polly_concurrency: Optional[int] = None,
+        max_inflight: int = 2,
+        session_secret: Optional[bytes] = None,
+    ):
+        import config
+
+        if stt is None:
+            from stt import get_stt_backend
+
+            stt = get_stt_backend()
+        if tts is None:
+            from tts_client import get_tts_client
+
+            tts = get_tts_client()
+        if agent_factory is None:
+            from agent import new_agent
+
+            agent_factory = new_agent
+        self.stt = stt
+        self.tts = tts
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions or config.server_max_sessions
+        self.max_inflight = max_inflight  # TTS calls queued ahead per session
+        self.session_secret = session_secret or config.server_session_secret
+        self.bedrock = asyncio.Semaphore(bedrock_concurrency or config.server_bedrock_concurrency)
+        self.transcribe = asyncio.Semaphore(transcribe_concurrency or config.server_transcribe_concurrency)
+        self.polly = asyncio.Semaphore(polly_concurrency or config.server_polly_concurrency)
+        self.sessions = set()
+        self.total_sessions = 0
+        self.rejected = 0
+        self.dropped_chunks = 0
+        self.turn_latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._idle_agents: "OrderedDict[str, object]" = OrderedDict()  # by session id, least recently used first
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _checkout_agent(self, session_id: Optional[str]):
+        agent = self._idle_agents.pop(session_id, None) if session_id else None
+        return agent if agent is not None else self.agent_factory()
+
+    def _return_agent(self, session_id: Optional[str], agent):
+        if session_id:
+            self._idle_agents[session_id] = agent
+            while len(self._idle_agents) > self.max_sessions:
+                self._idle_agents.popitem(last=False)
+
+    def _admit(self) -> bool:
+        if len(self.sessions) < self.max_sessions:
+            return True
+        self.rejected += 1
+        return False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        accepted = await accept(reader, writer, self._admit)
+        if accepted is None:
+            return
+        ws, requested = accepted
+        session_id = resolve_session_id(self.session_secret, requested)
+        try:
+            if session_id is None:
+                await refuse_session(ws)
+                return
+            await ws.send_json(type="session", session=session_id)
+        except ConnectionError:
+            await ws.close()
+            return
+        await self.serve_session(ws, session_id)
+
+    async def serve_session(self, ws, session_id: Optional[str] = None):
+        """Run one conversation on an accepted `ws` until the client is done, then close it.
+
+        `session_id` must come from resolve_session_id: it picks the agent reattached.
+        """
+        session = VoiceSession(self, ws, session_id)
+        self.sessions.add(session)
+        self.total_sessions += 1
+        try:
+            await session.run()
+        except Exception as e:
+            await session._send(type="error", text=f"{type(e).__name__}: {e}")
+        finally:
+            self.sessions.discard(session)
+            await ws.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "VoiceServer":
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def stats(self) -> dict:
+        latencies = np.array(self.turn_latencies) * 1000
+        return {
+            "active_sessions": len(self.sessions),
+            "total_sessions": self.total_sessions,
+            "rejected": self.rejected,
+            "dropped_chunks": self.dropped_chunks,
+            "turn_latency_ms_p50": float(np.percentile(latencies, 50)) if latencies.size else None,
+            "turn_latency_ms_p95": float(np.percentile(latencies, 95)) if latencies.size else None,
+        }
+
+
+# ---------- Main ----------
+
+async def main():
+    import config
+    from profiling import get_profiler
+
+    profiler = get_profiler().start()  # PROFILING=1: event-loop lag under load, on /metrics
+    server = await VoiceServer().start(config.server_host, config.server_port)
+    print(f"Voice server on ws://{config.server_host}:{server.port}/ (max {server.max_sessions} sessions)")
+    try:
+        await server.serve_forever()
+    finally:
+        profiler.close()
+        print(f"[server] {server.stats()}")
+        server.stt.close()
+        server.tts.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
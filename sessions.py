@@ -0,0 +1,187 @@
+"""
+Per-session agents for the multi-user Streamlit apps.
+- AgentPool keeps one agent (and so one conversation history) per browser
+  session; calls within a session are serialized, different sessions run in
+  parallel.
+- The model and AWS clients behind the agents are shared process-wide
+  (config.get_bedrock_model), so a new session only costs a lightweight Agent.
+- Bounded: at most `max_sessions` agents; the least recently used idle session
+  is evicted to make room, and sessions idle longer than `idle_ttl_s` are
+  dropped. An evicted session keeps its history (the agent's messages, up to
+  `max_histories` of them), and its next turn gets a new agent that carries on
+  the same conversation.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# ---------- Config ----------
+MAX_SESSIONS = 64
+IDLE_TTL_S = 30 * 60.0
+MAX_HISTORIES = 1024  # conversations of evicted sessions kept for their next turn
+ACQUIRE_TIMEOUT_S = 30.0  # wait this long for a slot when every session is mid-turn
+
+
+class _Session:
+    __slots__ = ("agent", "lock", "last_used", "busy", "history", "reset_pending")
+
+    def __init__(self, agent, history=None):
+        self.agent = agent
+        self.history = history  # messages to restore into the next agent built for this session
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.busy = 0  # threads using or waiting for this session
+        self.reset_pending = False  # reset() while busy: drop the conversation when the turn ends
+
+
+class AgentPool:
+    """Bounded LRU of per-session agents built by `factory`."""
+
+    def __init__(
+        self,
+        factory: Callable,
+        max_sessions: int = MAX_SESSIONS,
+        idle_ttl_s: float = IDLE_TTL_S,
+        acquire_timeout_s: float = ACQUIRE_TIMEOUT_S,
+        max_histories: int = MAX_HISTORIES,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self.acquire_timeout_s = acquire_timeout_s
+        self.max_histories = max_histories
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()  # least recently used first
+        self._histories: "OrderedDict[str, tuple]" = OrderedDict()  # evicted session id -> (last used, messages)
+        self._cond = threading.Condition()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        self.restored = 0
+        self.histories_dropped = 0
+
+    def _expire(self, now: float):
+        for session_id, s in list(self._sessions.items()):
+            if not s.busy and now - s.last_used > self.idle_ttl_s:
+                del self._sessions[session_id]
+                self.expired += 1
+        while self._histories and now - next(iter(self._histories.values()))[0] > self.idle_ttl_s:
+            self._histories.popitem(last=False)
+
+    def _evict_one(self) -> bool:
+        for session_id, s in self._sessions.items():
+            if not s.busy:
+                del self._sessions[session_id]
+                self.evicted += 1
+                history = s.agent.messages if s.agent is not None else s.history
+                if history and not s.reset_pending:
+                    self._histories[session_id] = (s.last_used, history)
+                    while len(self._histories) > self.max_histories:
+                        self._histories.popitem(last=False)
+                        self.histories_dropped += 1
+                return True
+        return False
+
+    def _checkout(self, session_id: str) -> _Session:
+        deadline = time.monotonic() + self.acquire_timeout_s
+        with self._cond:
+            self._expire(time.monotonic())
+            s = self._sessions.get(session_id)
+            while s is None and len(self._sessions) >= self.max_sessions and not self._evict_one():
+                if not self._cond.wait(deadline - time.monotonic()):
+                    raise RuntimeError(f"agent pool exhausted: {self.max_sessions} sessions mid-turn")
+                s = self._sessions.get(session_id)
+            if s is None:
+                _, history = self._histories.pop(session_id, (None, None))
+                s = self._sessions[session_id] = _Session(None, history)
+                self.created += 1
+            self._sessions.move_to_end(session_id)
+            s.busy += 1
+        return s
+
+    def _checkin(self, s: _Session):
+        with self._cond:
+            s.busy -= 1
+            s.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    @contextmanager
+    def session(self, session_id: str):
+        """Use `session_id`'s agent exclusively for the duration of the block."""
+        s = self._checkout(session_id)
+        try:
+            with s.lock:
+                self._apply_reset(s)
+                if s.agent is None:
+                    s.agent = self.factory()  # outside the pool lock: may be slow
+                    if s.history:
+                        s.agent.messages = s.history  # an evicted session picks up where it left off
+                        with self._cond:
+                            self.restored += 1
+                    s.history = None
+                try:
+                    yield s.agent
+                finally:
+                    self._apply_reset(s)
+        finally:
+            self._checkin(s)
+
+    def _apply_reset(self, s: _Session):
+        """With s.lock held: drop the agent of a session reset mid-turn, so the next turn starts a new one."""
+        with self._cond:
+            if s.reset_pending:
+                s.reset_pending = False
+                s.agent = None
+                s.history = None
+
+    def reset(self, session_id: str):
+        """Forget a session's conversation (e.g. the apps' Clear button).
+
+        A session mid-turn finishes that turn, then forgets it.
+        """
+        with self._cond:
+            self._histories.pop(session_id, None)
+            s = self._sessions.get(session_id)
+            if s is not None:
+                if s.busy:
+                    s.reset_pending = True
+                else:
+                    del self._sessions[session_id]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "sessions": len(self._sessions),
+                "busy": sum(1 for s in self._sessions.values() if s.busy),
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "restored": self.restored,
+                "histories_kept": len(self._histories),
+                "histories_dropped": self.histories_dropped,
+            }
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+# ---------- Shared pool ----------
+
+_pool: Optional[AgentPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """Process-wide pool of per-session agents (agent.new_agent), sized from config.py."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import config
+            from agent import new_agent
+
+            _pool = AgentPool(new_agent, max_sessions=config.agent_pool_size, idle_ttl_s=config.agent_idle_ttl_s)
+        return _pool
@@ -0,0 +1,210 @@
+"""
+Streaming sentence-level TTS for the voice agent.
+- Consumes the agent's token stream and cuts it into sentences/clauses.
+- Fires synthesis for each segment as soon as it is complete (several in flight).
+- Queues the PCM, in order, into a single continuous output stream.
+
+Time-to-first-audio becomes "first sentence from the LLM + TTS of that sentence"
+instead of "whole reply from the LLM + TTS of the whole reply".
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import tracing
+
+# ---------- Config ----------
+MIN_CLAUSE_CHARS = 40  # don't cut on , ; : before this many chars
+MAX_SEGMENT_CHARS = 220  # hard cut (on whitespace) for run-on text
+MAX_INFLIGHT = 3  # segments being synthesized ahead of playback
+
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+_CLAUSE_END = re.compile(r"[,;:]\s+|\s[-–—]\s")
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "st", "vs", "etc", "e.g", "i.e", "approx"}
+
+
+# ---------- Segmentation ----------
+
+class SentenceSegmenter:
+    """Incrementally splits streamed text into speakable segments."""
+
+    def __init__(self, min_clause_chars=MIN_CLAUSE_CHARS, max_chars=MAX_SEGMENT_CHARS):
+        self.min_clause_chars = min_clause_chars
+        self.max_chars = max_chars
+        self._buf = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text, return any segments that are now complete."""
+        self._buf += text
+        segments = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            segment, self._buf = self._buf[:cut].strip(), self._buf[cut:]
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has ended."""
+        segment, self._buf = self._buf.strip(), ""
+        return [segment] if segment else []
+
+    def _find_cut(self) -> Optional[int]:
+        buf = self._buf
+        for m in _SENTENCE_END.finditer(buf):
+            word = buf[: m.start()].rsplit(None, 1)[-1:] or [""]
+            if word[0].lower().rstrip(".") in _ABBREVIATIONS:
+                continue
+            return m.end()
+        if len(buf) >= self.min_clause_chars:
+            for m in _CLAUSE_END.finditer(buf, self.min_clause_chars // 2):
+                return m.end()
+        if len(buf) >= self.max_chars:
+            space = buf.rfind(" ", 0, self.max_chars)
+            return space + 1 if space > 0 else self.max_chars
+        return None
+
+
+# ---------- Agent token stream ----------
+
+async def agent_text_stream(agent, prompt: str) -> AsyncIterator[str]:
+    """Yield the text deltas of a Strands agent invocation."""
+    async for event in agent.stream_async(prompt):
+        if "data" in event:
+            yield event["data"]
+
+
+# ---------- Pipeline ----------
+
+@dataclass
+class SpeechStats:
+    """Monotonic timestamps (seconds) for one spoken reply."""
+
+    started: float = 0.0
+    first_token: Optional[float] = None
+    first_segment: Optional[float] = None
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+    segments: List[str] = field(default_factory=list)
+    filler: Optional[str] = None  # phrase played while waiting for the first sentence
+    trace: tracing.Turn = tracing.NULL_TURN  # the turn this reply answers (tracing.current())
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.segments)
+
+    @property
+    def time_to_first_audio(self) -> Optional[float]:
+        if self.first_audio is None:
+            return None
+        return self.first_audio - self.started
+
+
+class SpeechPipeline:
+    """Speaks a token stream sentence by sentence.
+
+    `synthesize(text)` is an async callable returning raw PCM bytes and
+    `output` is anything with `async write(pcm)` and `async drain()`
+    (see playback.AudioOutput, or fakes.FakeOutput for offline runs).
+    `filler` is an optional phrase_bank.FillerPolicy for slow first sentences.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Awaitable[bytes]],
+        output,
+        max_inflight: int = MAX_INFLIGHT,
+        segmenter_factory: Callable[[], SentenceSegmenter] = SentenceSegmenter,
+        filler=None,
+    ):
+        self.synthesize = synthesize
+        self.output = output
+        self.max_inflight = max_inflight
+        self.segmenter_factory = segmenter_factory
+        self.filler = filler
+
+    async def speak(self, tokens: AsyncIterator[str]) -> SpeechStats:
+        stats = SpeechStats(started=time.monotonic(), trace=tracing.current())
+        try:
+            await self._speak(tokens, stats)
+        except BaseException:
+            stats.trace.finish(interrupted=True)
+            raise
+        stats.trace.mark("playback_end", stats.finished)
+        stats.trace.finish()
+        return stats
+
+    async def _speak(self, tokens: AsyncIterator[str], stats: SpeechStats):
+        # Synthesis tasks in segment order; a slot is taken before a task is
+        # created and freed once the consumer has its PCM, so at most
+        # max_inflight synthesize at once.
+        pending: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_inflight)
+        first_segment = asyncio.Event()
+        filler = None
+        if self.filler is not None:
+            filler = asyncio.create_task(self.filler.play_if_slow(first_segment, self.output))
+        producer = asyncio.create_task(self._produce(tokens, pending, slots, stats, first_segment))
+        try:
+            await self._consume(pending, slots, stats, filler)
+            await producer
+        finally:
+            producer.cancel()
+            if filler is not None:
+                filler.cancel()
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+        await self.output.drain()
+        stats.finished = time.monotonic()
+
+    async def _produce(self, tokens, pending: asyncio.Queue, slots: asyncio.Semaphore, stats: SpeechStats,
+                       first_segment: asyncio.Event):
+        segmenter = self.segmenter_factory()
+        try:
+            async for token in tokens:
+                if stats.first_token is None:
+                    stats.first_token = time.monotonic()
+                for segment in segmenter.feed(token):
+                    await self._submit(segment, pending, slots, stats, first_segment)
+            for segment in segmenter.flush():
+                await self._submit(segment, pending, slots, stats, first_segment)
+        finally:
+            pending.put_nowait(None)  # unbounded (slots bound it), so this never waits
+
+    async def _submit(self, segment: str, pending: asyncio.Queue, slots: asyncio.Semaphore, stats: SpeechStats,
+                      first_segment: asyncio.Event):
+        if stats.first_segment is None:
+            stats.first_segment = time.monotonic()
+            first_segment.set()
+        stats.segments.append(segment)
+        # Wait for a slot first: a barge-in cancelling this wait leaves no task behind.
+        await slots.acquire()
+        pending.put_nowait(asyncio.create_task(self.synthesize(segment)))
+
+    async def _consume(self, pending: asyncio.Queue, slots: asyncio.Semaphore, stats: SpeechStats,
+                       filler: Optional[asyncio.Task]):
+        while True:
+            task = await pending.get()
+            if task is None:
+                return
+            try:
+                pcm = await task
+            finally:
+                slots.release()
+            if not pcm:
+                continue
+            if stats.first_audio is None:
+                stats.trace.mark("first_tts_byte")
+                if filler is not None:
+                    # Don't interleave with a filler that is already playing.
+                    stats.filler = await filler
+                stats.first_audio = time.monotonic()
+                stats.trace.mark("playback_start", stats.first_audio)
+            await self.output.write(pcm)
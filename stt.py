@@ -0,0 +1,322 @@
+"""
+Speech-to-text backends for the voice loop.
+- STTBackend.start() opens an STTStream: send() 16 kHz int16 PCM, end() when the
+  audio is over, and iterate results() for partial/final STTResults.
+- AWSTranscribeBackend: Amazon Transcribe streaming, a new stream per start() or a
+  lease on a pre-warmed transcribe_session.TranscribeSession.
+- LocalSTTBackend: an offline CPU engine (Vosk, or any recognizer with the same
+  accept/finish interface) running in a pool of worker processes; no network
+  round trip, and the whole pipeline can be load-tested without AWS
+  (pip install vosk, and download a model, e.g. vosk-model-small-en-us-0.15).
+- Every backend must pass benchmarks/stt_conformance.py.
+"""
+
+import abc
+import asyncio
+import functools
+import itertools
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+# ---------- Config ----------
+LOCAL_WORKERS = 2  # recognizer processes; each stream stays on one of them
+
+
+@dataclass
+class STTResult:
+    text: str
+    is_partial: bool
+    result_id: str  # partials share the id of the final they lead to
+
+
+class STTStream(abc.ABC):
+    """One utterance-or-more of audio in, transcripts out."""
+
+    @abc.abstractmethod
+    async def send(self, pcm: bytes):
+        """Queue 16 kHz int16 PCM."""
+
+    @abc.abstractmethod
+    async def end(self):
+        """No more audio; results() ends after the last final."""
+
+    @abc.abstractmethod
+    def results(self) -> AsyncIterator[STTResult]:
+        """Partial and final STTResults, in order."""
+
+    async def close(self):
+        """Release the stream, whether or not end() was called."""
+
+
+class STTBackend(abc.ABC):
+    """Opens STT streams; used by transcribe.stream_to_transcribe."""
+
+    name = "stt"
+    concurrent = True  # several streams can be open at once
+
+    @abc.abstractmethod
+    async def start(self) -> STTStream:
+        """Open a stream."""
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+# ---------- Amazon Transcribe ----------
+
+class _AWSStream(STTStream):
+    def __init__(self, send, end, events, lease=None):
+        self._send = send
+        self._end = end
+        self._events = events
+        self._lease = lease
+
+    async def send(self, pcm: bytes):
+        await self._send(pcm)
+
+    async def end(self):
+        await self._end()
+
+    async def results(self) -> AsyncIterator[STTResult]:
+        async for event in self._events:
+            for res in getattr(getattr(event, "transcript", None), "results", None) or []:
+                if res.alternatives:
+                    yield STTResult(res.alternatives[0].transcript, bool(res.is_partial), res.result_id)
+
+    async def close(self):
+        if self._lease is not None:
+            lease, self._lease = self._lease, None
+            await lease.__aexit__(None, None, None)
+
+
+class AWSTranscribeBackend(STTBackend):
+    """Amazon Transcribe streaming.
+
+    With `session` every start() leases its pre-warmed stream (as `owner`, see
+    TranscribeSession.lease); otherwise each start() opens a new one with a
+    client from `client_factory`.
+    """
+
+    name = "aws"
+
+    def __init__(self, session=None, region: str = "us-west-2", client_factory: Optional[Callable] = None, owner=None):
+        self.session = session
+        self.region = region
+        self._client_factory = client_factory
+        self.owner = owner
+
+    async def start(self) -> STTStream:
+        if self.session is not None:
+            lease = self.session.lease(self.owner)
+            await lease.__aenter__()
+            return _AWSStream(lease.send, lease.end, lease.events(), lease=lease)
+
+        from transcribe import LANGUAGE_CODE, SAMPLE_RATE
+
+        if self._client_factory is not None:
+            client = self._client_factory()
+        else:
+            from amazon_transcribe.client import TranscribeStreamingClient
+
+            client = TranscribeStreamingClient(region=self.region)
+        stream = await client.start_stream_transcription(
+            language_code=LANGUAGE_CODE,
+            media_sample_rate_hz=SAMPLE_RATE,
+            media_encoding="pcm",
+            enable_partial_results_stabilization=True,
+            partial_results_stability="medium",
+            enable_channel_identification=False,
+            show_speaker_label=False,
+        )
+
+        async def send(pcm: bytes):
+            await stream.input_stream.send_audio_event(audio_chunk=pcm)
+
+        return _AWSStream(send, stream.input_stream.end_stream, stream.output_stream)
+
+    def stats(self) -> dict:
+        return self.session.stats() if self.session is not None else {}
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+# ---------- Local engine ----------
+
+_models = {}  # model path -> vosk.Model, per worker process
+
+
+class VoskRecognizer:
+    """Vosk (Kaldi) streaming recognizer; the model is loaded once per worker process.
+
+    accept(pcm) and finish() return [(is_partial, text), ...] - the interface
+    LocalSTTBackend drives (fakes.EnergyRecognizer implements it too).
+    """
+
+    def __init__(self, model_path: str, sample_rate: int = 16000):
+        from vosk import KaldiRecognizer, Model
+
+        if model_path not in _models:
+            _models[model_path] = Model(model_path)
+        self._recognizer = KaldiRecognizer(_models[model_path], sample_rate)
+        self._partial = ""
+
+    def accept(self, pcm: bytes) -> List[Tuple[bool, str]]:
+        if self._recognizer.AcceptWaveform(pcm):
+            self._partial = ""
+            text = json.loads(self._recognizer.Result())["text"]
+            return [(False, text)] if text else []
+        partial = json.loads(self._recognizer.PartialResult())["partial"]
+        if partial and partial != self._partial:
+            self._partial = partial
+            return [(True, partial)]
+        return []
+
+    def finish(self) -> List[Tuple[bool, str]]:
+        text = json.loads(self._recognizer.FinalResult())["text"]
+        return [(False, text)] if text else []
+
+
+# Worker-process side: recognizers by stream id.
+_recognizers = {}
+
+
+def _worker_open(stream_id: int, recognizer_factory: Callable):
+    _recognizers[stream_id] = recognizer_factory()
+
+
+def _worker_accept(stream_id: int, pcm: bytes):
+    return _recognizers[stream_id].accept(pcm)
+
+
+def _worker_finish(stream_id: int):
+    recognizer = _recognizers.pop(stream_id, None)
+    return recognizer.finish() if recognizer is not None else []
+
+
+class _LocalStream(STTStream):
+    def __init__(self, backend: "LocalSTTBackend", worker: ProcessPoolExecutor, stream_id: int):
+        self._backend = backend
+        self._worker = worker
+        self._id = stream_id
+        self._results: asyncio.Queue = asyncio.Queue()
+        self._utterance = 0
+        self._open = True
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._worker, fn, self._id, *args)
+
+    def _publish(self, results):
+        for is_partial, text in results:
+            self._results.put_nowait(STTResult(text, is_partial, f"local-{self._id}-{self._utterance}"))
+            if not is_partial:
+                self._utterance += 1
+
+    async def send(self, pcm: bytes):
+        self._publish(await self._run(_worker_accept, pcm))
+
+    async def end(self):
+        if self._open:
+            self._open = False
+            self._publish(await self._run(_worker_finish))
+            self._backend._release(self._worker)
+        self._results.put_nowait(None)
+
+    async def results(self) -> AsyncIterator[STTResult]:
+        while True:
+            result = await self._results.get()
+            if result is None:
+                return
+            yield result
+
+    async def close(self):
+        if self._open:
+            self._open = False
+            await self._run(_worker_finish)
+            self._backend._release(self._worker)
+            self._results.put_nowait(None)
+
+
+class LocalSTTBackend(STTBackend):
+    """Offline recognition in `workers` processes, each stream pinned to the least busy one.
+
+    `recognizer_factory` must be picklable and is called in the worker, e.g.
+    functools.partial(VoskRecognizer, "models/vosk-model-small-en-us-0.15").
+    """
+
+    name = "local"
+
+    def __init__(self, recognizer_factory: Callable, workers: int = LOCAL_WORKERS):
+        self.recognizer_factory = recognizer_factory
+        # spawn, not fork: the parent runs an event loop and audio threads.
+        context = multiprocessing.get_context("spawn")
+        self._workers = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(workers)]
+        self._load = [0] * workers
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.streams = 0
+
+    async def start(self) -> STTStream:
+        with self._lock:
+            index = min(range(len(self._workers)), key=self._load.__getitem__)
+            self._load[index] += 1
+            stream_id = next(self._ids)
+            self.streams += 1
+        worker = self._workers[index]
+        try:
+            await asyncio.get_running_loop().run_in_executor(worker, _worker_open, stream_id, self.recognizer_factory)
+        except BaseException:
+            # No stream to release the slot later (load error, broken pool, cancelled).
+            self._release(worker)
+            raise
+        return _LocalStream(self, worker, stream_id)
+
+    def _release(self, worker: ProcessPoolExecutor):
+        with self._lock:
+            self._load[self._workers.index(worker)] -= 1
+
+    def warm(self):
+        """Start the worker processes (and load the model) ahead of the first stream."""
+        futures = [w.submit(_worker_open, -1, self.recognizer_factory) for w in self._workers]
+        for future in futures:
+            future.result()
+        for w in self._workers:
+            w.submit(_worker_finish, -1)
+
+    def stats(self) -> dict:
+        return {"streams": self.streams, "active": sum(self._load), "workers": len(self._workers)}
+
+    def close(self):
+        for worker in self._workers:
+            worker.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------- Shared backend ----------
+
+_backend: Optional[STTBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_stt_backend() -> STTBackend:
+    """Process-wide STT backend chosen by config.stt_backend ("aws" or "local")."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            import config
+
+            if config.stt_backend == "local":
+                _backend = LocalSTTBackend(functools.partial(VoskRecognizer, config.vosk_model_path))
+                _backend.warm()
+            else:
+                from transcribe_session import get_transcribe_session
+
+                _backend = AWSTranscribeBackend(session=get_transcribe_session())
+        return _backend
@@ -0,0 +1,343 @@
+"""
+Per-turn latency tracing for the voice loop: where the seconds of a turn go.
+- Each turn is stamped with monotonic times as it passes through the stages
+  (STAGES): speech end (the VAD's end of utterance), last partial, final
+  transcript, agent request start, first token, agent done, first TTS audio,
+  playback start (first audio handed to the speaker) and playback end.
+- transcribe.stream_to_transcribe opens the turns (per STT stream, by result id)
+  and runs on_final inside the turn's context; agent_runner.AgentRunner and
+  speech.SpeechPipeline stamp whatever turn is current (a contextvar), so the
+  same code traces main.py, server.py sessions and the Streamlit apps.
+- Finished turns are summarized in process as p50/p95/p99 per interval
+  (INTERVALS), sent to OpenTelemetry's tracer when opentelemetry is installed,
+  and, when config.trace_log is set (off by default: the file grows without
+  bound and holds transcripts), appended to a JSONL file with
+  OpenTelemetry-shaped spans (OTLP/JSON field names).
+- On by default (config.tracing_enabled); a turn costs a few dict writes (plus
+  one appended line with a trace log), see benchmarks/tracing_overhead.py.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+# ---------- Config ----------
+STAGES = (
+    "speech_end",
+    "last_partial",
+    "final",
+    "agent_start",
+    "first_token",
+    "agent_done",
+    "first_tts_byte",
+    "playback_start",
+    "playback_end",
+)
+# (name, from stage, to stage); an agent started speculatively before the final has a negative agent_queue
+INTERVALS = (
+    ("endpoint", "speech_end", "final"),  # end of speech -> final transcript
+    ("final_after_partial", "last_partial", "final"),
+    ("agent_queue", "final", "agent_start"),
+    ("first_token", "agent_start", "first_token"),
+    ("agent", "agent_start", "agent_done"),
+    ("first_tts", "first_token", "first_tts_byte"),  # first sentence buffered + synthesized
+    ("playback_start", "first_tts_byte", "playback_start"),
+    ("playback", "playback_start", "playback_end"),
+    ("turn", "speech_end", "playback_start"),  # what the user waits for (from the final without a VAD)
+)
+SUMMARY_WINDOW = 1000  # recent turns kept for the percentiles
+MAX_OPEN_TURNS = 8  # per STT stream: transcripts still waiting for their final
+
+
+class Turn:
+    """Stage timestamps (time.monotonic()) of one user turn."""
+
+    __slots__ = ("tracer", "stamps", "text", "interrupted", "finished")
+
+    def __init__(self, tracer: Optional["Tracer"]):
+        self.tracer = tracer
+        self.stamps: Dict[str, float] = {}
+        self.text = ""
+        self.interrupted = False
+        self.finished = False
+
+    def mark(self, stage: str, at: Optional[float] = None, overwrite: bool = False):
+        """Stamp `stage` (now, or at `at`); only its first time unless `overwrite`."""
+        if overwrite or stage not in self.stamps:
+            self.stamps[stage] = time.monotonic() if at is None else at
+
+    def finish(self, interrupted: bool = False):
+        """The reply is over (or was cut off); record the turn once."""
+        if self.finished or self.tracer is None:
+            return
+        self.finished = True
+        self.interrupted = interrupted
+        self.tracer.record(self)
+
+    def intervals(self) -> Dict[str, float]:
+        """Seconds per INTERVALS entry whose two stages were stamped."""
+        stamps, out = self.stamps, {}
+        for name, start, end in INTERVALS:
+            if name == "turn" and start not in stamps:
+                start = "final"  # no VAD: the turn starts at the final
+            if start in stamps and end in stamps:
+                out[name] = stamps[end] - stamps[start]
+        return out
+
+    def describe(self) -> str:
+        """One line for logs, e.g. "endpoint 420 ms, first_token 610 ms, ..., turn 1.31 s"."""
+        parts = []
+        for name, seconds in self.intervals().items():
+            parts.append(f"{name} {seconds:.2f} s" if abs(seconds) >= 1 else f"{name} {seconds * 1000:.0f} ms")
+        return ", ".join(parts) + (" (interrupted)" if self.interrupted else "")
+
+
+class _NullTurn(Turn):
+    __slots__ = ()
+
+    def mark(self, stage: str, at: Optional[float] = None, overwrite: bool = False):
+        pass
+
+
+NULL_TURN = _NullTurn(None)  # what gets stamped when nothing is traced
+
+
+class Tracer:
+    """Collects finished turns: JSONL lines, OpenTelemetry spans, percentiles."""
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True, otel: bool = True, window: int = SUMMARY_WINDOW):
+        self.path = path
+        self.enabled = enabled
+        self.turns = 0
+        self.interrupted = 0
+        self._intervals: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name, _, _ in INTERVALS}
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._otel = None
+        self._otel_checked = not otel
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def start_turn(self) -> Turn:
+        return Turn(self) if self.enabled else NULL_TURN
+
+    def _otel_tracer(self):
+        if not self._otel_checked:
+            self._otel_checked = True
+            try:
+                from opentelemetry import trace
+
+                self._otel = trace.get_tracer("voice_agent")
+            except ImportError:
+                pass
+        return self._otel
+
+    def _ns(self, stamp: float) -> int:
+        return int(stamp * 1e9) + self._wall_offset_ns
+
+    def _spans(self, turn: Turn, intervals: Dict[str, float], trace_id: str) -> list:
+        """The turn as a root span plus one child span per interval, OTLP/JSON field names."""
+        stamps = turn.stamps
+        root = {
+            "traceId": trace_id,
+            "spanId": os.urandom(8).hex(),
+            "name": "voice.turn",
+            "startTimeUnixNano": self._ns(min(stamps.values())),
+            "endTimeUnixNano": self._ns(max(stamps.values())),
+            "attributes": [
+                {"key": "voice.text", "value": {"stringValue": turn.text}},
+                {"key": "voice.interrupted", "value": {"boolValue": turn.interrupted}},
+            ],
+            "events": [{"name": stage, "timeUnixNano": self._ns(stamps[stage])} for stage in STAGES if stage in stamps],
+        }
+        spans = [root]
+        for name, start, _ in INTERVALS:
+            if name in intervals and name != "turn":
+                begin = stamps[start]
+                spans.append({
+                    "traceId": trace_id,
+                    "spanId": os.urandom(8).hex(),
+                    "parentSpanId": root["spanId"],
+                    "name": f"voice.{name}",
+                    "startTimeUnixNano": self._ns(begin),
+                    "endTimeUnixNano": self._ns(begin + intervals[name]),
+                })
+        return spans
+
+    def _export_otel(self, otel, spans: list):
+        from opentelemetry import trace
+
+        root, children = spans[0], spans[1:]
+        span = otel.start_span(root["name"], start_time=root["startTimeUnixNano"])
+        for event in root["events"]:
+            span.add_event(event["name"], timestamp=event["timeUnixNano"])
+        span.set_attribute("voice.trace_id", root["traceId"])
+        context = trace.set_span_in_context(span)
+        for child in children:
+            if child["endTimeUnixNano"] >= child["startTimeUnixNano"]:
+                otel.start_span(child["name"], context=context, start_time=child["startTimeUnixNano"]).end(
+                    end_time=child["endTimeUnixNano"]
+                )
+        span.end(end_time=root["endTimeUnixNano"])
+
+    def record(self, turn: Turn):
+        if not turn.stamps:
+            return
+        intervals = turn.intervals()
+        with self._lock:
+            self.turns += 1
+            self.interrupted += turn.interrupted
+            for name, seconds in intervals.items():
+                self._intervals[name].append(seconds)
+        otel = self._otel_tracer()
+        if self.path is None and otel is None:
+            return
+        first = min(turn.stamps.values())
+        spans = self._spans(turn, intervals, os.urandom(16).hex())
+        if otel is not None:
+            self._export_otel(otel, spans)
+        if self.path is not None:
+            event = {
+                "trace_id": spans[0]["traceId"],
+                "text": turn.text,
+                "interrupted": turn.interrupted,
+                "start_unix_ns": self._ns(first),
+                "stamps_ms": {s: round((turn.stamps[s] - first) * 1000, 1) for s in STAGES if s in turn.stamps},
+                "intervals_ms": {name: round(seconds * 1000, 1) for name, seconds in intervals.items()},
+                "spans": spans,
+            }
+            self._write(json.dumps(event, separators=(",", ":")) + "\n")
+
+    def _write(self, line: str):
+        with self._lock:
+            if self._fd is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                # One append per line: the server's worker processes can share the file.
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self._fd, line.encode())
+
+    def summary(self) -> Dict[str, dict]:
+        """{interval: {"n", "p50_ms", "p95_ms", "p99_ms"}} over the recent turns."""
+        import numpy as np
+
+        with self._lock:
+            samples = {name: np.array(values) * 1000 for name, values in self._intervals.items() if values}
+        out = {}
+        for name, ms in samples.items():
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            out[name] = {"n": int(ms.size), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return out
+
+    def format_summary(self) -> str:
+        lines = [f"{self.turns} turns traced ({self.interrupted} interrupted)"]
+        for name, s in self.summary().items():
+            lines.append(f"  {name:20} p50 {s['p50_ms']:7.0f} ms  p95 {s['p95_ms']:7.0f} ms  p99 {s['p99_ms']:7.0f} ms  (n={s['n']})")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+# ---------- Current turn ----------
+
+_turn: contextvars.ContextVar = contextvars.ContextVar("voice_turn", default=None)
+_stream: contextvars.ContextVar = contextvars.ContextVar("voice_stt_stream", default=None)
+
+
+class StreamTurns:
+    """The turns of one STT stream, opened by transcript result id until their final."""
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer or get_tracer()
+        self._open: "OrderedDict[str, Turn]" = OrderedDict()
+        self._latest: Optional[Turn] = None
+        self._speech_end: Optional[float] = None  # VAD end of speech before any transcript for it
+
+    def _get(self, result_id: str) -> Turn:
+        turn = self._open.get(result_id)
+        if turn is None:
+            turn = self._open[result_id] = self.tracer.start_turn()
+            if self._speech_end is not None:
+                turn.mark("speech_end", self._speech_end)
+                self._speech_end = None
+            while len(self._open) > MAX_OPEN_TURNS:
+                self._open.popitem(last=False)
+        self._latest = turn
+        return turn
+
+    def speech_start(self):
+        self._speech_end = None
+
+    def speech_end(self, result_id: Optional[str]):
+        """The VAD's end of utterance; `result_id` of the latest partial, if there is one."""
+        if result_id is not None and result_id in self._open:
+            self._open[result_id].mark("speech_end")
+        else:
+            self._speech_end = time.monotonic()
+
+    def partial(self, result_id: str):
+        self._get(result_id).mark("last_partial", overwrite=True)
+
+    def final(self, result_id: str, text: str) -> Turn:
+        turn = self._get(result_id)
+        del self._open[result_id]
+        turn.mark("final")
+        turn.text = text
+        return turn
+
+    def latest(self) -> Turn:
+        return self._latest or NULL_TURN
+
+
+@contextmanager
+def stream_turns(tracer: Optional[Tracer] = None):
+    """StreamTurns for one STT stream, current for the tasks started inside (speculative agent turns)."""
+    turns = StreamTurns(tracer)
+    token = _stream.set(turns)
+    try:
+        yield turns
+    finally:
+        _stream.reset(token)
+
+
+@contextmanager
+def use(turn: Turn):
+    """Make `turn` current: tasks created inside (the reply) stamp it."""
+    token = _turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _turn.reset(token)
+
+
+def current() -> Turn:
+    """The turn being replied to, else the latest one still being transcribed, else NULL_TURN."""
+    turn = _turn.get()
+    if turn is not None:
+        return turn
+    turns = _stream.get()
+    return turns.latest() if turns is not None else NULL_TURN
+
+
+# ---------- Shared tracer ----------
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide Tracer from config (tracing_enabled, trace_log)."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            import config
+
+            _tracer = Tracer(config.trace_log, enabled=config.tracing_enabled)
+        return _tracer
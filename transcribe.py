@@ -23,6 +23,7 @@ Notes:
 
 import asyncio
 import sys
+import time
 from typing import Optional
 
 import numpy as np
@@ -33,8 +34,9 @@ try:
 except Exception:
     pass
 
-from amazon_transcribe.client import TranscribeStreamingClient
-from amazon_transcribe.handlers import TranscriptResultStreamHandler
+import profiling
+import tracing
+from stt import AWSTranscribeBackend
 
 # ---------- Config ----------
 SAMPLE_RATE = 16000  # Hz
@@ -42,161 +44,320 @@ CHANNELS = 1
 SAMPLE_WIDTH_BYTES = 2  # 16-bit PCM
 CHUNK_MS = 20  # size of mic frames to send to Transcribe
 CHUNK_SAMPLES = int(SAMPLE_RATE * CHUNK_MS / 1000)
+RING_FRAMES = 100  # mic frames buffered between the audio thread and the loop (2 s max lag)
+MAX_BATCH_FRAMES = 5  # already-buffered frames sent together in one event (100 ms)
+MAX_COALESCE_FRAMES = 25  # batch limit under the COALESCE policy (500 ms)
+
+# What MicStream does when the consumer (Transcribe) falls behind:
+DROP_OLDEST = "drop_oldest"  # overwrite the oldest buffered audio, keep the newest
+DROP_NEWEST = "drop_newest"  # keep what's buffered, discard incoming audio
+COALESCE = "coalesce"  # send backlog in much larger batches to catch up; drop oldest if still full
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
 LANGUAGE_CODE = "en-US"  # change as needed
+VAD_SILENCE_TAIL = bytes(SAMPLE_RATE * SAMPLE_WIDTH_BYTES * 600 // 1000)  # 600 ms sent at end of utterance
+VAD_KEEPALIVE_FRAME = bytes(CHUNK_SAMPLES * SAMPLE_WIDTH_BYTES)  # Transcribe times out after 15 s without audio
+VAD_KEEPALIVE_S = 5.0
 
 # ---------- Audio Input (Mic) ----------
 
 class MicStream:
-    """Async microphone stream yielding raw int16 PCM frames."""
-
-    def __init__(self, samplerate=SAMPLE_RATE, channels=CHANNELS, chunk_samples=CHUNK_SAMPLES):
+    """Async microphone stream yielding raw int16 PCM frames.
+
+    The PortAudio callback copies each block into a preallocated NumPy ring of
+    fixed-size frames and bumps a single writer index - no allocation, no
+    asyncio calls - except for waking the reader via call_soon_threadsafe when
+    it is actually waiting. The reader turns slots into bytes on the loop thread.
+
+    The ring is the only buffer, so memory is fixed and lag is bounded by
+    `capacity_frames`; `overflow` picks what happens when it fills up (see
+    OVERFLOW_POLICIES). `dropped_frames` / `coalesced_frames` count the effect;
+    `batched_frames` counts frames sent behind another one in a chunk, under any
+    policy.
+
+    generator() sleeps until the callback signals a frame or the stream is
+    closed (no timeout polling) and sends every frame already buffered, up to
+    `max_batch` (`max_coalesce` under COALESCE), as one chunk.
+
+    With `profiler` (default profiling.get_profiler()) enabled, the callback is
+    timed and the backlog reported as the "mic" queue.
+    """
+
+    def __init__(
+        self,
+        samplerate=SAMPLE_RATE,
+        channels=CHANNELS,
+        chunk_samples=CHUNK_SAMPLES,
+        capacity_frames=RING_FRAMES,
+        overflow=COALESCE,
+        max_batch=MAX_BATCH_FRAMES,
+        max_coalesce=MAX_COALESCE_FRAMES,
+        stream_factory=None,
+        profiler=None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
         self.samplerate = samplerate
         self.channels = channels
         self.chunk_samples = chunk_samples
-        self._queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self.capacity_frames = capacity_frames
+        self.overflow = overflow
+        self._normal_batch = max(1, min(max_batch, capacity_frames - 1))
+        self.max_batch = max(1, min(max_coalesce if overflow == COALESCE else max_batch, capacity_frames - 1))
+        self._ring = np.zeros((capacity_frames, chunk_samples * channels), dtype=np.int16)
+        self._flat = self._ring.reshape(-1)
+        self._frame_len = chunk_samples * channels
+        self._write_idx = 0  # frames completed by the callback (only it writes this)
+        self._read_idx = 0  # frames consumed by the reader (only it writes this)
+        self._fill = 0  # samples already in the frame being written
+        self._waiting = False
+        self._data = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stream_factory = stream_factory or sd.InputStream
         self._stream: Optional[sd.InputStream] = None
         self._closed = asyncio.Event()
+        self._profiler = profiler or profiling.get_profiler()
+        self.dropped_frames = 0
+        self.coalesced_frames = 0  # frames merged by the COALESCE policy past the normal batch
+        self.batched_frames = 0  # frames sent behind another frame in one chunk
 
     def _callback(self, indata, frames, time_info, status):  # sounddevice callback
         if status:
             # Non-fatal warnings go to stderr.
             print(f"[mic] status: {status}", file=sys.stderr)
-        # Ensure int16 bytes
-        pcm = (indata.copy().astype(np.int16)).tobytes()
-        # We may be called with variable frame counts; chop to fixed-size chunks
-        # for smoother streaming.
-        for start in range(0, len(pcm), self.chunk_samples * SAMPLE_WIDTH_BYTES * self.channels):
-            chunk = pcm[start : start + self.chunk_samples * SAMPLE_WIDTH_BYTES * self.channels]
-            if len(chunk) > 0:
-                try:
-                    self._queue.put_nowait(chunk)
-                except asyncio.QueueFull:
-                    pass
+        samples = indata.reshape(-1)
+        # Only DROP_NEWEST ever refuses a frame; the other policies overwrite the
+        # oldest slot and let the reader notice it was lapped.
+        full = self.overflow == DROP_NEWEST and self._write_idx - self._read_idx >= self.capacity_frames
+        if self._fill == 0 and samples.shape[0] == self._frame_len and not full:
+            # Fast path: one block == one frame (blocksize=chunk_samples).
+            self._ring[self._write_idx % self.capacity_frames] = samples
+            self._write_idx += 1
+            if self._waiting:
+                self._waiting = False
+                self._loop.call_soon_threadsafe(self._data.set)
+            return
+        offset = 0
+        remaining = samples.shape[0]
+        # We may be called with variable frame counts; chop to fixed-size frames.
+        while remaining:
+            if self.overflow == DROP_NEWEST and self._write_idx - self._read_idx >= self.capacity_frames:
+                self.dropped_frames += 1
+                self._fill = 0
+                break
+            base = (self._write_idx % self.capacity_frames) * self._frame_len + self._fill
+            n = min(remaining, self._frame_len - self._fill)
+            self._flat[base : base + n] = samples[offset : offset + n]
+            offset += n
+            remaining -= n
+            self._fill += n
+            if self._fill == self._frame_len:
+                self._fill = 0
+                self._write_idx += 1
+                if self._waiting:
+                    self._waiting = False
+                    self._loop.call_soon_threadsafe(self._data.set)
 
     async def __aenter__(self):
-        self._stream = sd.InputStream(
+        self._loop = asyncio.get_running_loop()
+        self._stream = self._stream_factory(
             samplerate=self.samplerate,
             channels=self.channels,
             dtype="int16",
-            callback=self._callback,
+            callback=self._profiler.wrap_callback("mic", self._callback),
             blocksize=self.chunk_samples,
         )
+        self._profiler.queue("mic", self._queued_seconds)
         self._stream.start()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         self._closed.set()
+        self._data.set()  # wake the generator so it returns right away
+        self._profiler.remove_queue("mic", self._queued_seconds)
         if self._stream is not None:
             self._stream.stop()
             self._stream.close()
 
+    @property
+    def lag_frames(self) -> int:
+        """Frames captured but not yet handed to the consumer."""
+        return min(self._write_idx - self._read_idx, self.capacity_frames)
+
+    def _queued_seconds(self) -> float:
+        return self.lag_frames * self.chunk_samples / self.samplerate
+
+    def _read_chunk(self) -> Optional[bytes]:
+        """Next batch of buffered frames as bytes, or None if nothing is buffered."""
+        cap = self.capacity_frames
+        while True:
+            backlog = self._write_idx - self._read_idx
+            if backlog == 0:
+                return None
+            if backlog >= cap:
+                # Writer lapped us: skip to the oldest slot it can't be writing into.
+                skip = backlog - cap + 1
+                self._read_idx += skip
+                self.dropped_frames += skip
+                backlog -= skip
+            n = min(backlog, self.max_batch)
+            first = self._read_idx
+            start = first % cap
+            if start + n <= cap:
+                chunk = self._ring[start : start + n].tobytes()
+            else:
+                chunk = self._ring[start:].tobytes() + self._ring[: n - (cap - start)].tobytes()
+            if self._write_idx >= first + cap:
+                continue  # overwritten while we copied it; drop and retry
+            self._read_idx = first + n
+            self.batched_frames += n - 1
+            if n > self._normal_batch:
+                self.coalesced_frames += n - self._normal_batch
+            return chunk
+
     async def generator(self):
         while not self._closed.is_set():
-            try:
-                chunk = await asyncio.wait_for(self._queue.get(), timeout=0.5)
-                yield chunk
-            except asyncio.TimeoutError:
-                continue
+            chunk = self._read_chunk()
+            if chunk is None:
+                # Announce we are waiting, then re-check to not miss a frame written in between.
+                self._data.clear()
+                self._waiting = True
+                chunk = self._read_chunk()
+                if chunk is None:
+                    await self._data.wait()
+                    continue
+                self._waiting = False
+            yield chunk
 
 # ---------- Transcribe Streaming ----------
 
-class MyEventHandler(TranscriptResultStreamHandler):
-    def __init__(self, stream, on_final_callback):
-        super().__init__(stream)
-        self.on_final_callback = on_final_callback
-
-    async def handle_transcript_event(self, transcript_event):
-        results = transcript_event.transcript.results
-        for res in results:
-            if len(res.alternatives) == 0:
-                continue
-            text = res.alternatives[0].transcript
-            if res.is_partial:
-                print(f"\r[partial] {text[:120]}", end="", flush=True)
-            else:
-                print("\r" + " " * 120, end="\r")  # clear partial line
-                print(f"[final]   {text}")
-                await self.on_final_callback(text)
-
-async def stream_to_transcribe(audio_stream):
-    client = TranscribeStreamingClient(region="us-west-2")  # specify actual region
-
-    # Create bidirectional stream - pass parameters directly
-    stream = await client.start_stream_transcription(
-        language_code=LANGUAGE_CODE,
-        media_sample_rate_hz=SAMPLE_RATE,
-        media_encoding="pcm",
-        enable_partial_results_stabilization=True,
-        partial_results_stability="medium",
-        enable_channel_identification=False,
-        show_speaker_label=False,
-    )
+def _words(text: str) -> tuple:
+    """Lowercase words without punctuation: what an early final and Transcribe's final are compared on."""
+    return tuple(w for w in (w.strip(".,!?;:\"'").lower() for w in text.split()) if w)
+
+
+async def stream_to_transcribe(
+    audio_stream,
+    on_partial=None,
+    on_final=None,
+    on_audio=None,
+    vad=None,
+    early_final=True,
+    on_speech_end=None,
+    session=None,
+    owner=None,
+    backend=None,
+    tracer=None,
+):
+    """Stream mic audio to Transcribe, calling on_partial/on_final with transcripts.
+
+    With `vad` (a vad.VoiceActivityDetector) only speech is sent, plus a short
+    silence tail at each local end of utterance so Transcribe still finalizes
+    and a tiny keepalive frame during long pauses. The local end of utterance
+    also calls on_final right away with the latest partial. That early final is
+    provisional: Transcribe's later final for the same result is dropped only
+    if it says the same words, and otherwise goes to on_final too, as a
+    correction that supersedes it. Partials that add words to it (the user
+    paused mid-sentence and kept talking) reopen the utterance: they go to
+    on_partial and the next end of utterance finals it again. Pass
+    early_final=False to get on_speech_end(latest_partial) instead and keep
+    Transcribe's own final (endpointing.EarlyEndpointer does this).
+
+    `backend` is an stt.STTBackend (default: Amazon Transcribe, on `session`'s
+    pre-warmed stream when a transcribe_session.TranscribeSession is given;
+    `owner` names whose recording it is, so one user's new recording never
+    takes the stream over from another's).
+
+    Each utterance is a tracing.Turn (on `tracer`, default tracing.get_tracer())
+    stamped with speech end, last partial and final; on_final runs with it as
+    the current turn, so the reply it starts is traced too.
+    """
+    if backend is None:
+        backend = AWSTranscribeBackend(session=session, owner=owner)
+    stream = await backend.start()
+    send_audio = stream.send
+
+    latest_partial = {"result_id": None, "text": ""}
+    early_finals = {}  # result id -> words of the last final sent for it from the local VAD
+
+    async def on_local_end_of_utterance():
+        result_id, text = latest_partial["result_id"], latest_partial["text"]
+        turns.speech_end(result_id)
+        if result_id is None or not text.strip() or early_finals.get(result_id) == _words(text):
+            return
+        if not early_final:
+            if on_speech_end:
+                await on_speech_end(text)
+            return
+        early_finals[result_id] = _words(text)
+        with tracing.use(turns.final(result_id, text)):
+            if on_final:
+                await on_final(text)
 
     async def mic_producer():
+        last_sent = time.monotonic()
         async for chunk in audio_stream.generator():
-            await stream.input_stream.send_audio_event(audio_chunk=chunk)
-        await stream.input_stream.end_stream()
+            if on_audio:
+                on_audio(chunk)
+            if vad is not None:
+                result = vad.process(chunk)
+                if result.started:
+                    turns.speech_start()
+                if result.audio:
+                    await send_audio(result.audio)
+                    last_sent = time.monotonic()
+                if result.ended:
+                    # Transcribe only finalizes once it hears a pause.
+                    await send_audio(VAD_SILENCE_TAIL)
+                    last_sent = time.monotonic()
+                    await on_local_end_of_utterance()
+                elif time.monotonic() - last_sent >= VAD_KEEPALIVE_S:
+                    await send_audio(VAD_KEEPALIVE_FRAME)
+                    last_sent = time.monotonic()
+                continue
+            await send_audio(chunk)
+        await stream.end()
 
     async def handle_results():
-        handler = MyEventHandler(stream.output_stream, on_final_callback=on_final_transcript)
-        await handler.handle_events()
-
-    async def on_final_transcript(text: str):
-        # Process the final transcript (you can add your logic here)
-        print(f"[processed] Final transcript: {text}")
+        async for res in stream.results():
+            early = early_finals.get(res.result_id)
+            if res.is_partial:
+                if early is not None and len(_words(res.text)) <= len(early):
+                    continue  # Transcribe catching up on words already finalized
+                latest_partial["result_id"], latest_partial["text"] = res.result_id, res.text
+                turns.partial(res.result_id)
+                if on_partial:
+                    await on_partial(res.text)
+            else:
+                early_finals.pop(res.result_id, None)
+                if latest_partial["result_id"] == res.result_id:
+                    latest_partial["result_id"], latest_partial["text"] = None, ""
+                if early is not None and _words(res.text) == early:
+                    continue  # same words as the early final
+                with tracing.use(turns.final(res.result_id, res.text)):
+                    if on_final:
+                        await on_final(res.text)
 
-    await asyncio.gather(mic_producer(), handle_results())
+    try:
+        with tracing.stream_turns(tracer) as turns:
+            await asyncio.gather(mic_producer(), handle_results())
+    finally:
+        await stream.close()
 
 # ---------- Main ----------
 
+async def main():
+    print("Starting real-time Transcribe. Press Ctrl+C to stop.")
 
-# ...existing code...
-
-async def stream_to_transcribe(audio_stream, on_partial=None, on_final=None):
-    client = TranscribeStreamingClient(region="us-west-2")
-
-    stream = await client.start_stream_transcription(
-        language_code=LANGUAGE_CODE,
-        media_sample_rate_hz=SAMPLE_RATE,
-        media_encoding="pcm",
-        enable_partial_results_stabilization=True,
-        partial_results_stability="medium",
-        enable_channel_identification=False,
-        show_speaker_label=False,
-    )
-
-    async def mic_producer():
-        async for chunk in audio_stream.generator():
-            await stream.input_stream.send_audio_event(audio_chunk=chunk)
-        await stream.input_stream.end_stream()
-
-    class CustomEventHandler(TranscriptResultStreamHandler):
-        async def handle_transcript_event(self, transcript_event):
-            results = transcript_event.transcript.results
-            for res in results:
-                if len(res.alternatives) == 0:
-                    continue
-                text = res.alternatives[0].transcript
-                if res.is_partial:
-                    if on_partial:
-                        await on_partial(text)
-                else:
-                    if on_final:
-                        await on_final(text)
-
-    async def handle_results():
-        handler = CustomEventHandler(stream.output_stream)
-        await handler.handle_events()
-
-    await asyncio.gather(mic_producer(), handle_results())
+    async def on_partial(text):
+        print(f"\r[partial] {text[:120]}", end="", flush=True)
 
-# ...existing code...
+    async def on_final(text):
+        print("\r" + " " * 120, end="\r")  # clear partial line
+        print(f"[final]   {text}")
 
-async def main():
-    print("Starting real-time Transcribe. Press Ctrl+C to stop.")
     try:
         async with MicStream() as mic:
-            await stream_to_transcribe(mic)
+            await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final)
     except KeyboardInterrupt:
         print("\nExiting...")
 
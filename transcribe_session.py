@@ -0,0 +1,428 @@
+"""
+Persistent, pre-warmed Amazon Transcribe streaming session.
+- A streaming connection is opened in the background, before the user presses
+  record, and kept alive with tiny silent frames, so a recording starts sending
+  audio at once instead of paying TLS + stream setup every turn.
+- The stream is rotated onto a fresh one well before the service's per-stream
+  time limit, between recordings, on the same client (pooled connection).
+- If a stream fails mid-recording, a new one is opened and the audio since the
+  last final result is replayed into it; the caller just sees results continue.
+- Runs on its own event loop thread, so Streamlit reruns and per-recording event
+  loops can share one session (see get_transcribe_session).
+- One warm stream per process: a recording started while another user's
+  recording holds it streams on a fresh stream of its own instead of taking it
+  over; only a lease with the same owner (a Streamlit rerun that abandoned its
+  recording) preempts.
+
+Pass the session to transcribe.stream_to_transcribe(..., session=...).
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional
+
+import numpy as np
+from amazon_transcribe.client import TranscribeStreamingClient
+from amazon_transcribe.model import TranscriptEvent
+
+from transcribe import LANGUAGE_CODE, SAMPLE_RATE, SAMPLE_WIDTH_BYTES, VAD_KEEPALIVE_FRAME, VAD_SILENCE_TAIL
+
+# ---------- Config ----------
+REGION = "us-west-2"
+ROTATE_AFTER_S = 3.5 * 3600  # Transcribe caps a stream at 4 hours
+KEEPALIVE_S = 5.0  # ...and closes it after 15 s without audio
+REPLAY_SECONDS = 10.0  # audio kept (since the last final) for replay after a failure
+DRAIN_S = 2.0  # after a recording ends, wait this long for its final
+MAX_RECONNECTS = 3
+
+
+class _Stream:
+    def __init__(self, stream):
+        self.stream = stream
+        self.opened_at = time.monotonic()
+        self.last_sent = self.opened_at
+        self.failed = False
+        self.receiver: Optional[asyncio.Task] = None
+
+
+class Lease:
+    """One recording on a TranscribeSession, used from the caller's event loop."""
+
+    _END = object()
+
+    def __init__(self, session: "TranscribeSession", owner=None):
+        self._session = session
+        self.owner = owner
+        self._own: Optional[_Stream] = None  # a fresh stream while the warm one is busy
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+        self._ended = False
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        await self._session._call(self._session._acquire(self))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if not self._ended:
+            self._ended = True
+            await self._session._call(self._session._release(self, drain=False))
+
+    async def send(self, chunk: bytes):
+        await self._session._call(self._session._send(chunk, self))
+
+    async def end(self):
+        """No more audio: wait briefly for the final of an unfinished utterance, then end events()."""
+        self._ended = True
+        await self._session._call(self._session._release(self, drain=True))
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._events.get()
+            if event is Lease._END:
+                return
+            yield event
+
+    # Called on the session loop.
+
+    def _put(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._events.put_nowait, item)
+        except RuntimeError:
+            pass  # the recording's loop is already gone
+
+    def _deliver(self, event: TranscriptEvent):
+        self._put(event)
+
+    def _close(self):
+        self._put(Lease._END)
+
+
+class TranscribeSession:
+    """Keeps one Transcribe stream warm and hands it to one recording at a time.
+
+    `client_factory` builds the streaming client (fakes.FakeTranscribeClient
+    offline). A new lease takes over from an open lease with the same owner;
+    while a different owner's lease holds the warm stream (or the new lease has
+    no owner), it opens a fresh stream of its own, without replay on failure.
+    """
+
+    def __init__(
+        self,
+        client_factory=None,
+        region: str = REGION,
+        language_code: str = LANGUAGE_CODE,
+        sample_rate: int = SAMPLE_RATE,
+        rotate_after_s: float = ROTATE_AFTER_S,
+        keepalive_s: float = KEEPALIVE_S,
+        replay_seconds: float = REPLAY_SECONDS,
+        drain_s: float = DRAIN_S,
+    ):
+        self._client_factory = client_factory or functools.partial(TranscribeStreamingClient, region=region)
+        self.language_code = language_code
+        self.sample_rate = sample_rate
+        self.rotate_after_s = rotate_after_s
+        self.keepalive_s = keepalive_s
+        self.drain_s = drain_s
+        self._replay_limit = int(replay_seconds * sample_rate * SAMPLE_WIDTH_BYTES)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="transcribe-session", daemon=True)
+        self._client = None
+        self._current: Optional[_Stream] = None
+        self._lease: Optional[Lease] = None
+        self._replay: Deque[bytes] = deque()
+        self._replay_bytes = 0
+        self._pending_id: Optional[str] = None  # result id of the unfinished utterance
+        self._orphans = set()  # result ids of abandoned utterances, never delivered
+        self._overflow = set()  # leases on a fresh stream of their own
+        # Created on the session loop by _start().
+        self._lock: Optional[asyncio.Lock] = None
+        self._finalized: Optional[asyncio.Event] = None
+        self._maintainer: Optional[asyncio.Task] = None
+        self.setup_ms: List[float] = []
+        self.lease_wait_ms: List[float] = []
+        self.rotations = 0
+        self.reconnects = 0
+        self.replayed_bytes = 0
+        self.keepalives = 0
+        self.overflow_streams = 0
+
+    # ---------- Public API ----------
+
+    def start(self) -> "TranscribeSession":
+        """Start the session thread and open the first stream in the background."""
+        if not self._thread.is_alive():
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def lease(self, owner=None) -> Lease:
+        """`async with session.lease(owner) as lease:` - send(), events(), end().
+
+        `owner` identifies who is recording (e.g. the browser session).
+        """
+        self.start()
+        return Lease(self, owner)
+
+    def close(self):
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        setup = np.array(self.setup_ms)
+        waits = np.array(self.lease_wait_ms)
+        return {
+            "streams_opened": int(setup.size),
+            "setup_p50_ms": float(np.percentile(setup, 50)) if setup.size else None,
+            "lease_wait_p50_ms": float(np.percentile(waits, 50)) if waits.size else None,
+            "lease_wait_max_ms": float(waits.max()) if waits.size else None,
+            "rotations": self.rotations,
+            "reconnects": self.reconnects,
+            "replayed_kb": self.replayed_bytes / 1024,
+            "keepalives": self.keepalives,
+            "overflow_streams": self.overflow_streams,
+        }
+
+    # ---------- Session loop ----------
+
+    async def _call(self, coro):
+        """Run `coro` on the session loop from the caller's loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _start(self):
+        self._lock = asyncio.Lock()
+        self._finalized = asyncio.Event()
+        self._maintainer = asyncio.create_task(self._maintain())
+
+    async def _shutdown(self):
+        self._maintainer.cancel()
+        for lease in list(self._overflow):
+            await self._release(lease, drain=False)
+        if self._lease is not None:
+            self._lease._close()
+            self._lease = None
+        if self._current is not None:
+            await self._end(self._current)
+            self._current = None
+
+    async def _maintain(self):
+        """Warm, keep alive and rotate the stream while nobody is waiting on it."""
+        failures = 0
+        while True:
+            try:
+                async with self._lock:
+                    current = self._current
+                    if current is None or current.failed:
+                        await self._open(replay=self._lease is not None)
+                        if current is not None and self._lease is not None:
+                            self.reconnects += 1
+                    elif self._lease is None and time.monotonic() - current.opened_at >= self.rotate_after_s:
+                        await self._open()
+                        self.rotations += 1
+                    elif time.monotonic() - current.last_sent >= self.keepalive_s:
+                        await self._send_to(current, VAD_KEEPALIVE_FRAME)
+                        self.keepalives += 1
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self._client = None
+                print(f"[transcribe] session: {e}")
+            await asyncio.sleep(min(self.keepalive_s / 2, 0.5 * 2 ** failures))
+
+    async def _open(self, replay: bool = False) -> _Stream:
+        """Open a stream, make it current (replaying unfinished audio) and end the old one."""
+        new = _Stream(await self._start_stream())
+        new.receiver = asyncio.create_task(self._receive(new))
+        old, self._current = self._current, new
+        if replay:
+            for chunk in list(self._replay):
+                await self._send_to(new, chunk)
+                self.replayed_bytes += len(chunk)
+        if old is not None and not old.failed:
+            asyncio.create_task(self._end(old))
+        return new
+
+    async def _start_stream(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        started = time.monotonic()
+        stream = await self._client.start_stream_transcription(
+            language_code=self.language_code,
+            media_sample_rate_hz=self.sample_rate,
+            media_encoding="pcm",
+            enable_partial_results_stabilization=True,
+            partial_results_stability="medium",
+        )
+        self.setup_ms.append((time.monotonic() - started) * 1000)
+        return stream
+
+    async def _open_own(self, lease: Lease):
+        """Give `lease` a fresh stream of its own (the warm one is busy)."""
+        own = _Stream(await self._start_stream())
+        own.receiver = asyncio.create_task(self._receive_own(own, lease))
+        lease._own = own
+        self._overflow.add(lease)
+        self.overflow_streams += 1
+
+    async def _end(self, s: _Stream):
+        try:
+            await s.stream.input_stream.end_stream()
+        except Exception:
+            pass
+
+    async def _receive(self, s: _Stream):
+        try:
+            async for event in s.stream.output_stream:
+                if s is not self._current or not isinstance(event, TranscriptEvent):
+                    continue
+                fresh = False
+                for res in event.transcript.results:
+                    if res.result_id in self._orphans:
+                        if not res.is_partial:
+                            self._orphans.discard(res.result_id)
+                        continue
+                    fresh = True
+                    self._pending_id = res.result_id if res.is_partial else None
+                    if not res.is_partial:
+                        self._clear_replay()
+                        self._finalized.set()
+                if fresh and self._lease is not None:
+                    self._lease._deliver(event)
+        except Exception as e:
+            if s is self._current:
+                print(f"[transcribe] stream failed: {e}")
+        finally:
+            s.failed = True
+
+    async def _receive_own(self, s: _Stream, lease: Lease):
+        try:
+            async for event in s.stream.output_stream:
+                if isinstance(event, TranscriptEvent):
+                    lease._deliver(event)
+        except Exception as e:
+            print(f"[transcribe] stream failed: {e}")
+        finally:
+            s.failed = True
+
+    async def _send_to(self, s: _Stream, chunk: bytes):
+        try:
+            await s.stream.input_stream.send_audio_event(audio_chunk=chunk)
+        except Exception:
+            s.failed = True
+            raise
+        s.last_sent = time.monotonic()
+
+    async def _send(self, chunk: bytes, lease: Optional[Lease] = None):
+        if lease is not None and lease._own is not None:
+            await self._send_to(lease._own, chunk)
+            return
+        if lease is not None and lease is not self._lease:
+            return  # preempted: its audio must not leak into the new recording
+        async with self._lock:
+            self._remember(chunk)
+            if not self._current.failed:
+                try:
+                    await self._send_to(self._current, chunk)
+                    return
+                except Exception:
+                    pass
+            await self._reconnect()
+
+    async def _reconnect(self):
+        """Replace a failed stream mid-recording; the replay includes the chunk that failed."""
+        for attempt in range(MAX_RECONNECTS):
+            try:
+                await self._open(replay=True)
+                self.reconnects += 1
+                return
+            except Exception as e:
+                error = e
+                self._client = None
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        raise error
+
+    def _remember(self, chunk: bytes):
+        self._replay.append(chunk)
+        self._replay_bytes += len(chunk)
+        while self._replay_bytes > self._replay_limit:
+            self._replay_bytes -= len(self._replay.popleft())
+
+    def _clear_replay(self):
+        self._replay.clear()
+        self._replay_bytes = 0
+
+    async def _acquire(self, lease: Lease):
+        started = time.monotonic()
+        async with self._lock:
+            previous = self._lease
+            busy = previous is not None and (lease.owner is None or lease.owner != previous.owner)
+            if not busy:
+                if self._current is None or self._current.failed:
+                    await self._open()  # not warm (yet): this recording pays the setup
+                self._lease = lease
+                if previous is not None:
+                    await self._abandon_utterance()
+                self._clear_replay()
+        if busy:
+            await self._open_own(lease)  # outside the lock: the warm stream's recording carries on
+        elif previous is not None:
+            previous._close()
+        self.lease_wait_ms.append((time.monotonic() - started) * 1000)
+
+    async def _release(self, lease: Lease, drain: bool):
+        if lease._own is not None:
+            own, lease._own = lease._own, None
+            self._overflow.discard(lease)
+            await self._end(own)  # ending the stream makes Transcribe finalize
+            await asyncio.wait({own.receiver}, timeout=self.drain_s if drain else 0)
+            own.receiver.cancel()
+            lease._close()
+            return
+        if drain and self._lease is lease:
+            self._finalized.clear()
+            if self._pending_id is not None:
+                # The stream stays open, so Transcribe has to hear a pause to finalize.
+                await self._send(VAD_SILENCE_TAIL)
+                try:
+                    await asyncio.wait_for(self._finalized.wait(), self.drain_s)
+                except asyncio.TimeoutError:
+                    pass
+        if self._lease is lease:
+            async with self._lock:
+                await self._abandon_utterance()
+                self._lease = None
+                self._clear_replay()
+        lease._close()
+
+    async def _abandon_utterance(self):
+        """End an unfinished utterance so it can't merge into the next recording (lock held)."""
+        if self._pending_id is None and not self._replay:
+            return
+        if self._pending_id is not None:
+            self._orphans.add(self._pending_id)
+            self._pending_id = None
+        try:
+            await self._send_to(self._current, VAD_SILENCE_TAIL)
+        except Exception:
+            pass  # a failed stream is replaced anyway
+
+
+# ---------- Shared session ----------
+
+_session: Optional[TranscribeSession] = None
+_session_lock = threading.Lock()
+
+
+def get_transcribe_session() -> TranscribeSession:
+    """Process-wide session, started (and warming up) on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = TranscribeSession().start()
+        return _session
@@ -0,0 +1,256 @@
+"""
+More text-to-speech backends behind the tts_client.TTSClient interface.
+- LocalTTSClient: a local CPU synthesizer (espeak-ng by default, or Piper) run as
+  a worker process per utterance; its PCM is streamed from stdout and resampled
+  to 16 kHz as it arrives, so playback starts before synthesis finishes.
+- TTSRouter: picks an engine per utterance (short phrases go to the fast local
+  engine, the rest to Polly) and fails over to the other one when a call fails,
+  e.g. when Polly throttles, backing off the failing engine for a while.
+- fakes.FakePolly is the deterministic sine/noise backend for tests.
+"""
+
+import asyncio
+import struct
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from resample import Resampler
+from tts_client import DEFAULT_VOICE, TTSClient
+
+# ---------- Config ----------
+ESPEAK_COMMAND = ["espeak-ng", "--stdout", "--stdin", "-v", "en-us", "-s", "170"]  # text on stdin, WAV on stdout
+PIPER_COMMAND = ["piper", "--model", "en_US-lessac-medium.onnx", "--output-raw"]  # text on stdin, raw PCM
+LOCAL_SAMPLE_RATE = 22050  # espeak-ng and most Piper voices
+LOCAL_WORKERS = 2  # synthesizer processes running at once
+SHORT_CHARS = 24  # utterances up to this long go to the fast engine
+COOLDOWN_S = 30.0  # how long a failing engine is skipped
+TARGET_RATE = 16000
+READ_BYTES = 4096
+
+
+class _ProcessBody:
+    """File-like PCM body over a synthesizer's stdout, resampled to 16 kHz while it is read.
+
+    Holds one of the client's worker slots until it is read to the end or
+    closed; `with` closes it.
+    """
+
+    def __init__(self, proc: subprocess.Popen, samplerate: int, wav: bool, release):
+        self._proc = proc
+        self._samplerate = samplerate
+        self._wav = wav
+        self._release = release
+        self._release_lock = threading.Lock()
+        self._closed = False
+        self._resampler: Optional[Resampler] = None
+        self._buf = bytearray()
+        self._eof = False
+
+    def _start(self):
+        if self._wav:
+            header = self._proc.stdout.read(44)
+            if len(header) == 44 and header[:4] == b"RIFF":
+                self._samplerate = struct.unpack("<I", header[24:28])[0]
+        self._resampler = Resampler(self._samplerate, TARGET_RATE)
+
+    def _fill(self):
+        if self._resampler is None:
+            self._start()
+        chunk = self._proc.stdout.read1(READ_BYTES) if hasattr(self._proc.stdout, "read1") else self._proc.stdout.read(READ_BYTES)
+        if not chunk:
+            self._finish()
+            return
+        self._buf += self._resampler.process_bytes(chunk)
+
+    def _finish(self):
+        self._eof = True
+        code = self._proc.wait()
+        self._release_slot()
+        if code != 0 and not self._closed:
+            error = self._proc.stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"local TTS exited with {code}: {error}")
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        while not self._eof and (amt is None or len(self._buf) < amt):
+            self._fill()
+        if amt is None:
+            amt = len(self._buf)
+        out = bytes(self._buf[:amt])
+        del self._buf[:amt]
+        return out
+
+    def _release_slot(self):
+        # Once only: close() may race a read() still running on a worker thread.
+        with self._release_lock:
+            release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def close(self):
+        self._closed = True
+        if not self._eof:
+            self._eof = True
+            self._proc.kill()
+            self._proc.wait()
+        self._release_slot()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class LocalTTSClient(TTSClient):
+    """Offline TTS from a command-line synthesizer, one worker process per utterance.
+
+    `command` is an argv list; "{text}" in it is replaced by the text, otherwise
+    the text is written to stdin. Prefer stdin: a reply starting with "-" in
+    argv is parsed as an option (or put "--" before "{text}"). Output is WAV
+    (parsed for its rate) or raw int16 mono PCM at `samplerate`.
+    """
+
+    name = "local"
+    engine = "local"
+
+    def __init__(
+        self,
+        command: Sequence[str] = ESPEAK_COMMAND,
+        samplerate: int = LOCAL_SAMPLE_RATE,
+        wav: Optional[bool] = None,
+        max_workers: int = LOCAL_WORKERS,
+    ):
+        self.command = list(command)
+        self.samplerate = samplerate
+        self.wav = wav if wav is not None else "--stdout" in self.command
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-tts")
+        self._latencies = deque(maxlen=1000)  # seconds, request -> full audio
+
+    def _spawn(self, text: str) -> _ProcessBody:
+        self._slots.acquire()
+        try:
+            argv = [arg.replace("{text}", text) for arg in self.command]
+            use_stdin = not any("{text}" in arg for arg in self.command)
+            proc = subprocess.Popen(
+                argv,
+                stdin=subprocess.PIPE if use_stdin else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        if use_stdin:
+            proc.stdin.write(text.encode("utf-8"))
+            proc.stdin.close()
+        return _ProcessBody(proc, self.samplerate, self.wav, self._slots.release)
+
+    def _synthesize_blocking(self, text: str) -> bytes:
+        started = time.monotonic()
+        with self._spawn(text) as body:
+            audio = body.read()
+        self._latencies.append(time.monotonic() - started)
+        return audio
+
+    async def synthesize(self, text: str, voice_id: str = DEFAULT_VOICE) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._synthesize_blocking, text)
+
+    async def open_stream(self, text: str, voice_id: str = DEFAULT_VOICE):
+        loop = asyncio.get_running_loop()
+        spawn = loop.run_in_executor(self._executor, self._spawn, text)
+        try:
+            return await asyncio.shield(spawn)
+        except asyncio.CancelledError:
+            # The worker still starts the process (it may be waiting for a slot): close it when it has.
+            spawn.add_done_callback(lambda f: f.cancelled() or f.exception() or f.result().close())
+            raise
+
+    def stats(self) -> dict:
+        latencies = np.array(self._latencies) * 1000
+        if latencies.size == 0:
+            return {"calls": 0}
+        return {
+            "calls": int(latencies.size),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class TTSRouter(TTSClient):
+    """Routes each utterance to `fast` (short text) or `primary`, failing over between them.
+
+    A failed engine (throttling, network, crash) is skipped for `cooldown_s`.
+    """
+
+    name = "router"
+
+    def __init__(
+        self,
+        primary: TTSClient,
+        fast: TTSClient,
+        short_chars: int = SHORT_CHARS,
+        cooldown_s: float = COOLDOWN_S,
+    ):
+        self.primary = primary
+        self.fast = fast
+        self.short_chars = short_chars
+        self.cooldown_s = cooldown_s
+        self._down_until = {}  # client -> monotonic time it may be used again
+        self.routed = Counter()  # engine name -> utterances served
+        self.failovers = 0
+        self.errors = Counter()  # exception name -> count
+
+    def _order(self, text: str) -> List[TTSClient]:
+        order = [self.fast, self.primary] if len(text) <= self.short_chars else [self.primary, self.fast]
+        now = time.monotonic()
+        return sorted(order, key=lambda client: self._down_until.get(client, 0) > now)  # stable: healthy first
+
+    async def _call(self, method: str, text: str, voice_id: str):
+        error = None
+        for i, client in enumerate(self._order(text)):
+            try:
+                result = await getattr(client, method)(text, voice_id)
+            except Exception as e:
+                error = e
+                self.errors[type(e).__name__] += 1
+                self._down_until[client] = time.monotonic() + self.cooldown_s
+                continue
+            if i:
+                self.failovers += 1
+            self._down_until.pop(client, None)
+            self.routed[getattr(client, "name", type(client).__name__)] += 1
+            return result
+        raise error
+
+    async def synthesize(self, text: str, voice_id: str = DEFAULT_VOICE) -> bytes:
+        return await self._call("synthesize", text, voice_id)
+
+    async def open_stream(self, text: str, voice_id: str = DEFAULT_VOICE):
+        return await self._call("open_stream", text, voice_id)
+
+    def stats(self) -> dict:
+        engines = {}
+        for client in (self.primary, self.fast):
+            if hasattr(client, "stats"):
+                engines[getattr(client, "name", type(client).__name__)] = client.stats()
+        return {
+            "routed": dict(self.routed),
+            "failovers": self.failovers,
+            "errors": dict(self.errors),
+            "engines": engines,
+        }
+
+    def close(self):
+        self.primary.close()
+        self.fast.close()
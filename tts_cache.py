@@ -0,0 +1,276 @@
+"""
+Content-addressed cache for synthesized speech.
+- Keyed by (text, voice_id, sample rate, engine), so replays of the same reply
+  (every 🔊 click) and common phrases never hit Polly twice.
+- Hot PCM lives in memory under an LRU byte budget; entries evicted from memory
+  spill to an on-disk store that is served back through mmap. Spills are written
+  and the store pruned by a background writer thread, never on the caller's
+  (the event loop's) thread and never under the cache lock.
+- CachedTTSClient wraps any tts_client.TTSClient and reports hit rate and bytes saved.
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from tts_client import DEFAULT_VOICE, SAMPLE_RATE, TTSClient
+
+# ---------- Config ----------
+MEMORY_BUDGET_BYTES = 32 * 1024 * 1024  # ~17 minutes of 16 kHz int16 audio
+DISK_BUDGET_BYTES = 512 * 1024 * 1024
+MAX_OPEN_MAPS = 256
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "voice_agent", "tts")
+
+Audio = Union[bytes, memoryview]
+
+
+def cache_key(text: str, voice_id: str = DEFAULT_VOICE, sample_rate: str = SAMPLE_RATE, engine: str = "standard") -> str:
+    raw = "\x1f".join((text, voice_id, str(sample_rate), engine)).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class TTSCache:
+    """Two-tier (memory LRU + mmap'd disk) PCM store. Thread-safe."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = DEFAULT_DIR,
+        memory_budget: int = MEMORY_BUDGET_BYTES,
+        disk_budget: int = DISK_BUDGET_BYTES,
+    ):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._pending: "OrderedDict[str, bytes]" = OrderedDict()  # spilled, not on disk yet (still served)
+        self._lock = threading.Lock()
+        self._spilled = threading.Condition(self._lock)
+        self._writer: Optional[threading.Thread] = None
+        self._disk_bytes = 0  # running total of the disk tier, kept by the writer thread
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---------- Lookup ----------
+
+    def get(self, key: str) -> Optional[Audio]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += len(audio)
+                return audio
+            audio = self._pending.get(key)
+            if audio is not None:
+                self.memory_hits += 1
+                self.bytes_saved += len(audio)
+                return audio
+            view = self._map(key)
+            if view is not None:
+                self.disk_hits += 1
+                self.bytes_saved += len(view)
+                return view
+            self.misses += 1
+            return None
+
+    def put(self, key: str, audio: Audio, persist: bool = False):
+        """Store PCM in memory; `persist` also queues it for the disk tier right away."""
+        audio = bytes(audio)
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key))
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.memory_budget and len(self._memory) > 1:
+                old_key, old_audio = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old_audio)
+                self._spill(old_key, old_audio)
+            if persist:
+                self._spill(key, audio)
+
+    def __contains__(self, key: str) -> bool:
+        return (
+            key in self._memory
+            or key in self._pending
+            or (self.directory is not None and os.path.exists(self._path(key)))
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every spilled entry is on disk; False on timeout."""
+        with self._lock:
+            return self._spilled.wait_for(lambda: not self._pending, timeout)
+
+    # ---------- Disk tier ----------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".pcm")
+
+    def _spill(self, key: str, audio: bytes):
+        """Queue an entry for the writer thread (caller holds the lock)."""
+        if not self.directory or not audio:
+            return
+        self._pending[key] = audio
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="tts-cache-writer", daemon=True)
+            self._writer.start()
+        self._spilled.notify_all()
+
+    def _write_loop(self):
+        self._disk_bytes = self._disk_usage()[0]
+        while True:
+            with self._lock:
+                self._spilled.wait_for(lambda: self._pending)
+                key, audio = next(iter(self._pending.items()))
+            try:
+                self._write(key, audio)
+            except OSError as e:
+                print(f"[tts-cache] could not write {key[:12]}: {e}")
+            with self._lock:
+                if self._pending.get(key) is audio:
+                    del self._pending[key]
+                self._spilled.notify_all()
+
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        self._disk_bytes += len(audio)
+        if self._disk_bytes > self.disk_budget:
+            self._prune_disk()
+
+    def _map(self, key: str) -> Optional[memoryview]:
+        """mmap a disk entry (caller holds the lock); keeps a bounded set of maps open."""
+        m = self._maps.get(key)
+        if m is None:
+            if not self.directory:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                os.utime(path)  # recency for disk pruning
+            except (FileNotFoundError, ValueError):
+                return None
+            self._maps[key] = m
+            while len(self._maps) > MAX_OPEN_MAPS:
+                # Dropped maps close once no reader holds a view on them.
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(key)
+        return memoryview(m)
+
+    def _disk_usage(self):
+        """(total bytes, [(mtime, size, path)]) of the disk tier; files may vanish mid-walk (other processes prune too)."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".pcm"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        return sum(size for _, size, _ in entries), entries
+
+    def _prune_disk(self):
+        """Drop the least recently used files until the disk tier fits its budget (writer thread only)."""
+        total, entries = self._disk_usage()
+        for _, size, path in sorted(entries):
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
+
+    # ---------- Stats ----------
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "lookups": lookups,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "bytes_saved": self.bytes_saved,
+            "memory_bytes": self._memory_bytes,
+            "pending_writes": len(self._pending),
+        }
+
+
+class _TeeBody:
+    """File-like wrapper that caches a streamed AudioStream once fully read."""
+
+    def __init__(self, body, on_complete):
+        self._body = body
+        self._chunks = []
+        self._on_complete = on_complete
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        chunk = self._body.read(amt) if amt is not None else self._body.read()
+        if chunk:
+            self._chunks.append(chunk)
+        if not chunk or amt is None:
+            if self._on_complete is not None:
+                self._on_complete(b"".join(self._chunks))
+                self._on_complete = None
+        return chunk
+
+    def close(self):
+        self._on_complete = None  # never cache a reply that was cut off
+        if hasattr(self._body, "close"):
+            self._body.close()
+
+
+class CachedTTSClient(TTSClient):
+    """TTSClient that serves repeated (text, voice) requests from a TTSCache."""
+
+    def __init__(self, inner: TTSClient, cache: Optional[TTSCache] = None):
+        self.inner = inner
+        self.cache = cache or TTSCache()
+        self.name = getattr(inner, "name", self.name)
+
+    def _key(self, text: str, voice_id: str) -> str:
+        return cache_key(text, voice_id, SAMPLE_RATE, getattr(self.inner, "engine", "standard"))
+
+    async def synthesize(self, text: str, voice_id: str = DEFAULT_VOICE) -> Audio:
+        key = self._key(text, voice_id)
+        audio = self.cache.get(key)
+        if audio is None:
+            audio = await self.inner.synthesize(text, voice_id)
+            self.cache.put(key, audio)
+        return audio
+
+    async def open_stream(self, text: str, voice_id: str = DEFAULT_VOICE):
+        key = self._key(text, voice_id)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return io.BytesIO(audio)
+        body = await self.inner.open_stream(text, voice_id)
+        return _TeeBody(body, lambda pcm: self.cache.put(key, pcm))
+
+    def stats(self) -> dict:
+        inner_stats = self.inner.stats() if hasattr(self.inner, "stats") else {}
+        return {**inner_stats, "cache": self.cache.stats()}
+
+    def close(self):
+        self.inner.close()
+        self.cache.flush(timeout=5.0)  # spilled audio still on its way to disk
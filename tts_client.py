@@ -0,0 +1,158 @@
+"""
+Non-blocking Amazon Polly client for the voice agent.
+- synthesize_speech runs on a dedicated thread pool, never on the event loop.
+- One boto3 client shared by all pool threads, with its HTTP connection pool sized
+  to the concurrency limit, so TLS connections are reused between calls.
+- Works from any event loop (main.py's, or the per-click loops in the Streamlit apps).
+- Point it at fakes.StubPollyServer (endpoint_url=...) to benchmark offline.
+- Other engines (a local synthesizer, failover routing) live in tts_backends.py.
+"""
+
+import abc
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+# ---------- Config ----------
+DEFAULT_VOICE = "Joanna"
+SAMPLE_RATE = "16000"  # Polly takes the PCM rate as a string
+MAX_CONCURRENCY = 4  # parallel synthesize_speech calls (and pooled connections)
+
+
+class TTSClient(abc.ABC):
+    """Async text-to-speech interface used by polly.py, main.py and the Streamlit apps."""
+
+    name = "tts"
+
+    @abc.abstractmethod
+    async def synthesize(self, text: str, voice_id: str = DEFAULT_VOICE) -> bytes:
+        """Return the whole utterance as 16 kHz int16 PCM."""
+
+    @abc.abstractmethod
+    async def open_stream(self, text: str, voice_id: str = DEFAULT_VOICE):
+        """Return a file-like PCM body that can be read in chunks while it downloads."""
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class PollyTTSClient(TTSClient):
+    """Polly over a bounded thread pool with a reused HTTP connection pool."""
+
+    name = "polly"
+
+    def __init__(
+        self,
+        session=None,  # boto3.Session
+        region_name: str = "us-west-2",
+        max_concurrency: int = MAX_CONCURRENCY,
+        endpoint_url: Optional[str] = None,
+        engine: str = "standard",
+    ):
+        import boto3
+        from botocore.config import Config
+
+        session = session or boto3.Session()
+        client_kwargs = {}
+        if endpoint_url:
+            # Local stub mode: any credentials will do.
+            client_kwargs = dict(endpoint_url=endpoint_url, aws_access_key_id="stub", aws_secret_access_key="stub")
+        self._client = session.client(
+            "polly",
+            region_name=region_name,
+            config=Config(
+                max_pool_connections=max_concurrency,
+                tcp_keepalive=True,
+                retries={"max_attempts": 3, "mode": "adaptive"},
+            ),
+            **client_kwargs,
+        )
+        self.max_concurrency = max_concurrency
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="polly")
+        self._latencies = deque(maxlen=1000)  # seconds, request -> full audio
+
+    def _request(self, text: str, voice_id: str):
+        return self._client.synthesize_speech(
+            Text=text,
+            OutputFormat="pcm",
+            VoiceId=voice_id,
+            SampleRate=SAMPLE_RATE,
+            Engine=self.engine,
+        )
+
+    def _synthesize_blocking(self, text: str, voice_id: str) -> bytes:
+        started = time.monotonic()
+        audio = self._request(text, voice_id)["AudioStream"].read()
+        self._latencies.append(time.monotonic() - started)
+        return audio
+
+    async def synthesize(self, text: str, voice_id: str = DEFAULT_VOICE) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._synthesize_blocking, text, voice_id)
+
+    async def open_stream(self, text: str, voice_id: str = DEFAULT_VOICE):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._executor, self._request, text, voice_id)
+        return response["AudioStream"]
+
+    def stats(self) -> dict:
+        latencies = np.array(self._latencies) * 1000
+        if latencies.size == 0:
+            return {"calls": 0}
+        return {
+            "calls": int(latencies.size),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+# ---------- Shared client ----------
+
+_client: Optional[TTSClient] = None
+_client_lock = threading.Lock()
+
+
+def get_tts_client() -> TTSClient:
+    """Process-wide TTS client, created on first use from config.py settings.
+
+    config.tts_backend picks "polly", "local" or "auto" (tts_backends.TTSRouter:
+    short phrases on the local engine, failover between the two).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import config
+
+            if config.tts_backend == "local":
+                from tts_backends import LocalTTSClient
+
+                _client = LocalTTSClient(command=config.tts_local_command)
+                return _client
+            _client = PollyTTSClient(
+                session=config.get_session(),
+                region_name=config.region_name,
+                max_concurrency=config.polly_max_concurrency,
+                endpoint_url=config.polly_endpoint_url,
+            )
+            if config.tts_cache_dir is not None:
+                from tts_cache import CachedTTSClient, TTSCache
+
+                cache = TTSCache(config.tts_cache_dir, memory_budget=config.tts_cache_memory_mb * 1024 * 1024)
+                _client = CachedTTSClient(_client, cache)
+            if config.tts_backend == "auto":
+                from tts_backends import LocalTTSClient, TTSRouter
+
+                _client = TTSRouter(_client, LocalTTSClient(command=config.tts_local_command))
+        return _client
@@ -0,0 +1,161 @@
+"""
+Local voice activity detection in front of Transcribe.
+- Vectorized NumPy features per 20 ms frame: energy (dBFS) and zero-crossing rate,
+  computed for a whole batch of frames at once.
+- Noise floor calibrated on the first frames and then tracked between
+  utterances; onset debouncing, hangover and a pre-roll buffer so the start and
+  tail of words are not clipped.
+- Silence is not forwarded; a local end-of-utterance signal fires after a
+  configurable pause, usually well before Transcribe's own endpointing.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+# ---------- Config ----------
+FRAME_SAMPLES = 320  # 20 ms at 16 kHz
+MIN_SPEECH_DB = -50.0  # never call anything quieter than this speech
+NOISE_MARGIN_DB = 12.0  # speech must be this far above the tracked noise floor
+LOUD_MARGIN_DB = 24.0  # ...or this far, regardless of zero-crossing rate
+MAX_ZCR = 0.25  # crossings per sample; higher is hiss/fricative noise
+ONSET_FRAMES = 3  # consecutive speech frames to start an utterance (60 ms)
+HANGOVER_MS = 300  # keep streaming this long after speech stops
+PREROLL_MS = 200  # audio before the onset that is sent along with it
+END_OF_UTTERANCE_MS = 600  # pause that ends the utterance locally
+CALIBRATION_MS = 300  # initial audio assumed to be background noise
+NOISE_ADAPT_DOWN = 0.1  # EMA weight when a quiet frame is below the floor
+NOISE_ADAPT_UP = 0.01  # ...and when it is above (floor rises slowly)
+
+
+@dataclass
+class VADResult:
+    audio: bytes  # frames to forward to STT (possibly empty)
+    started: bool = False  # an utterance began in this chunk
+    ended: bool = False  # the local end-of-utterance fired in this chunk
+
+
+class VoiceActivityDetector:
+    """Gates int16 PCM chunks (any whole number of frames) to speech only."""
+
+    def __init__(
+        self,
+        frame_samples: int = FRAME_SAMPLES,
+        samplerate: int = 16000,
+        min_speech_db: float = MIN_SPEECH_DB,
+        noise_margin_db: float = NOISE_MARGIN_DB,
+        max_zcr: float = MAX_ZCR,
+        onset_frames: int = ONSET_FRAMES,
+        hangover_ms: int = HANGOVER_MS,
+        preroll_ms: int = PREROLL_MS,
+        end_of_utterance_ms: int = END_OF_UTTERANCE_MS,
+        calibration_ms: int = CALIBRATION_MS,
+    ):
+        frame_ms = 1000 * frame_samples / samplerate
+        self.frame_samples = frame_samples
+        self.min_speech_db = min_speech_db
+        self.noise_margin_db = noise_margin_db
+        self.max_zcr = max_zcr
+        self.onset_frames = onset_frames
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.eou_frames = max(self.hangover_frames, int(end_of_utterance_ms / frame_ms))
+        self._preroll = deque(maxlen=max(onset_frames, int(preroll_ms / frame_ms)))
+        self.noise_floor_db = min_speech_db - noise_margin_db
+        self._calibration_frames = int(calibration_ms / frame_ms)
+        self._calibration = []
+        self.in_utterance = False  # between onset and end-of-utterance
+        self._streaming = False  # between onset and end of hangover
+        self._speech_run = 0
+        self._silence_run = 0
+        self._remainder = b""
+        self.frames_in = 0
+        self.frames_out = 0
+
+    # ---------- Features ----------
+
+    def features(self, frames: np.ndarray):
+        """Per-frame energy (dBFS) and zero-crossing rate for an (n, frame_samples) int16 array."""
+        x = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        energy_db = 20 * np.log10(np.maximum(rms, 1e-6))
+        signs = np.signbit(x)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+        return energy_db, zcr
+
+    def _is_speech(self, energy_db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+        threshold = max(self.min_speech_db, self.noise_floor_db + self.noise_margin_db)
+        loud = max(self.min_speech_db, self.noise_floor_db + LOUD_MARGIN_DB)
+        return (energy_db >= threshold) & ((zcr <= self.max_zcr) | (energy_db >= loud))
+
+    def _calibrate(self, energy_db: np.ndarray) -> int:
+        """Use the first frames as the noise estimate; return how many were consumed."""
+        take = min(len(energy_db), self._calibration_frames - len(self._calibration))
+        self._calibration.extend(energy_db[:take].tolist())
+        if len(self._calibration) >= self._calibration_frames:
+            self.noise_floor_db = float(np.median(self._calibration))
+            self._calibration_frames = 0
+        return take
+
+    # ---------- Gating ----------
+
+    def process(self, chunk: bytes) -> VADResult:
+        data = self._remainder + chunk
+        frame_bytes = self.frame_samples * 2
+        usable = len(data) - len(data) % frame_bytes
+        self._remainder = data[usable:]
+        if usable == 0:
+            return VADResult(b"")
+        frames = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.frame_samples)
+        energy_db, zcr = self.features(frames)
+        result = VADResult(b"")
+        start = 0
+        if self._calibration_frames:
+            start = self._calibrate(energy_db)
+            for i in range(start):
+                self.frames_in += 1
+                self._preroll.append(data[i * frame_bytes : (i + 1) * frame_bytes])
+        speech = self._is_speech(energy_db, zcr)
+
+        out = []
+        for i in range(start, frames.shape[0]):
+            frame = data[i * frame_bytes : (i + 1) * frame_bytes]
+            self.frames_in += 1
+            if speech[i]:
+                self._speech_run += 1
+                self._silence_run = 0
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                if not self._streaming:
+                    e = float(energy_db[i])
+                    rate = NOISE_ADAPT_DOWN if e < self.noise_floor_db else NOISE_ADAPT_UP
+                    self.noise_floor_db += rate * (e - self.noise_floor_db)
+
+            if self._streaming:
+                out.append(frame)
+                if self._silence_run >= self.hangover_frames:
+                    self._streaming = False
+            elif speech[i] and self._speech_run >= self.onset_frames:
+                # Onset: flush the pre-roll (which holds the debounce frames) with this one.
+                out.extend(self._preroll)
+                out.append(frame)
+                self._preroll.clear()
+                self._streaming = True
+                if not self.in_utterance:
+                    self.in_utterance = True
+                    result.started = True
+            else:
+                self._preroll.append(frame)
+
+            if self.in_utterance and self._silence_run >= self.eou_frames:
+                self.in_utterance = False
+                result.ended = True
+
+        self.frames_out += len(out)
+        result.audio = b"".join(out)
+        return result
+
+    @property
+    def suppressed_ratio(self) -> float:
+        return 1 - self.frames_out / self.frames_in if self.frames_in else 0.0
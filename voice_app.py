@@ -1,10 +1,17 @@
 import streamlit as st
 import asyncio
 import threading
-from agent import agent
+from sessions import get_agent_pool, new_session_id
 from polly import synthesize_and_play_direct
 from transcribe import MicStream, stream_to_transcribe
-import time
+from transcribe_session import get_transcribe_session
+from live import LiveChannel, follow
+from webrtc_ingest import WebRTCAudioSource
+
+try:
+    from streamlit_webrtc import WebRtcMode, webrtc_streamer
+except ImportError:  # no browser capture; the server's microphone only
+    webrtc_streamer = None
 
 
 # Configure Streamlit page
@@ -14,15 +21,22 @@ st.set_page_config(
     layout="wide"
 )
 
+# Transcribe stream opens in the background now, so pressing record doesn't pay the setup
+transcribe_session = get_transcribe_session()
+
 # Initialize session state
+if 'agent_session' not in st.session_state:
+    st.session_state.agent_session = new_session_id()  # this browser session's own agent in the pool
+agent_session = st.session_state.agent_session  # read once: agent calls also run on recording threads
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'is_recording' not in st.session_state:
     st.session_state.is_recording = False
-if 'current_partial' not in st.session_state:
-    st.session_state.current_partial = ""
+if 'live' not in st.session_state:
+    st.session_state.live = LiveChannel()  # recording thread -> UI updates
 if 'recording_thread' not in st.session_state:
     st.session_state.recording_thread = None
+live = st.session_state.live
 
 
 def process_agent_response(response):
@@ -57,7 +71,8 @@ def process_agent_response(response):
 def get_agent_response(user_input):
     """Get response from the agent"""
     try:
-        result = agent(user_input)
+        with get_agent_pool().session(agent_session) as agent:
+            result = agent(user_input)
         return process_agent_response(result)
     except Exception as e:
         return f"Error: {e}"
@@ -77,8 +92,21 @@ def play_audio_async(text):
     thread.start()
 
 
-def start_voice_recording():
-    """Start voice recording with live transcription"""
+async def stream_agent_response(user_input, channel):
+    """Stream the agent's reply into the live channel as it is generated"""
+    try:
+        with get_agent_pool().session(agent_session) as agent:
+            async for event in agent.stream_async(user_input):
+                if "data" in event:
+                    channel.append("reply", event["data"])
+    except Exception as e:
+        channel.append("reply", f"Error: {e}")
+
+
+def start_voice_recording(receiver=None):
+    """Start voice recording with live transcription (from the browser when `receiver` is set)"""
+    live.reset(status="listening")
+
     def record_voice():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -86,43 +114,57 @@ def start_voice_recording():
         try:
             async def on_partial(text):
                 """Handle partial transcription results"""
-                st.session_state.current_partial = text
+                live.publish(partial=text)
             
             async def on_final(text):
-                """Handle final transcription and get agent response"""
+                """Handle final transcription and stream the agent response"""
                 if text.strip():
-                    # Add user message
-                    st.session_state.messages.append({"role": "user", "content": text.strip()})
-                    
-                    # Get agent response
-                    response = get_agent_response(text.strip())
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                    # Auto-play response
-                    play_audio_async(response)
-                
-                # Reset recording state
-                st.session_state.is_recording = False
-                st.session_state.current_partial = ""
+                    live.publish(final=text.strip(), partial="", status="thinking")
+                    await stream_agent_response(text.strip(), live)
+                live.publish(status="done")
             
             async def record_with_transcribe():
                 """Main recording function"""
-                async with MicStream() as mic:
-                    await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final)
+                source = WebRTCAudioSource(receiver) if receiver is not None else MicStream()
+                async with source as mic:
+                    await stream_to_transcribe(mic, on_partial=on_partial, on_final=on_final, session=transcribe_session, owner=agent_session)
             
             # Run the recording
             loop.run_until_complete(record_with_transcribe())
             
         except Exception as e:
-            st.session_state.messages.append({"role": "system", "content": f"Recording error: {e}"})
-            st.session_state.is_recording = False
-            st.session_state.current_partial = ""
+            live.publish(status="error", error=str(e))
     
     # Start recording thread
     st.session_state.recording_thread = threading.Thread(target=record_voice, daemon=True)
     st.session_state.recording_thread.start()
 
 
+def render_live(panel, state):
+    """Draw the live transcription panel from the channel's state"""
+    with panel.container():
+        if state["final"]:
+            st.write(f"**You said:** {state['final']}")
+            st.write(f"**Agent:** {state['reply']}" if state["reply"] else "🤔 Thinking...")
+        elif state["partial"]:
+            st.write(f"**You're saying:** {state['partial']}")
+        else:
+            st.write("*Listening for your voice...*")
+
+
+def finish_recording(state):
+    """Move a finished recording's turn into the conversation"""
+    if state["final"]:
+        st.session_state.messages.append({"role": "user", "content": state["final"]})
+        st.session_state.messages.append({"role": "assistant", "content": state["reply"]})
+        
+        # Auto-play response
+        play_audio_async(state["reply"])
+    elif state["status"] == "error":
+        st.session_state.messages.append({"role": "system", "content": f"Recording error: {state['error']}"})
+    st.session_state.is_recording = False
+
+
 def main():
     st.title("🎤 Live Voice Agent")
     st.markdown("**Speak naturally** - the agent will automatically detect when you're done speaking!")
@@ -130,18 +172,31 @@ def main():
     # Voice recording section
     st.header("🎙️ Voice Input")
     
+    # Browser microphone over WebRTC, so the app works when the server is remote;
+    # without a connected browser mic, recording uses the server's own microphone.
+    receiver = None
+    if webrtc_streamer is not None:
+        browser_mic = webrtc_streamer(
+            key="browser-mic",
+            mode=WebRtcMode.SENDONLY,
+            audio_receiver_size=256,
+            media_stream_constraints={"audio": True, "video": False},
+        )
+        if browser_mic.state.playing:
+            receiver = browser_mic.audio_receiver
+    
     col1, col2, col3 = st.columns([2, 2, 3])
     
     with col1:
         if not st.session_state.is_recording:
             if st.button("🎤 Start Recording", use_container_width=True, type="primary"):
                 st.session_state.is_recording = True
-                start_voice_recording()
+                start_voice_recording(receiver)
                 st.rerun()
         else:
             if st.button("⏹️ Stop Recording", use_container_width=True, type="secondary"):
                 st.session_state.is_recording = False
-                st.session_state.current_partial = ""
+                live.reset()
                 st.rerun()
     
     with col2:
@@ -151,13 +206,10 @@ def main():
         else:
             st.info("⚪ Ready to record")
     
-    # Live transcription display
-    if st.session_state.is_recording or st.session_state.current_partial:
+    # Live transcription display, filled in by follow() at the end of the script
+    if st.session_state.is_recording:
         st.subheader("🎯 Live Transcription")
-        if st.session_state.current_partial:
-            st.write(f"**You're saying:** {st.session_state.current_partial}")
-        else:
-            st.write("*Listening for your voice...*")
+        live_panel = st.empty()
     
     # Text input as alternative
     st.header("💬 Text Input (Alternative)")
@@ -200,6 +252,7 @@ def main():
         # Clear conversation
         if st.button("🗑️ Clear History"):
             st.session_state.messages = []
+            get_agent_pool().reset(agent_session)
             st.rerun()
     
     else:
@@ -266,9 +319,10 @@ def main():
         5. Listen to **audio reply**
         """)
     
-    # Auto-refresh when recording
+    # While recording, push live updates into the panel (no reruns); rerun once when the turn is done
     if st.session_state.is_recording:
-        time.sleep(0.5)
+        state = follow(live, lambda state: render_live(live_panel, state))
+        finish_recording(state)
         st.rerun()
 
 
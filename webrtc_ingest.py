@@ -0,0 +1,145 @@
+"""
+Browser microphone audio (WebRTC) into the streaming STT pipeline.
+- WebRTCAudioSource is a drop-in for transcribe.MicStream: its generator()
+  yields 20 ms 16 kHz mono int16 frames, so stream_to_transcribe, the VAD and
+  every stt.STTBackend work unchanged, and each browser session gets its own
+  capture instead of the server's sounddevice input.
+- Frames are av.AudioFrame-like (what streamlit-webrtc delivers: usually
+  48 kHz, stereo or mono, packed s16 or planar float); they are downmixed and
+  resampled (resample.Resampler with its anti-aliasing low-pass) with NumPy.
+- Feed it with push(frame) from any thread, or give it the streamlit-webrtc
+  context's audio_receiver and it pulls frames on its own thread.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from resample import Resampler
+from transcribe import CHUNK_SAMPLES, MAX_BATCH_FRAMES, SAMPLE_RATE, SAMPLE_WIDTH_BYTES
+
+# ---------- Config ----------
+MAX_BUFFERED_FRAMES = 100  # 2 s of 20 ms frames; the oldest are dropped past this
+RECEIVER_TIMEOUT_S = 1.0
+
+FRAME_BYTES = CHUNK_SAMPLES * SAMPLE_WIDTH_BYTES
+
+
+def frame_to_mono(frame) -> np.ndarray:
+    """An av.AudioFrame (or fakes.FakeAudioFrame) as mono int16 samples."""
+    data = frame.to_ndarray()
+    channels = len(frame.layout.channels)
+    if frame.format.is_planar:
+        mono = data.mean(axis=0) if channels > 1 else data[0]  # (channels, samples)
+    else:
+        data = data.reshape(-1, channels)  # (1, samples * channels), interleaved
+        mono = data.mean(axis=1) if channels > 1 else data[:, 0]
+    if data.dtype.kind == "f":
+        mono = mono * 32767
+    return np.clip(mono, -32768, 32767).astype(np.int16)
+
+
+class WebRTCAudioSource:
+    """Async stream of 20 ms 16 kHz int16 frames from browser audio frames.
+
+    Buffers at most `max_frames`; past that the oldest audio is dropped
+    (`dropped_frames`), like MicStream's DROP_OLDEST. With a `receiver`,
+    whatever it queued before the recording started is skipped.
+    """
+
+    def __init__(self, receiver=None, max_frames: int = MAX_BUFFERED_FRAMES, discard_buffered: bool = True):
+        self.receiver = receiver
+        self.discard_buffered = discard_buffered  # audio the receiver queued before recording started
+        self._frames = deque(maxlen=max_frames)
+        self._pending = bytearray()
+        self._resampler: Optional[Resampler] = None
+        self._lock = threading.Lock()
+        self._data = asyncio.Event()
+        self._waiting = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+        self._pump: Optional[threading.Thread] = None
+        self.frames_in = 0
+        self.dropped_frames = 0
+        self.input_rate: Optional[int] = None
+
+    def push(self, frame):
+        """Add one browser audio frame; safe to call from any thread."""
+        if self._resampler is None or frame.sample_rate != self.input_rate:
+            self.input_rate = frame.sample_rate
+            self._resampler = Resampler(frame.sample_rate, SAMPLE_RATE, lowpass=True)
+        pcm = self._resampler.process(frame_to_mono(frame)).tobytes()
+        with self._lock:
+            self.frames_in += 1
+            self._pending += pcm
+            whole = len(self._pending) - len(self._pending) % FRAME_BYTES
+            for offset in range(0, whole, FRAME_BYTES):
+                if len(self._frames) == self._frames.maxlen:
+                    self.dropped_frames += 1
+                self._frames.append(bytes(self._pending[offset : offset + FRAME_BYTES]))
+            del self._pending[:whole]
+            wake = whole and self._waiting
+            if wake:
+                self._waiting = False
+        if wake:
+            self._loop.call_soon_threadsafe(self._data.set)
+
+    def _pull(self):
+        """Move frames from a streamlit-webrtc audio_receiver until closed."""
+        import queue
+
+        if self.discard_buffered:
+            try:
+                self.receiver.get_frames(timeout=0)
+            except queue.Empty:
+                pass
+            except Exception:
+                self.close()
+                return
+        while not self._closed:
+            try:
+                frames = self.receiver.get_frames(timeout=RECEIVER_TIMEOUT_S)
+            except queue.Empty:
+                continue
+            except Exception:
+                break  # the browser hung up
+            for frame in frames:
+                self.push(frame)
+        self.close()
+
+    def close(self):
+        """End generator() after the buffered frames."""
+        self._closed = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._data.set)
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        if self.receiver is not None:
+            self._pump = threading.Thread(target=self._pull, name="webrtc-audio", daemon=True)
+            self._pump.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def generator(self):
+        while True:
+            with self._lock:
+                n = min(len(self._frames), MAX_BATCH_FRAMES)  # already-buffered frames go out together
+                chunk = b"".join(self._frames.popleft() for _ in range(n)) if n else None
+                if chunk is None:
+                    if self._closed:
+                        return
+                    self._data.clear()
+                    self._waiting = True
+            if chunk is None:
+                await self._data.wait()
+                continue
+            yield chunk
+
+    def stats(self) -> dict:
+        return {"input_rate": self.input_rate, "frames_in": self.frames_in, "dropped_frames": self.dropped_frames}
@@ -0,0 +1,533 @@
+"""
+Voice server on every core: a front-end process sharding sessions over worker processes.
+- WorkerFrontEnd only terminates WebSockets. Each session runs in one worker
+  process (a server.VoiceServer) for its whole life, so resampling, VAD, STT
+  streams, agent turns and TTS are spread over `workers` event loops.
+- Sticky routing: a client's ?session= id maps to the same worker while that
+  worker is up (a reconnect finds its agent, and so its conversation, there);
+  new ids go to the least loaded worker. The first message on every
+  connection is {"type": "session", "session": id, "worker": n}; ids are
+  issued and checked here (server.resolve_session_id), so a client can only
+  come back to an id it was given.
+- Audio and events cross the process boundary through shared-memory rings
+  (ShmRing, one each way per worker); the pipe only carries wake-ups and
+  control messages, so PCM is never pickled.
+- drain(n) stops routing new sessions to worker n, lets its live calls finish,
+  then stops the process (starting a replacement first with replace=True).
+
+Run:
+  python workers.py
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import math
+import multiprocessing
+import struct
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Tuple
+
+from server import accept, refuse_session, resolve_session_id
+
+# ---------- Config ----------
+RING_BYTES = 4 << 20  # per direction per worker (~2 min of 16 kHz audio)
+MAX_RECORD_BYTES = 64 << 10  # reply audio is split into records of at most this much
+RING_FULL_WAIT_S = 0.005  # retry interval while a ring has no room
+ROUTE_TABLE_SIZE = 100_000  # session ids remembered for sticky routing
+
+# Record kinds
+BINARY, TEXT, OPEN, CLOSE = range(4)
+
+_U64 = struct.Struct("<Q")
+_RECORD = struct.Struct("<IBI")  # connection id, kind, payload length
+_HEADER_BYTES = 64  # write offset at 0, read offset at 8 (ever-increasing), capacity at 16
+
+
+class ShmRing:
+    """Single-producer, single-consumer ring of records in shared memory.
+
+    Create it with a size in one process and attach to it by `name` in the
+    other. put() never blocks: it returns False when there is no room.
+    """
+
+    def __init__(self, size: int = RING_BYTES, name: Optional[str] = None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + size)
+            self.shm.buf[:_HEADER_BYTES] = bytes(_HEADER_BYTES)
+            _U64.pack_into(self.shm.buf, 16, size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = _U64.unpack_from(self.shm.buf, 16)[0]
+
+    def _copy_in(self, offset: int, data):
+        buf, pos = self.shm.buf, offset % self.capacity
+        first = min(len(data), self.capacity - pos)
+        buf[_HEADER_BYTES + pos : _HEADER_BYTES + pos + first] = data[:first]
+        if first < len(data):
+            buf[_HEADER_BYTES : _HEADER_BYTES + len(data) - first] = data[first:]
+
+    def _copy_out(self, offset: int, n: int) -> bytes:
+        buf, pos = self.shm.buf, offset % self.capacity
+        first = min(n, self.capacity - pos)
+        data = bytes(buf[_HEADER_BYTES + pos : _HEADER_BYTES + pos + first])
+        if first < n:
+            data += bytes(buf[_HEADER_BYTES : _HEADER_BYTES + n - first])
+        return data
+
+    def put(self, conn_id: int, kind: int, payload: bytes = b"") -> bool:
+        buf = self.shm.buf
+        head, tail = _U64.unpack_from(buf, 0)[0], _U64.unpack_from(buf, 8)[0]
+        need = _RECORD.size + len(payload)
+        if need > self.capacity - (head - tail):
+            return False
+        self._copy_in(head, _RECORD.pack(conn_id, kind, len(payload)))
+        self._copy_in(head + _RECORD.size, memoryview(payload))
+        _U64.pack_into(buf, 0, head + need)  # publish only once the record is complete
+        return True
+
+    def get(self) -> Optional[Tuple[int, int, bytes]]:
+        """Next (connection id, kind, payload), or None when the ring is empty."""
+        buf = self.shm.buf
+        tail = _U64.unpack_from(buf, 8)[0]
+        if tail == _U64.unpack_from(buf, 0)[0]:
+            return None
+        conn_id, kind, n = _RECORD.unpack(self._copy_out(tail, _RECORD.size))
+        payload = self._copy_out(tail + _RECORD.size, n)
+        _U64.pack_into(buf, 8, tail + _RECORD.size + n)
+        return conn_id, kind, payload
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class _Channel:
+    """One direction of records plus the pipe that wakes the reader up."""
+
+    def __init__(self, ring: ShmRing, pipe):
+        self.ring = ring
+        self.pipe = pipe
+        self._lock = asyncio.Lock()  # records go out in the order they were sent
+        self._bell = False
+
+    def _ring_bell(self):
+        if not self._bell:
+            self._bell = True  # one wake-up per loop iteration, however many records
+            asyncio.get_running_loop().call_soon(self._send_bell)
+
+    def _send_bell(self):
+        self._bell = False
+        try:
+            self.pipe.send("ring")
+        except (BrokenPipeError, OSError):
+            pass  # the other side is gone
+
+    def try_put(self, conn_id: int, kind: int, payload: bytes = b"") -> bool:
+        if self._lock.locked() or not self.ring.put(conn_id, kind, payload):
+            return False
+        self._ring_bell()
+        return True
+
+    async def put(self, conn_id: int, kind: int, payload: bytes = b""):
+        async with self._lock:
+            while not self.ring.put(conn_id, kind, payload):
+                self._ring_bell()  # make sure the reader is making room
+                await asyncio.sleep(RING_FULL_WAIT_S)
+        self._ring_bell()
+
+
+# ---------- Worker process ----------
+
+class _ProxySocket:
+    """The WebSocket a VoiceSession sees in a worker: records to and from the front-end."""
+
+    def __init__(self, out: _Channel, conn_id: int):
+        self.out = out
+        self.conn_id = conn_id
+        self.closed = False
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self._close_sent = False
+
+    def feed(self, message):
+        self._messages.put_nowait(message)
+
+    async def recv(self):
+        if self.closed:
+            return None
+        message = await self._messages.get()
+        if message is None:
+            self.closed = True  # the client hung up
+        return message
+
+    async def send(self, data):
+        if self.closed:
+            raise ConnectionError("websocket is closed")
+        if isinstance(data, str):
+            await self.out.put(self.conn_id, TEXT, data.encode())
+            return
+        data = bytes(data)
+        for offset in range(0, max(len(data), 1), MAX_RECORD_BYTES):
+            await self.out.put(self.conn_id, BINARY, data[offset : offset + MAX_RECORD_BYTES])
+
+    async def send_json(self, **event):
+        await self.send(json.dumps(event))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        if not self._close_sent:
+            self._close_sent = True
+            await self.out.put(self.conn_id, CLOSE, struct.pack("!H", code))
+
+
+async def _worker(pipe, inbound_name: str, outbound_name: str, server_factory: Callable):
+    loop = asyncio.get_running_loop()
+    inbound, outbound = ShmRing(name=inbound_name), ShmRing(name=outbound_name)
+    out = _Channel(outbound, pipe)
+    server = server_factory()
+    sockets: Dict[int, _ProxySocket] = {}
+    stopped = loop.create_future()
+
+    async def serve(sock: _ProxySocket, session_id: str):
+        try:
+            await server.serve_session(sock, session_id)
+        finally:
+            sockets.pop(sock.conn_id, None)
+
+    def on_pipe():
+        try:
+            while pipe.poll():
+                command = pipe.recv()
+                if command == "ring":
+                    while (record := inbound.get()) is not None:
+                        conn_id, kind, payload = record
+                        if kind == OPEN:
+                            sockets[conn_id] = _ProxySocket(out, conn_id)
+                            asyncio.ensure_future(serve(sockets[conn_id], payload.decode()))
+                        elif conn_id in sockets:
+                            sock = sockets[conn_id]
+                            sock.feed(None if kind == CLOSE else payload.decode(errors="replace") if kind == TEXT else payload)
+                elif command == "stats":
+                    pipe.send(("stats", dict(server.stats(), cpu_s=time.process_time())))
+                elif command == "stop" and not stopped.done():
+                    stopped.set_result(None)
+        except (EOFError, OSError):
+            if not stopped.done():
+                stopped.set_result(None)  # the front-end is gone
+
+    loop.add_reader(pipe.fileno(), on_pipe)
+    pipe.send(("ready", None))
+    try:
+        await stopped
+    finally:
+        loop.remove_reader(pipe.fileno())
+        server.stt.close()
+        server.tts.close()
+        inbound.close()
+        outbound.close()
+
+
+def _worker_main(pipe, inbound_name: str, outbound_name: str, server_factory: Callable):
+    asyncio.run(_worker(pipe, inbound_name, outbound_name, server_factory))
+
+
+def default_server(workers: int):
+    """server.VoiceServer from config, with the global limits split between `workers` processes."""
+    import config
+    from server import VoiceServer
+
+    return VoiceServer(
+        bedrock_concurrency=math.ceil(config.server_bedrock_concurrency / workers),
+        transcribe_concurrency=math.ceil(config.server_transcribe_concurrency / workers),
+        polly_concurrency=math.ceil(config.server_polly_concurrency / workers),
+    )
+
+
+# ---------- Front-end ----------
+
+class _WorkerHandle:
+    def __init__(self, index: int, context, server_factory: Callable, ring_bytes: int):
+        self.index = index
+        self.inbound = ShmRing(ring_bytes)  # front-end -> worker
+        self.outbound = ShmRing(ring_bytes)  # worker -> front-end
+        self.pipe, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child, self.inbound.name, self.outbound.name, server_factory),
+            name=f"voice-worker-{index}",
+        )
+        self.channel: Optional[_Channel] = None
+        self.connections: Dict[int, asyncio.Queue] = {}  # connection id -> records from the worker
+        self.ready: Optional[asyncio.Future] = None
+        self.idle = asyncio.Event()
+        self.pending_stats: list = []
+        self.draining = False
+        self.alive = False
+        self.sessions = 0  # routed here in total
+        self.dropped_chunks = 0  # client audio that found the inbound ring full
+
+
+class WorkerFrontEnd:
+    """Accepts voice WebSockets and runs each session in one of `workers` processes.
+
+    `server_factory` builds the server.VoiceServer inside each worker (it must
+    be picklable); by default default_server(workers). Each worker takes at
+    most `max_sessions` sessions at once. Session ids are signed with
+    `session_secret` (config.server_session_secret).
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        server_factory: Optional[Callable] = None,
+        max_sessions: Optional[int] = None,
+        ring_bytes: int = RING_BYTES,
+        session_secret: Optional[bytes] = None,
+    ):
+        import config
+
+        self.workers_wanted = workers or config.server_workers
+        self.server_factory = server_factory or functools.partial(default_server, self.workers_wanted)
+        self.max_sessions = max_sessions or config.server_max_sessions
+        self.ring_bytes = ring_bytes
+        self.session_secret = session_secret or config.server_session_secret
+        self.workers: Dict[int, _WorkerHandle] = {}
+        self._routes: "OrderedDict[str, int]" = OrderedDict()  # session id -> worker index
+        self._context = multiprocessing.get_context("spawn")  # the front-end runs an event loop
+        self._indexes = itertools.count()
+        self._conn_ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.rejected = 0
+
+    # ---------- Workers ----------
+
+    async def _spawn(self) -> _WorkerHandle:
+        loop = asyncio.get_running_loop()
+        worker = _WorkerHandle(next(self._indexes), self._context, self.server_factory, self.ring_bytes)
+        worker.ready = loop.create_future()
+        worker.channel = _Channel(worker.inbound, worker.pipe)
+        worker.idle.set()
+        worker.process.start()
+        worker.alive = True
+        loop.add_reader(worker.pipe.fileno(), self._on_pipe, worker)
+        self.workers[worker.index] = worker
+        await worker.ready
+        return worker
+
+    def _on_pipe(self, worker: _WorkerHandle):
+        try:
+            while worker.pipe.poll():
+                message = worker.pipe.recv()
+                if message == "ring":
+                    while (record := worker.outbound.get()) is not None:
+                        conn_id, kind, payload = record
+                        queue = worker.connections.get(conn_id)
+                        if queue is not None:
+                            queue.put_nowait((kind, payload))
+                elif message[0] == "ready":
+                    worker.ready.set_result(None)
+                elif message[0] == "stats":
+                    worker.pending_stats.pop(0).set_result(message[1])
+        except (EOFError, OSError):
+            self._lost(worker)
+
+    def _lost(self, worker: _WorkerHandle):
+        """The worker process died: end its connections (their calls are lost)."""
+        asyncio.get_running_loop().remove_reader(worker.pipe.fileno())
+        worker.alive = False
+        if not worker.ready.done():
+            worker.ready.set_exception(RuntimeError(f"worker {worker.index} exited during startup"))
+        for queue in worker.connections.values():
+            queue.put_nowait((TEXT, json.dumps({"type": "error", "text": "worker process exited"}).encode()))
+            queue.put_nowait((CLOSE, b""))
+        for future in worker.pending_stats:
+            future.set_result(None)
+        worker.pending_stats.clear()
+
+    async def _stop(self, worker: _WorkerHandle):
+        if worker.alive:
+            asyncio.get_running_loop().remove_reader(worker.pipe.fileno())
+            worker.alive = False
+            try:
+                worker.pipe.send("stop")
+            except (BrokenPipeError, OSError):
+                pass
+        await asyncio.get_running_loop().run_in_executor(None, worker.process.join)
+        self.workers.pop(worker.index, None)
+        for ring in (worker.inbound, worker.outbound):
+            ring.close()
+            ring.unlink()
+
+    async def drain(self, index: int, replace: bool = False) -> float:
+        """Stop routing to worker `index`, wait for its live sessions to end, stop it.
+
+        Returns the seconds it took. With `replace`, a new worker is started first.
+        """
+        started = time.monotonic()
+        worker = self.workers[index]
+        worker.draining = True
+        if replace:
+            await self._spawn()
+        await worker.idle.wait()
+        await self._stop(worker)
+        return time.monotonic() - started
+
+    async def worker_stats(self) -> Dict[int, Optional[dict]]:
+        """Each live worker's VoiceServer.stats() plus its process CPU time (cpu_s)."""
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for worker in self.workers.values():
+            if worker.alive:
+                futures[worker.index] = loop.create_future()
+                worker.pending_stats.append(futures[worker.index])
+                worker.pipe.send("stats")
+        return {index: await future for index, future in futures.items()}
+
+    # ---------- Routing ----------
+
+    def _open_to_new(self, worker: _WorkerHandle) -> bool:
+        return worker.alive and not worker.draining and len(worker.connections) < self.max_sessions
+
+    def _admit(self) -> bool:
+        if any(self._open_to_new(w) for w in self.workers.values()):
+            return True
+        self.rejected += 1
+        return False
+
+    def _route(self, session_id: str) -> Optional[_WorkerHandle]:
+        worker = self.workers.get(self._routes.get(session_id, -1))
+        if worker is None or not self._open_to_new(worker):
+            candidates = [w for w in self.workers.values() if self._open_to_new(w)]
+            if not candidates:
+                return None
+            worker = min(candidates, key=lambda w: len(w.connections))
+        self._routes[session_id] = worker.index
+        self._routes.move_to_end(session_id)
+        while len(self._routes) > ROUTE_TABLE_SIZE:
+            self._routes.popitem(last=False)
+        return worker
+
+    # ---------- Connections ----------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        accepted = await accept(reader, writer, self._admit)
+        if accepted is None:
+            return
+        ws, requested = accepted
+        session_id = resolve_session_id(self.session_secret, requested)
+        if session_id is None:
+            try:
+                await refuse_session(ws)
+            except ConnectionError:
+                await ws.close()
+            return
+        worker = self._route(session_id)
+        if worker is None:  # the last open worker filled up during the handshake
+            await ws.close(1013)
+            return
+        conn_id = next(self._conn_ids)
+        records: asyncio.Queue = asyncio.Queue()
+        worker.connections[conn_id] = records
+        worker.sessions += 1
+        worker.idle.clear()
+        client = None
+        code = 1000
+        try:
+            await ws.send_json(type="session", session=session_id, worker=worker.index)
+            await worker.channel.put(conn_id, OPEN, session_id.encode())
+            client = asyncio.create_task(self._from_client(ws, worker, conn_id))
+            code = await self._to_client(ws, records)
+        except ConnectionError:
+            pass
+        finally:
+            if client is not None:
+                client.cancel()
+            del worker.connections[conn_id]
+            if not worker.connections:
+                worker.idle.set()
+            await ws.close(code)
+
+    async def _from_client(self, ws, worker: _WorkerHandle, conn_id: int):
+        while True:
+            message = await ws.recv()
+            if message is None:
+                break
+            if isinstance(message, bytes):
+                if not worker.channel.try_put(conn_id, BINARY, message):
+                    worker.dropped_chunks += 1  # the worker is behind; like MicStream, lose audio rather than stall
+            else:
+                await worker.channel.put(conn_id, TEXT, message.encode())
+        if worker.alive:
+            await worker.channel.put(conn_id, CLOSE)
+
+    async def _to_client(self, ws, records: asyncio.Queue) -> int:
+        """Forward the worker's records until it closes the session; returns its close code."""
+        while True:
+            kind, payload = await records.get()
+            if kind == CLOSE:
+                return struct.unpack("!H", payload)[0] if len(payload) == 2 else 1000
+            try:
+                await ws.send(payload.decode() if kind == TEXT else payload)
+            except ConnectionError:
+                pass  # keep draining until the session ends in the worker
+
+    # ---------- Lifecycle ----------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "WorkerFrontEnd":
+        await asyncio.gather(*(self._spawn() for _ in range(self.workers_wanted)))
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        await asyncio.gather(*(self._stop(w) for w in list(self.workers.values())))
+
+    def stats(self) -> dict:
+        return {
+            "rejected": self.rejected,
+            "workers": {
+                w.index: {
+                    "pid": w.process.pid,
+                    "active_sessions": len(w.connections),
+                    "sessions": w.sessions,
+                    "draining": w.draining,
+                    "dropped_chunks": w.dropped_chunks,
+                }
+                for w in self.workers.values()
+            },
+        }
+
+
+# ---------- Main ----------
+
+async def main():
+    import config
+
+    front = await WorkerFrontEnd().start(config.server_host, config.server_port)
+    print(f"Voice server on ws://{config.server_host}:{front.port}/ ({len(front.workers)} worker processes)")
+    try:
+        await front.serve_forever()
+    finally:
+        print(f"[workers] {front.stats()}")
+        await front.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass